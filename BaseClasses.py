@@ -1,10 +1,13 @@
 from __future__ import annotations
 
+import bisect
 import collections
 import functools
+import itertools
 import logging
 import random
 import secrets
+import threading
 from argparse import Namespace
 from collections import Counter, deque
 from collections.abc import Collection, MutableSequence
@@ -20,6 +23,7 @@ import Utils
 
 if TYPE_CHECKING:
     from entrance_rando import ERPlacementState
+    from generation_profiler import GenerationProfiler
     from worlds import AutoWorld
 
 
@@ -76,6 +80,7 @@ class MultiWorld():
     progression_balancing: Dict[int, Options.ProgressionBalancing]
     completion_condition: Dict[int, Callable[[CollectionState], bool]]
     indirect_connections: Dict[Region, Set[Entrance]]
+    item_conditions: Dict[int, EntranceItemConditions]
     exclude_locations: Dict[int, Options.ExcludeLocations]
     priority_locations: Dict[int, Options.PriorityLocations]
     start_inventory: Dict[int, Options.StartInventory]
@@ -88,6 +93,8 @@ class MultiWorld():
     random: random.Random
     per_slot_randoms: Utils.DeprecateDict[int, random.Random]
     """Deprecated. Please use `self.random` instead."""
+    profiler: Optional[GenerationProfiler] = None
+    """measures the stages of this generation if it was started with --profile"""
 
     class AttributeProxy():
         def __init__(self, rule):
@@ -100,11 +107,24 @@ class MultiWorld():
         region_cache: Dict[int, Dict[str, Region]]
         entrance_cache: Dict[int, Dict[str, Entrance]]
         location_cache: Dict[int, Dict[str, Location]]
+        filled_locations: Dict[int, List[Location]]
+        """registered locations that currently hold an item, in registration order, kept up to date by Location.item"""
+        unfilled_locations: Dict[int, List[Location]]
+        """registered locations that currently hold no item, in registration order, kept up to date by Location.item"""
+        location_order: Dict[Location, int]
+        """registration order of the registered locations"""
+        location_filled: Dict[Location, bool]
+        """which of the fill status indexes each registered location is currently in"""
 
         def __init__(self, players: int):
             self.region_cache = {player: {} for player in range(1, players+1)}
             self.entrance_cache = {player: {} for player in range(1, players+1)}
             self.location_cache = {player: {} for player in range(1, players+1)}
+            self.filled_locations = {player: [] for player in range(1, players+1)}
+            self.unfilled_locations = {player: [] for player in range(1, players+1)}
+            self.location_order = {}
+            self.location_filled = {}
+            self._registrations = itertools.count()
 
         def __iadd__(self, other: Iterable[Region]):
             self.extend(other)
@@ -125,6 +145,38 @@ class MultiWorld():
             self.region_cache[new_id] = {}
             self.entrance_cache[new_id] = {}
             self.location_cache[new_id] = {}
+            self.filled_locations[new_id] = []
+            self.unfilled_locations[new_id] = []
+
+        def add_location(self, location: Location) -> None:
+            self.location_cache[location.player][location.name] = location
+            self.location_order[location] = next(self._registrations)
+            self.update_fill_status(location)
+
+        def remove_location(self, location: Location) -> None:
+            del self.location_cache[location.player][location.name]
+            self._remove_fill_status(location)
+            del self.location_order[location]
+
+        def update_fill_status(self, location: Location) -> None:
+            """Move a registered location to the fill status index matching its current item, see `Location.item`."""
+            if location not in self.location_order:
+                return
+            filled = location.item is not None
+            if self.location_filled.get(location) is filled:
+                return
+            self._remove_fill_status(location)
+            index = self.filled_locations if filled else self.unfilled_locations
+            bisect.insort(index[location.player], location, key=self.location_order.__getitem__)
+            self.location_filled[location] = filled
+
+        def _remove_fill_status(self, location: Location) -> None:
+            filled = self.location_filled.pop(location, None)
+            if filled is None:
+                return
+            locations = (self.filled_locations if filled else self.unfilled_locations)[location.player]
+            del locations[bisect.bisect_left(locations, self.location_order[location],
+                                             key=self.location_order.__getitem__)]
 
         def __iter__(self) -> Iterator[Region]:
             for regions in self.region_cache.values():
@@ -159,6 +211,7 @@ class MultiWorld():
         self.early_items = {player: {} for player in self.player_ids}
         self.local_early_items = {player: {} for player in self.player_ids}
         self.indirect_connections = {}
+        self.item_conditions = {}
         self.start_inventory_from_pool: Dict[int, Options.StartInventoryPool] = {}
 
         for player in range(1, players + 1):
@@ -504,27 +557,32 @@ class MultiWorld():
                                            for player in self.regions.location_cache))
 
     def get_unfilled_locations(self, player: Optional[int] = None) -> List[Location]:
-        return [location for location in self.get_locations(player) if location.item is None]
+        if player is not None:
+            return list(self.regions.unfilled_locations[player])
+        return [location for locations in self.regions.unfilled_locations.values() for location in locations]
 
     def get_filled_locations(self, player: Optional[int] = None) -> List[Location]:
-        return [location for location in self.get_locations(player) if location.item is not None]
+        if player is not None:
+            return list(self.regions.filled_locations[player])
+        return [location for locations in self.regions.filled_locations.values() for location in locations]
 
     def get_reachable_locations(self, state: Optional[CollectionState] = None, player: Optional[int] = None) -> List[Location]:
         state: CollectionState = state if state else self.state
-        return [location for location in self.get_locations(player) if location.can_reach(state)]
+        # skipping unreachable regions as a whole instead of checking each of their locations
+        return [location for region in self.get_regions(player) if region.can_reach(state)
+                for location in region.locations if location.can_reach(state)]
 
     def get_placeable_locations(self, state=None, player=None) -> List[Location]:
         state: CollectionState = state if state else self.state
-        return [location for location in self.get_locations(player) if location.item is None and location.can_reach(state)]
+        return [location for location in self.get_unfilled_locations(player) if location.can_reach(state)]
 
     def get_unfilled_locations_for_players(self, location_names: List[str], players: Iterable[int]):
         for player in players:
             if not location_names:
-                valid_locations = [location.name for location in self.get_unfilled_locations(player)]
-            else:
-                valid_locations = location_names
+                yield from self.get_unfilled_locations(player)
+                continue
             relevant_cache = self.regions.location_cache[player]
-            for location_name in valid_locations:
+            for location_name in location_names:
                 location = relevant_cache.get(location_name, None)
                 if location and location.item is None:
                     yield location
@@ -578,80 +636,54 @@ class MultiWorld():
 
         return False
 
-    def get_spheres(self) -> Iterator[Set[Location]]:
+    def get_spheres(self, analysis: Optional[SphereAnalysis] = None) -> Iterator[Set[Location]]:
         """
         yields a set of locations for each logical sphere
 
         If there are unreachable locations, the last sphere of reachable
         locations is followed by an empty set, and then a set of all of the
         unreachable locations.
+
+        :param analysis: analysis of the current placement to read the spheres from, instead of computing them anew
         """
-        state = CollectionState(self)
         locations = set(self.get_filled_locations())
+        if analysis is None:
+            analysis = SphereAnalysis(self)
 
-        while locations:
-            sphere: Set[Location] = set()
-
-            for location in locations:
-                if location.can_reach(state):
-                    sphere.add(location)
-            yield sphere
+        for analysis_sphere in analysis.iter_spheres():
+            if not locations:
+                return
+            sphere = {location for location in analysis_sphere if location.item}
             if not sphere:
-                if locations:
-                    yield locations  # unreachable locations
                 break
-
-            for location in sphere:
-                state.collect(location.item, True, location)
+            yield sphere
             locations -= sphere
 
-    def get_sendable_spheres(self) -> Iterator[Set[Location]]:
+        if locations:
+            yield set()
+            yield locations  # unreachable locations
+
+    def get_sendable_spheres(self, analysis: Optional[SphereAnalysis] = None) -> Iterator[Set[Location]]:
         """
         yields a set of multiserver sendable locations (location.item.code: int) for each logical sphere
 
         If there are unreachable locations, the last sphere of reachable locations is followed by an empty set,
         and then a set of all of the unreachable locations.
-        """
-        state = CollectionState(self)
-        locations: Set[Location] = set()
-        events: Set[Location] = set()
-        for location in self.get_filled_locations():
-            if type(location.item.code) is int and type(location.address) is int:
-                locations.add(location)
-            else:
-                events.add(location)
-
-        while locations:
-            sphere: Set[Location] = set()
-
-            # cull events out
-            done_events: Set[Union[Location, None]] = {None}
-            while done_events:
-                done_events = set()
-                for event in events:
-                    if event.can_reach(state):
-                        state.collect(event.item, True, event)
-                        done_events.add(event)
-                events -= done_events
-
-            for location in locations:
-                if location.can_reach(state):
-                    sphere.add(location)
 
-            yield sphere
-            if not sphere:
-                if locations:
-                    yield locations  # unreachable locations
-                break
+        :param analysis: analysis of the current placement to read the spheres from, instead of computing them anew
+        """
+        if analysis is None:
+            analysis = SphereAnalysis(self)
+        for sphere in analysis.get_sendable_spheres():
+            yield set(sphere)
 
-            for location in sphere:
-                state.collect(location.item, True, location)
-            locations -= sphere
+    def fulfills_accessibility(self, state: Optional[CollectionState] = None,
+                               analysis: Optional[SphereAnalysis] = None):
+        """
+        Check if accessibility rules are fulfilled with current or supplied state.
 
-    def fulfills_accessibility(self, state: Optional[CollectionState] = None):
-        """Check if accessibility rules are fulfilled with current or supplied state."""
-        if not state:
-            state = CollectionState(self)
+        :param analysis: analysis of the current placement to use if no state is supplied, instead of computing one
+        """
         players: Dict[str, Set[int]] = {
             "minimal": set(),
             "items": set(),
@@ -660,6 +692,19 @@ class MultiWorld():
         for player, world in self.worlds.items():
             players[world.options.accessibility.current_key].add(player)
 
+        if not state:
+            if analysis is None:
+                analysis = SphereAnalysis(self)
+            unreachable = analysis.get_unreachable_locations()
+            missing = [location for location in self.get_locations() if location in unreachable and
+                       (location.player in players["full"] or
+                        (location.advancement and location.item.player not in players["minimal"]))]
+            if missing:
+                logging.warning(f"Could not access required locations for accessibility check."
+                                f" Missing: {missing}")
+                return False
+            return analysis.can_beat_game()
+
         beatable_fulfilled = False
 
         def location_condition(location: Location) -> bool:
@@ -706,9 +751,234 @@ class MultiWorld():
         return False
 
 
+class SphereAnalysis:
+    """
+    Logical spheres of a multiworld's placement, computed lazily one sphere at a time. One analysis can be handed to
+    get_spheres, get_sendable_spheres, fulfills_accessibility, the spoiler playthrough and progression balancing,
+    so they don't each have to sweep the multiworld again.
+    Only valid until the placement or the logic changes, which is up to whoever created it to keep track of.
+    """
+    multiworld: MultiWorld
+    spheres: List[Set[Location]]
+    """all locations, filled or not, that became reachable in each sphere computed so far"""
+    states: List[CollectionState]
+    """the state each sphere was computed with"""
+    state: CollectionState
+    """the state after collecting every sphere computed so far"""
+    beaten_sphere: Optional[int]
+    """the number of spheres it took to beat the game, if that has been reached yet"""
+
+    def __init__(self, multiworld: MultiWorld) -> None:
+        self.multiworld = multiworld
+        self.spheres = []
+        self.states = []
+        self.state = CollectionState(multiworld)
+        self.beaten_sphere = 0 if multiworld.has_beaten_game(self.state) else None
+        self._remaining: Set[Location] = set(multiworld.get_locations())
+        self._exhausted = False
+        self._sendable_spheres: Optional[List[Set[Location]]] = None
+        self._lock = threading.RLock()
+
+    def _next_sphere(self) -> bool:
+        """Compute one more sphere. Returns False if no further locations can be reached."""
+        state = self.state
+        sphere = {location for location in self._remaining if location.can_reach(state)}
+        if not sphere:
+            self._exhausted = True
+            return False
+
+        self.states.append(state.copy(copy_on_write=True))
+        for location in sphere:
+            if location.item:
+                state.collect(location.item, True, location)
+        self._remaining -= sphere
+        self.spheres.append(sphere)
+        if self.beaten_sphere is None and self.multiworld.has_beaten_game(state):
+            self.beaten_sphere = len(self.spheres)
+        return True
+
+    def get_sphere(self, index: int) -> Optional[Set[Location]]:
+        """Returns the locations of the sphere at index, or None if there is no such sphere."""
+        with self._lock:
+            while index >= len(self.spheres):
+                if self._exhausted or not self._next_sphere():
+                    return None
+            return self.spheres[index]
+
+    def iter_spheres(self) -> Iterator[Set[Location]]:
+        """Yields each sphere, computing more of them only as they are requested. Do not modify the yielded sets."""
+        index = 0
+        while True:
+            sphere = self.get_sphere(index)
+            if sphere is None:
+                return
+            yield sphere
+            index += 1
+
+    def get_unreachable_locations(self) -> Set[Location]:
+        """Returns all locations that cannot be reached with the complete placement."""
+        with self._lock:
+            while not self._exhausted:
+                self._next_sphere()
+            return self._remaining
+
+    def can_beat_game(self) -> bool:
+        with self._lock:
+            while self.beaten_sphere is None and not self._exhausted:
+                self._next_sphere()
+            return self.beaten_sphere is not None
+
+    def get_sendable_spheres(self) -> List[Set[Location]]:
+        """
+        Returns the sets of multiserver sendable locations (location.item.code: int) for each logical sphere.
+        Events are collected as soon as they can be reached, so these differ from the spheres of iter_spheres.
+
+        If there are unreachable locations, the last sphere of reachable locations is followed by an empty set,
+        and then a set of all of the unreachable locations.
+        """
+        with self._lock:
+            if self._sendable_spheres is None:
+                self._sendable_spheres = list(self._compute_sendable_spheres())
+            return self._sendable_spheres
+
+    def _compute_sendable_spheres(self) -> Iterator[Set[Location]]:
+        state = CollectionState(self.multiworld)
+        locations: Set[Location] = set()
+        events: Set[Location] = set()
+        for location in self.multiworld.get_filled_locations():
+            if type(location.item.code) is int and type(location.address) is int:
+                locations.add(location)
+            else:
+                events.add(location)
+
+        while locations:
+            sphere: Set[Location] = set()
+
+            # cull events out
+            done_events: Set[Union[Location, None]] = {None}
+            while done_events:
+                done_events = set()
+                for event in events:
+                    if event.can_reach(state):
+                        state.collect(event.item, True, event)
+                        done_events.add(event)
+                events -= done_events
+
+            for location in locations:
+                if location.can_reach(state):
+                    sphere.add(location)
+
+            yield sphere
+            if not sphere:
+                if locations:
+                    yield locations  # unreachable locations
+                break
+
+            for location in sphere:
+                state.collect(location.item, True, location)
+            locations -= sphere
+
+
 PathValue = Tuple[str, Optional["PathValue"]]
 
 
+class TrackingCounter(Counter):
+    """Counter of a player's items that remembers which item names changed since it was last cleared."""
+    changed: Set[str]
+
+    def __init__(self, *args, **kwargs) -> None:
+        self.changed = set()
+        super().__init__(*args, **kwargs)
+
+    def __setitem__(self, key: str, value: int) -> None:
+        self.changed.add(key)
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key: str) -> None:
+        self.changed.add(key)
+        super().__delitem__(key)
+
+    def copy(self) -> TrackingCounter:
+        ret = super().copy()
+        ret.changed = self.changed.copy()
+        return ret
+
+
+class _ItemReadRecorder(Mapping):
+    """Stands in for a player's items while an access rule runs, to record which item names it reads."""
+    reads: Optional[Set[str]]
+    """the item names read so far, or None if the rule looked at the items as a whole"""
+
+    def __init__(self, counter: Counter[str]) -> None:
+        self.counter = counter
+        self.reads = set()
+
+    def __getitem__(self, key: str) -> int:
+        if self.reads is not None:
+            self.reads.add(key)
+        return self.counter[key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if self.reads is not None:
+            self.reads.add(key)
+        return self.counter.get(key, default)
+
+    def __contains__(self, key: object) -> bool:
+        if self.reads is not None:
+            self.reads.add(key)
+        return key in self.counter
+
+    def __iter__(self) -> Iterator[str]:
+        self.reads = None
+        return iter(self.counter)
+
+    def __len__(self) -> int:
+        self.reads = None
+        return len(self.counter)
+
+    def __getattr__(self, name: str) -> Any:
+        # anything else Counter offers, like total(), depends on all items
+        self.reads = None
+        return getattr(self.counter, name)
+
+
+class EntranceItemConditions:
+    """
+    Which item names the access rules of a player's Entrances read while failing, for worlds using
+    World.track_item_conditions. Only grows, so it covers the last failed check of every CollectionState.
+    """
+    dependents: Dict[str, Set[Entrance]]
+    recorded: Set[Entrance]
+    """entrances whose item reads are known"""
+    untracked: Set[Entrance]
+    """entrances seen looking at all items, which have to be retried after any change"""
+
+    def __init__(self) -> None:
+        self.dependents = {}
+        self.recorded = set()
+        self.untracked = set()
+
+    def record(self, entrance: Entrance, reads: Optional[Set[str]]) -> None:
+        if entrance in self.untracked:
+            return
+        if reads is None:
+            self.recorded.discard(entrance)
+            self.untracked.add(entrance)
+            return
+        self.recorded.add(entrance)
+        for item_name in reads:
+            self.dependents.setdefault(item_name, set()).add(entrance)
+
+    def retry(self, blocked_connections: Set[Entrance], changed: Set[str]) -> List[Entrance]:
+        """Returns the blocked connections that may have become passable since the items in `changed` changed."""
+        candidates: Set[Entrance] = set()
+        for item_name in changed:
+            candidates |= self.dependents.get(item_name, set())
+        recorded = self.recorded
+        return [connection for connection in blocked_connections
+                if connection in candidates or connection not in recorded]
+
+
 class CollectionState():
     prog_items: Dict[int, Counter[str]]
     multiworld: MultiWorld
@@ -719,11 +989,17 @@ class CollectionState():
     locations_checked: Set[Location]
     stale: Dict[int, bool]
     allow_partial_entrances: bool
+    shared_players: Set[int]
+    """players whose prog_items, reachable_regions and blocked_connections may also be used by a copy-on-write copy
+    or parent, so they are copied before this state changes them"""
     additional_init_functions: List[Callable[[CollectionState, MultiWorld], None]] = []
     additional_copy_functions: List[Callable[[CollectionState, CollectionState], CollectionState]] = []
 
     def __init__(self, parent: MultiWorld, allow_partial_entrances: bool = False):
-        self.prog_items = {player: Counter() for player in parent.get_all_ids()}
+        self.prog_items = {
+            player: TrackingCounter() if getattr(parent.worlds.get(player), "track_item_conditions", False)
+            else Counter() for player in parent.get_all_ids()
+        }
         self.multiworld = parent
         self.reachable_regions = {player: set() for player in parent.get_all_ids()}
         self.blocked_connections = {player: set() for player in parent.get_all_ids()}
@@ -732,6 +1008,7 @@ class CollectionState():
         self.locations_checked = set()
         self.stale = {player: True for player in parent.get_all_ids()}
         self.allow_partial_entrances = allow_partial_entrances
+        self.shared_players = set()
         for function in self.additional_init_functions:
             function(self, parent)
         for items in parent.precollected_items.values():
@@ -740,9 +1017,18 @@ class CollectionState():
 
     def update_reachable_regions(self, player: int):
         self.stale[player] = False
+        self._own_player(player)
         world: AutoWorld.World = self.multiworld.worlds[player]
         reachable_regions = self.reachable_regions[player]
-        queue = deque(self.blocked_connections[player])
+        items = self.prog_items[player]
+        track_item_conditions = world.explicit_indirect_conditions and isinstance(items, TrackingCounter)
+        if track_item_conditions:
+            # only retry what read the items that changed, or couldn't have its item reads recorded
+            item_conditions = self.multiworld.item_conditions.setdefault(player, EntranceItemConditions())
+            queue = deque(item_conditions.retry(self.blocked_connections[player], items.changed))
+            items.changed.clear()
+        else:
+            queue = deque(self.blocked_connections[player])
         start: Region = world.get_region(world.origin_region_name)
 
         # init on first call - this can't be done on construction since the regions don't exist yet
@@ -751,7 +1037,9 @@ class CollectionState():
             self.blocked_connections[player].update(start.exits)
             queue.extend(start.exits)
 
-        if world.explicit_indirect_conditions:
+        if track_item_conditions:
+            self._update_reachable_regions_tracked_item_conditions(player, queue)
+        elif world.explicit_indirect_conditions:
             self._update_reachable_regions_explicit_indirect_conditions(player, queue)
         else:
             self._update_reachable_regions_auto_indirect_conditions(player, queue)
@@ -780,6 +1068,41 @@ class CollectionState():
                     if new_entrance in blocked_connections and new_entrance not in queue:
                         queue.append(new_entrance)
 
+    def _update_reachable_regions_tracked_item_conditions(self, player: int, queue: deque):
+        reachable_regions = self.reachable_regions[player]
+        blocked_connections = self.blocked_connections[player]
+        item_conditions = self.multiworld.item_conditions[player]
+        items = self.prog_items[player]
+        # run BFS on all connections, and keep track of those blocked by missing items and which items they read
+        while queue:
+            connection = queue.popleft()
+            new_region = connection.connected_region
+            if new_region in reachable_regions:
+                blocked_connections.remove(connection)
+                continue
+            recorder = _ItemReadRecorder(items)
+            self.prog_items[player] = recorder
+            try:
+                reachable = connection.can_reach(self)
+            finally:
+                self.prog_items[player] = items
+            if not reachable:
+                item_conditions.record(connection, recorder.reads)
+                continue
+            if self.allow_partial_entrances and not new_region:
+                continue
+            assert new_region, f"tried to search through an Entrance \"{connection}\" with no connected Region"
+            reachable_regions.add(new_region)
+            blocked_connections.remove(connection)
+            blocked_connections.update(new_region.exits)
+            queue.extend(new_region.exits)
+            self.path[new_region] = (new_region.name, self.path.get(connection, None))
+
+            # Retry connections if the new region can unblock them
+            for new_entrance in self.multiworld.indirect_connections.get(new_region, set()):
+                if new_entrance in blocked_connections and new_entrance not in queue:
+                    queue.append(new_entrance)
+
     def _update_reachable_regions_auto_indirect_conditions(self, player: int, queue: deque):
         reachable_regions = self.reachable_regions[player]
         blocked_connections = self.blocked_connections[player]
@@ -805,7 +1128,16 @@ class CollectionState():
             # sweep for indirect connections, mostly Entrance.can_reach(unrelated_Region)
             queue.extend(blocked_connections)
 
-    def copy(self) -> CollectionState:
+    def copy(self, copy_on_write: bool = False) -> CollectionState:
+        """
+        Returns an independent copy of this state.
+
+        :param copy_on_write: share each player's prog_items, reachable_regions and blocked_connections with this state
+        instead of copying them, only copying a player's data once either state changes it. Meant for short-lived
+        speculative states that only change a few players.
+        """
+        if copy_on_write:
+            return self._copy_on_write()
         ret = CollectionState(self.multiworld)
         ret.prog_items = {player: counter.copy() for player, counter in self.prog_items.items()}
         ret.reachable_regions = {player: region_set.copy() for player, region_set in
@@ -820,6 +1152,36 @@ class CollectionState():
             ret = function(self, ret)
         return ret
 
+    def _copy_on_write(self) -> CollectionState:
+        # skip __init__, which would collect all precollected items only for them to be overwritten
+        ret = CollectionState.__new__(CollectionState)
+        ret.multiworld = self.multiworld
+        ret.prog_items = self.prog_items.copy()
+        ret.reachable_regions = self.reachable_regions.copy()
+        ret.blocked_connections = self.blocked_connections.copy()
+        # from now on both states have to copy a player's data before changing it
+        self.shared_players.update(self.prog_items)
+        ret.shared_players = set(self.prog_items)
+        ret.advancements = self.advancements.copy()
+        ret.path = self.path.copy()
+        ret.locations_checked = self.locations_checked.copy()
+        # reachable_regions are shared as-is, so they are exactly as up-to-date as this state's
+        ret.stale = self.stale.copy()
+        ret.allow_partial_entrances = self.allow_partial_entrances
+        for function in self.additional_init_functions:
+            function(ret, self.multiworld)
+        for function in self.additional_copy_functions:
+            ret = function(self, ret)
+        return ret
+
+    def _own_player(self, player: int) -> None:
+        """Copies the player's data shared with other states through copy-on-write, so it can be changed."""
+        if player in self.shared_players:
+            self.shared_players.remove(player)
+            self.prog_items[player] = self.prog_items[player].copy()
+            self.reachable_regions[player] = self.reachable_regions[player].copy()
+            self.blocked_connections[player] = self.blocked_connections[player].copy()
+
     def can_reach(self,
                   spot: Union[Location, Entrance, Region, str],
                   resolution_hint: Optional[str] = None,
@@ -851,19 +1213,43 @@ class CollectionState():
         return self.sweep_for_advancements(locations)
 
     def sweep_for_advancements(self, locations: Optional[Iterable[Location]] = None) -> None:
+        """Collect the items of all reachable advancement locations of locations, or of all filled locations,
+        until no more of them become reachable.
+
+        Locations are only tested once their region is reachable, and after that only when their player received
+        items, as reachability of a player's locations is assumed to only depend on that player's items."""
         if locations is None:
             locations = self.multiworld.get_filled_locations()
-        reachable_advancements = True
-        # since the loop has a good chance to run more than once, only filter the advancements once
-        locations = {location for location in locations if location.advancement and location not in self.advancements}
-
-        while reachable_advancements:
-            reachable_advancements = {location for location in locations if location.can_reach(self)}
-            locations -= reachable_advancements
+        # locations waiting for their region, by player and region. Regions stay reachable, as the state only grows.
+        waiting: Dict[int, Dict[Region, List[Location]]] = {}
+        # locations in reachable regions, by player
+        candidates: Dict[int, Set[Location]] = {}
+        for location in locations:
+            if location.advancement and location not in self.advancements:
+                if type(location).can_reach is Location.can_reach:
+                    assert location.parent_region, f"Location \"{location}\" has no parent_region"
+                    waiting.setdefault(location.player, {}).setdefault(location.parent_region, []).append(location)
+                else:  # reachability does not go through the region
+                    candidates.setdefault(location.player, set()).add(location)
+
+        players: Set[int] = set(waiting) | set(candidates)
+        while players:
+            reachable_advancements: List[Location] = []
+            for player in players:
+                player_candidates = candidates.setdefault(player, set())
+                player_waiting = waiting.get(player)
+                if player_waiting:
+                    for region in [region for region in player_waiting if region.can_reach(self)]:
+                        player_candidates.update(player_waiting.pop(region))
+                reachable_advancements.extend(location for location in player_candidates if location.can_reach(self))
+            players = set()
             for advancement in reachable_advancements:
+                candidates[advancement.player].remove(advancement)
                 self.advancements.add(advancement)
                 assert isinstance(advancement.item, Item), "tried to collect Event with no Item"
                 self.collect(advancement.item, True, advancement)
+                if waiting.get(advancement.item.player) or candidates.get(advancement.item.player):
+                    players.add(advancement.item.player)
 
     # item name related
     def has(self, item: str, player: int, count: int = 1) -> bool:
@@ -990,6 +1376,7 @@ class CollectionState():
         if location:
             self.locations_checked.add(location)
 
+        self._own_player(item.player)
         changed = self.multiworld.worlds[item.player].collect(self, item)
 
         self.stale[item.player] = True
@@ -1000,6 +1387,7 @@ class CollectionState():
         return changed
 
     def remove(self, item: Item):
+        self._own_player(item.player)
         changed = self.multiworld.worlds[item.player].remove(self, item)
         if changed:
             # invalidate caches, nothing can be trusted anymore now
@@ -1014,12 +1402,15 @@ class EntranceType(IntEnum):
 
 
 class Entrance:
+    # attributes every Entrance has are slotted, rules and attributes added by worlds go into __dict__
+    __slots__ = ("player", "name", "parent_region", "connected_region", "randomization_group", "randomization_type",
+                 "__dict__")
     access_rule: Callable[[CollectionState], bool] = staticmethod(lambda state: True)
     hide_path: bool = False
     player: int
     name: str
     parent_region: Optional[Region]
-    connected_region: Optional[Region] = None
+    connected_region: Optional[Region]
     randomization_group: int
     randomization_type: EntranceType
 
@@ -1027,6 +1418,7 @@ class Entrance:
                  randomization_group: int = 0, randomization_type: EntranceType = EntranceType.ONE_WAY) -> None:
         self.name = name
         self.parent_region = parent
+        self.connected_region = None
         self.player = player
         self.randomization_group = randomization_group
         self.randomization_type = randomization_type
@@ -1076,6 +1468,8 @@ class Entrance:
 
 
 class Region:
+    # attributes every Region has are slotted, attributes added by worlds go into __dict__
+    __slots__ = ("name", "_hint_text", "player", "multiworld", "entrances", "_exits", "_locations", "__dict__")
     name: str
     _hint_text: str
     player: int
@@ -1086,6 +1480,7 @@ class Region:
     entrance_type: ClassVar[type[Entrance]] = Entrance
 
     class Register(MutableSequence):
+        __slots__ = ("_list", "region_manager")
         region_manager: MultiWorld.RegionManager
 
         def __init__(self, region_manager: MultiWorld.RegionManager):
@@ -1112,18 +1507,22 @@ class Region:
             return self._list.copy()
 
     class LocationRegister(Register):
+        __slots__ = ()
+
         def __delitem__(self, index: int) -> None:
             location: Location = self._list.__getitem__(index)
             self._list.__delitem__(index)
-            del(self.region_manager.location_cache[location.player][location.name])
+            self.region_manager.remove_location(location)
 
         def insert(self, index: int, value: Location) -> None:
             assert value.name not in self.region_manager.location_cache[value.player], \
                 f"{value.name} already exists in the location cache."
             self._list.insert(index, value)
-            self.region_manager.location_cache[value.player][value.name] = value
+            self.region_manager.add_location(value)
 
     class EntranceRegister(Register):
+        __slots__ = ()
+
         def __delitem__(self, index: int) -> None:
             entrance: Entrance = self._list.__getitem__(index)
             self._list.__delitem__(index)
@@ -1305,24 +1704,39 @@ class LocationProgressType(IntEnum):
 
 
 class Location:
+    # attributes every Location has are slotted, rules and attributes added by worlds go into __dict__
+    __slots__ = ("player", "name", "address", "parent_region", "_item", "locked", "__dict__")
     game: str = "Generic"
     player: int
     name: str
     address: Optional[int]
     parent_region: Optional[Region]
-    locked: bool = False
+    locked: bool
     show_in_spoiler: bool = True
     progress_type: LocationProgressType = LocationProgressType.DEFAULT
     always_allow: Callable[[CollectionState, Item], bool] = staticmethod(lambda state, item: False)
     access_rule: Callable[[CollectionState], bool] = staticmethod(lambda state: True)
     item_rule: Callable[[Item], bool] = staticmethod(lambda item: True)
-    item: Optional[Item] = None
+    _item: Optional[Item]
 
     def __init__(self, player: int, name: str = '', address: Optional[int] = None, parent: Optional[Region] = None):
         self.player = player
         self.name = name
         self.address = address
         self.parent_region = parent
+        self._item = None
+        self.locked = False
+
+    @property
+    def item(self) -> Optional[Item]:
+        return self._item
+
+    @item.setter
+    def item(self, item: Optional[Item]) -> None:
+        self._item = item
+        if self.parent_region and self.parent_region.multiworld:
+            # keep the fill status indexes of the multiworld up to date, if this location is registered to it
+            self.parent_region.multiworld.regions.update_fill_status(self)
 
     def can_fill(self, state: CollectionState, item: Item, check_access: bool = True) -> bool:
         return ((
@@ -1509,30 +1923,32 @@ class Spoiler:
             self.entrances[(entrance, direction, player)] = \
                 {"player": player, "entrance": entrance, "exit": exit_, "direction": direction}
 
-    def create_playthrough(self, create_paths: bool = True) -> None:
-        """Destructive to the multiworld while it is run, damage gets repaired afterwards."""
+    def create_playthrough(self, create_paths: bool = True, analysis: Optional[SphereAnalysis] = None) -> None:
+        """
+        Destructive to the multiworld while it is run, damage gets repaired afterwards.
+
+        :param analysis: analysis of the current placement to build the playthrough from, instead of computing one
+        """
         from itertools import chain
         # get locations containing progress items
         multiworld = self.multiworld
         prog_locations = {location for location in multiworld.get_filled_locations() if location.item.advancement}
-        state_cache: List[Optional[CollectionState]] = [None]
         collection_spheres: List[Set[Location]] = []
-        state = CollectionState(multiworld)
+        if analysis is None:
+            analysis = SphereAnalysis(multiworld)
         sphere_candidates = set(prog_locations)
         logging.debug('Building up collection spheres.')
         while sphere_candidates:
 
             # build up spheres of collection radius.
             # Everything in each sphere is independent from each other in dependencies and only depends on lower spheres
+            # non-progression items don't change logic, so these are the progression parts of the shared spheres
 
-            sphere = {location for location in sphere_candidates if state.can_reach(location)}
-
-            for location in sphere:
-                state.collect(location.item, True, location)
+            analysis_sphere = analysis.get_sphere(len(collection_spheres))
+            sphere = {location for location in sphere_candidates if analysis_sphere and location in analysis_sphere}
 
             sphere_candidates -= sphere
             collection_spheres.append(sphere)
-            state_cache.append(state.copy())
 
             logging.debug('Calculated sphere %i, containing %i of %i progress items.', len(collection_spheres),
                           len(sphere),
@@ -1548,6 +1964,10 @@ class Spoiler:
                     self.unreachables = sphere_candidates
                     break
 
+        # the state each sphere was reached with, an empty trailing sphere has nothing to check
+        state_cache: List[Optional[CollectionState]] = [analysis.states[num] if num < len(analysis.states) else None
+                                                        for num in range(len(collection_spheres))]
+
         # in the second phase, we cull each sphere such that the game is still beatable,
         # reducing each range of influence to the bare minimum required inside it
         restore_later: Dict[Location, Item] = {}
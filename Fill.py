@@ -1,10 +1,11 @@
+import bisect
 import collections
 import itertools
 import logging
 import typing
 from collections import Counter, deque
 
-from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld
+from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld, SphereAnalysis
 from Options import Accessibility
 
 from worlds.AutoWorld import call_all
@@ -26,13 +27,179 @@ def _log_fill_progress(name: str, placed: int, total_items: int) -> None:
 
 def sweep_from_pool(base_state: CollectionState, itempool: typing.Sequence[Item] = tuple(),
                     locations: typing.Optional[typing.List[Location]] = None) -> CollectionState:
-    new_state = base_state.copy()
+    new_state = base_state.copy(copy_on_write=True)
     for item in itempool:
         new_state.collect(item, True)
     new_state.sweep_for_advancements(locations=locations)
     return new_state
 
 
+class MaximumExplorationState:
+    """
+    Keeps the result of `sweep_from_pool(base_state, itempool)` up to date while items leave or re-enter the pool.
+    Players that can't be affected by the removed items keep their swept advancements and reachability, so the sweep
+    only has to start over for the others.
+    Like CollectionState's reachability cache, this relies on a player's locations only depending on that player's
+    items.
+    """
+    base_state: CollectionState
+    state: CollectionState
+    player: typing.Optional[int]
+
+    def __init__(self, base_state: CollectionState, itempool: typing.Sequence[Item],
+                 player: typing.Optional[int] = None) -> None:
+        """
+        :param base_state: State assumed before the pool is collected, is not modified.
+        :param itempool: Items currently in the pool.
+        :param player: if set, only sweep this player's locations.
+        """
+        self.base_state = base_state
+        self.player = player
+        self.state = sweep_from_pool(base_state, itempool, self._sweep_locations())
+
+    def _sweep_locations(self) -> typing.Optional[typing.List[Location]]:
+        if self.player is None:
+            return None
+        return self.base_state.multiworld.get_filled_locations(self.player)
+
+    def update(self, itempool: typing.Sequence[Item], removed: typing.Iterable[Item] = ()) -> CollectionState:
+        """
+        Sweep again after `removed` left the pool. Items that were added to the pool need no special care.
+        Placements at already swept locations must not have changed since the last sweep.
+        """
+        old_state = self.state
+        swept = [location for location in old_state.advancements if location not in self.base_state.advancements]
+        affected: typing.Set[int] = {item.player for item in removed}
+        # advancements swept in an affected world might not be reachable anymore,
+        # which in turn affects the players receiving those items
+        while True:
+            newly_affected = {location.item.player for location in swept
+                              if location.player in affected and location.item.player not in affected}
+            if not newly_affected:
+                break
+            affected |= newly_affected
+
+        # items are collected again instead of removed, as removing is not guaranteed to be the exact inverse
+        state = self.base_state.copy(copy_on_write=True)
+        for item in itempool:
+            state.collect(item, True)
+        for location in swept:
+            if location.player not in affected:
+                state.advancements.add(location)
+                state.collect(location.item, True, location)
+        # unaffected players have at least the items they had before, so their reachability is a valid starting point
+        for player in state.reachable_regions:
+            if player not in affected:
+                state.reachable_regions[player] = old_state.reachable_regions[player]
+                state.blocked_connections[player] = old_state.blocked_connections[player]
+                state.stale[player] |= old_state.stale[player]
+                if player in old_state.shared_players:
+                    # the old state might not have changed them yet, so they can still belong to base_state
+                    state.shared_players.add(player)
+        state.sweep_for_advancements(self._sweep_locations())
+        self.state = state
+        return state
+
+
+class _PlacementBucket:
+    __slots__ = ("player", "progress_type", "item_rule", "always_allow", "custom_can_fill", "locations")
+
+    def __init__(self, location: Location) -> None:
+        self.player = location.player
+        self.progress_type = location.progress_type
+        self.item_rule = location.item_rule
+        self.always_allow = location.always_allow
+        self.custom_can_fill = type(location).can_fill is not Location.can_fill
+        self.locations: typing.List[Location] = []
+
+
+class PlacementCandidates:
+    """
+    Index of the open locations of fill_restrictive, to find the first location that can_fill an item without calling
+    can_fill for every location before it.
+    Locations are bucketed by what can_fill gets from them besides reachability: player, progress type, item_rule and
+    always_allow. Those are evaluated once per bucket and item, so a restrictive item skips whole buckets.
+    locality_rules and the rule objects of worlds.generic.Rules let locations share their item_rule.
+    Locations of classes that override can_fill are bucketed by player and class, and asked one by one instead.
+    """
+    buckets: typing.Dict[typing.Hashable, _PlacementBucket]
+    position: typing.Dict[Location, int]
+    location_bucket: typing.Dict[Location, _PlacementBucket]
+
+    def __init__(self, locations: typing.Iterable[Location]) -> None:
+        self.buckets = {}
+        self.position = {}
+        self.location_bucket = {}
+        self.filled: typing.Set[Location] = set()
+        for position, location in enumerate(locations):
+            if type(location).can_fill is not Location.can_fill:
+                key = location.player, type(location)
+                bucket = self.buckets.get(key)
+            else:
+                key = location.player, location.progress_type, location.item_rule, location.always_allow
+                try:
+                    bucket = self.buckets.get(key)
+                except TypeError:  # unhashable rule, only share the bucket with the same object
+                    key = location.player, location.progress_type, id(location.item_rule), id(location.always_allow)
+                    bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = _PlacementBucket(location)
+            bucket.locations.append(location)
+            self.position[location] = position
+            self.location_bucket[location] = bucket
+
+    def __len__(self) -> int:
+        return len(self.position) - len(self.filled)
+
+    def find(self, state: CollectionState, item: Item, check_access: bool = True,
+             player: typing.Optional[int] = None) -> typing.Optional[Location]:
+        """
+        Return the first open location in the original order that can_fill item, or None.
+        :param player: if set, only consider this player's locations.
+        """
+        non_local = item.name in state.multiworld.worlds[item.player].options.non_local_items
+        important = item.advancement or item.useful
+        position = self.position
+        found: typing.Optional[Location] = None
+        found_position = len(position)
+        for bucket in self.buckets.values():
+            locations = bucket.locations
+            if not locations or (player is not None and bucket.player != player) \
+                    or position[locations[0]] >= found_position:
+                continue
+            if bucket.custom_can_fill:
+                for location in locations:
+                    if position[location] >= found_position:
+                        break
+                    if location.can_fill(state, item, check_access):
+                        found = location
+                        found_position = position[location]
+                        break
+            elif bucket.always_allow is not Location.always_allow and bucket.always_allow(state, item) \
+                    and not non_local:
+                found = locations[0]
+                found_position = position[found]
+            elif (bucket.progress_type != LocationProgressType.EXCLUDED or not important) and bucket.item_rule(item):
+                for location in locations:
+                    if position[location] >= found_position:
+                        break
+                    if not check_access or location.can_reach(state):
+                        found = location
+                        found_position = position[location]
+                        break
+        return found
+
+    def remove(self, location: Location) -> None:
+        """Mark a location returned by find as filled."""
+        locations = self.location_bucket[location].locations
+        del locations[bisect.bisect_left(locations, self.position[location], key=self.position.__getitem__)]
+        self.filled.add(location)
+
+    def remaining(self, locations: typing.Iterable[Location]) -> typing.List[Location]:
+        """Filter out the filled locations."""
+        return [location for location in locations if location not in self.filled]
+
+
 def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locations: typing.List[Location],
                      item_pool: typing.List[Item], single_player_placement: bool = False, lock: bool = False,
                      swap: bool = True, on_place: typing.Optional[typing.Callable[[Location], None]] = None,
@@ -56,6 +223,9 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
     cleanup_required = False
     swapped_items: typing.Counter[typing.Tuple[int, str, bool]] = Counter()
     reachable_items: typing.Dict[int, typing.Deque[Item]] = {}
+    exploration: typing.Optional[MaximumExplorationState] = None
+    # filled locations are removed from the list all at once after placing
+    candidates = PlacementCandidates(locations)
     for item in item_pool:
         reachable_items.setdefault(item.player, deque()).append(item)
 
@@ -63,7 +233,7 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
     total = min(len(item_pool), len(locations))
     placed = 0
 
-    while any(reachable_items.values()) and locations:
+    while any(reachable_items.values()) and candidates:
         if one_item_per_player:
             # grab one item per player
             items_to_place = [items.pop()
@@ -82,15 +252,18 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
                     del item_pool[-p]
                     break
 
-        maximum_exploration_state = sweep_from_pool(
-            base_state, item_pool + unplaced_items, multiworld.get_filled_locations(item.player)
-            if single_player_placement else None)
+        sweep_player = item.player if single_player_placement else None
+        if exploration is None or exploration.player != sweep_player:
+            exploration = MaximumExplorationState(base_state, item_pool + unplaced_items, sweep_player)
+        else:
+            exploration.update(item_pool + unplaced_items, items_to_place)
+        maximum_exploration_state = exploration.state
 
         has_beaten_game = multiworld.has_beaten_game(maximum_exploration_state)
 
         while items_to_place:
             # if we have run out of locations to fill,break out of this loop
-            if not locations:
+            if not candidates:
                 unplaced_items += items_to_place
                 break
             item_to_place = items_to_place.pop(0)
@@ -105,14 +278,10 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
             else:
                 perform_access_check = True
 
-            for i, location in enumerate(locations):
-                if (not single_player_placement or location.player == item_to_place.player) \
-                        and location.can_fill(maximum_exploration_state, item_to_place, perform_access_check):
-                    # popping by index is faster than removing by content,
-                    spot_to_fill = locations.pop(i)
-                    # skipping a scan for the element
-                    break
-
+            spot_to_fill = candidates.find(maximum_exploration_state, item_to_place, perform_access_check,
+                                           item_to_place.player if single_player_placement else None)
+            if spot_to_fill is not None:
+                candidates.remove(spot_to_fill)
             else:
                 # we filled all reachable spots.
                 if swap:
@@ -140,7 +309,7 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
                                 and location.can_fill(swap_state, item_to_place, perform_access_check):
 
                             # Verify placing this item won't reduce available locations, which would be a useless swap.
-                            prev_state = swap_state.copy()
+                            prev_state = swap_state.copy(copy_on_write=True)
                             prev_loc_count = len(
                                 multiworld.get_reachable_locations(prev_state))
 
@@ -162,6 +331,8 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
 
                                 # cleanup at the end to hopefully get better errors
                                 cleanup_required = True
+                                # placements changed under already swept advancements, start over next round
+                                exploration = None
 
                                 break
 
@@ -185,6 +356,8 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
             if on_place:
                 on_place(spot_to_fill)
 
+    locations[:] = candidates.remaining(locations)
+
     if total > 1000:
         _log_fill_progress(name, placed, total)
 
@@ -714,11 +887,17 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
         if len(total_locations_count) == 0:
             return
 
+        # until the first swap, the spheres balancing walks through are those of the current placement
+        analysis: typing.Optional[SphereAnalysis] = SphereAnalysis(multiworld)
+
         while True:
             # Gather non-locked locations.
             # This ensures that only shuffled locations get counted for progression balancing,
             #   i.e. the items the players will be checking.
-            sphere_locations = get_sphere_locations(state, unchecked_locations)
+            if analysis:
+                sphere_locations = set(analysis.get_sphere(sphere_num - 1) or ())
+            else:
+                sphere_locations = get_sphere_locations(state, unchecked_locations)
             for location in sphere_locations:
                 unchecked_locations.remove(location)
                 if not location.locked:
@@ -748,7 +927,7 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                         and item_percentage(player, reachables) < threshold_percentages[player])
                 }
                 if balancing_players:
-                    balancing_state = state.copy()
+                    balancing_state = state.copy(copy_on_write=True)
                     balancing_unchecked_locations = unchecked_locations.copy()
                     balancing_reachables = reachable_locations_count.copy()
                     balancing_sphere = sphere_locations.copy()
@@ -791,7 +970,7 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                         multiworld.random.shuffle(items_to_test)
                         while items_to_test:
                             testing = items_to_test.pop()
-                            reducing_state = state.copy()
+                            reducing_state = state.copy(copy_on_write=True)
                             for location in itertools.chain((
                                 l for l in items_to_replace
                                 if l.item.player == player
@@ -826,6 +1005,7 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                                     old_location.can_fill(state, new_location.item, False):
                                 replacement_locations.pop(i)
                                 swap_location_item(old_location, new_location)
+                                analysis = None
                                 logging.debug(f"Progression balancing moved {new_location.item} to {new_location}, "
                                               f"displacing {old_location.item} into {old_location}")
                                 moved_item_count += 1
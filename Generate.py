@@ -10,7 +10,7 @@ import sys
 import urllib.parse
 import urllib.request
 from collections import Counter
-from typing import Any, Dict, Tuple, Union
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
 from itertools import chain
 
 import ModuleUpdate
@@ -57,12 +57,33 @@ def mystery_argparse():
     parser.add_argument("--spoiler_only", action="store_true",
                         help="Skips generation assertion and multidata, outputting only a spoiler log. "
                              "Intended for debugging and testing purposes.")
+    parser.add_argument("--batch", type=int, default=0,
+                        help="Generate this many seeds per player file set, loading worlds only once and forking "
+                             "worker processes from the loaded state. Consecutive seeds are used if --seed is given.")
+    parser.add_argument("--batch_path",
+                        help="Directory of player file sets for batch generation. "
+                             "Each subdirectory is used as a --player_files_path of its own.")
+    parser.add_argument("--workers", type=lambda value: max(int(value), 1), default=os.cpu_count() or 1,
+                        help="Number of worker processes to use for batch generation.")
+    parser.add_argument("--output_processes", type=int, default=0,
+                        help="Run the accessibility check and the output of each world in up to this many processes "
+                             "forked once fill is done, instead of in threads of the generating process. "
+                             "Only available on platforms that can fork.")
+    parser.add_argument("--profile", action="store_true",
+                        help="Measure time and memory of each generation stage, world and player, and write them "
+                             "to a JSON summary and a trace for chrome://tracing next to the output.")
     args = parser.parse_args()
 
     if args.skip_output and args.spoiler_only:
         parser.error("Cannot mix --skip_output and --spoiler_only")
     elif args.spoiler == 0 and args.spoiler_only:
         parser.error("Cannot use --spoiler_only when --spoiler=0. Use --skip_output or set --spoiler to a different value")
+    if args.batch < 0:
+        parser.error("--batch has to be a positive number of seeds")
+    if args.batch_path:
+        if not os.path.isdir(args.batch_path):
+            parser.error(f"--batch_path {args.batch_path} is not a directory")
+        args.batch = max(args.batch, 1)
 
     if not os.path.isabs(args.weights_file_path):
         args.weights_file_path = os.path.join(args.player_files_path, args.weights_file_path)
@@ -73,13 +94,17 @@ def mystery_argparse():
     return args
 
 
+_worlds_preloaded: bool = False
+
+
 def get_seed_name(random_source) -> str:
     return f"{random_source.randint(0, pow(10, seeddigits) - 1)}".zfill(seeddigits)
 
 
 def main(args=None) -> Tuple[argparse.Namespace, int]:
     # __name__ == "__main__" check so unittests that already imported worlds don't trip this.
-    if __name__ == "__main__" and "worlds" in sys.modules:
+    # batch workers are forked after logging init, with worlds loaded on purpose.
+    if __name__ == "__main__" and "worlds" in sys.modules and not _worlds_preloaded:
         raise Exception("Worlds system should not be loaded before logging init.")
 
     if not args:
@@ -179,6 +204,8 @@ def main(args=None) -> Tuple[argparse.Namespace, int]:
     erargs.spoiler_only = args.spoiler_only
     erargs.name = {}
     erargs.csv_output = args.csv_output
+    erargs.output_processes = args.output_processes
+    erargs.profile = args.profile
 
     settings_cache: Dict[str, Tuple[argparse.Namespace, ...]] = \
         {fname: (tuple(roll_settings(yaml, args.plando) for yaml in yamls) if args.sameoptions else None)
@@ -242,6 +269,97 @@ def main(args=None) -> Tuple[argparse.Namespace, int]:
     return erargs, seed
 
 
+class BatchResult(NamedTuple):
+    player_files_path: str
+    seed: int
+    seed_name: str
+    duration: float
+    error: Optional[str]
+
+
+def generate_batch_seed(args: argparse.Namespace) -> BatchResult:
+    """Runs a full generation for one seed of a batch. Expected to run in a worker forked from batch_main."""
+    import time
+    import traceback
+    from Main import main as ERmain
+
+    start = time.perf_counter()
+    seed_name = ""
+    try:
+        erargs, seed = main(args)
+        seed_name = erargs.outputname
+        ERmain(erargs, seed)
+    except KeyboardInterrupt:
+        raise
+    except BaseException:
+        # includes SystemExit, which would otherwise take the worker down without a result
+        logging.exception(f"Seed {args.seed} of {args.player_files_path} failed.")
+        error = traceback.format_exc()
+    else:
+        error = None
+    return BatchResult(args.player_files_path, args.seed, seed_name, time.perf_counter() - start, error)
+
+
+def batch_main(args: argparse.Namespace) -> List[BatchResult]:
+    """
+    Generates args.batch seeds for each player file set.
+
+    Worlds are imported once in this process, then every seed is generated in a freshly forked worker,
+    so each seed starts from the same pristine registry without paying for the import again.
+    Platforms without fork generate the seeds one after another in this process instead.
+    """
+    import multiprocessing
+    import time
+    global _worlds_preloaded
+
+    Utils.init_logging("Generate_batch", loglevel=args.log_level, add_timestamp=args.log_time)
+    _worlds_preloaded = True
+    start = time.perf_counter()
+    import worlds
+    logging.info(f"Loaded {len(worlds.AutoWorldRegister.world_types)} worlds in {time.perf_counter() - start:.2f} s.")
+
+    if args.batch_path:
+        player_files_paths = sorted((entry.path for entry in os.scandir(args.batch_path) if entry.is_dir()),
+                                    key=str.casefold)
+        if not player_files_paths:
+            raise ValueError(f"No player file sets found in {args.batch_path}.")
+    else:
+        player_files_paths = [args.player_files_path]
+
+    jobs: List[argparse.Namespace] = []
+    for player_files_path in player_files_paths:
+        for index in range(args.batch):
+            # every seed gets its own args, as generation fills in and changes some of them
+            job = copy.deepcopy(args)
+            job.player_files_path = player_files_path
+            job.seed = get_seed(None if args.seed is None else args.seed + index)
+            jobs.append(job)
+
+    logging.info(f"Generating {len(jobs)} seed{'s' if len(jobs) != 1 else ''} "
+                 f"from {len(player_files_paths)} player file set{'s' if len(player_files_paths) != 1 else ''}.")
+    if "fork" in multiprocessing.get_all_start_methods():
+        workers = min(args.workers, len(jobs))
+        # one seed per worker, so state a world leaves behind never leaks into the next seed
+        with multiprocessing.get_context("fork").Pool(workers, maxtasksperchild=1) as pool:
+            results = pool.map(generate_batch_seed, jobs, chunksize=1)
+    else:
+        logging.warning("Forking is not supported on this platform, generating batch seeds sequentially.")
+        results = [generate_batch_seed(job) for job in jobs]
+        # every seed initialized logging for itself, get the batch log back for the report
+        Utils.init_logging("Generate_batch", loglevel=args.log_level, add_timestamp=args.log_time)
+
+    for result in results:
+        status = "failed" if result.error else "done"
+        logging.info(f"{status:>6} {result.duration:8.2f} s  seed {result.seed} {result.seed_name} "
+                     f"({result.player_files_path})")
+    failures = [result for result in results if result.error]
+    for result in failures:
+        logging.error(f"Seed {result.seed} of {result.player_files_path} failed:\n{result.error}")
+    logging.info(f"Batch finished in {time.perf_counter() - start:.2f} s: "
+                 f"{len(results) - len(failures)} generated, {len(failures)} failed.")
+    return results
+
+
 def read_weights_yamls(path) -> Tuple[Any, ...]:
     try:
         if urllib.parse.urlparse(path).scheme in ('https', 'file'):
@@ -576,7 +694,14 @@ def roll_alttp_settings(ret: argparse.Namespace, weights):
 if __name__ == '__main__':
     import atexit
     confirmation = atexit.register(input, "Press enter to close.")
-    erargs, seed = main()
+    args = mystery_argparse()
+    if args.batch:
+        batch_results = batch_main(args)
+        if any(result.error for result in batch_results):
+            sys.exit(1)
+        atexit.unregister(confirmation)
+        sys.exit(0)
+    erargs, seed = main(args)
     from Main import main as ERmain
     multiworld = ERmain(erargs, seed)
     if __debug__:
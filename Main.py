@@ -1,19 +1,26 @@
 import collections
 import concurrent.futures
+import io
 import logging
+import multiprocessing
 import os
 import pickle
 import tempfile
+import threading
 import time
+import traceback
 import zipfile
-import zlib
-from typing import Dict, List, Optional, Set, Tuple, Union
+from contextlib import contextmanager
+from functools import partial
+from multiprocessing.pool import RemoteTraceback
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
 
 import worlds
-from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld, Region
+from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld, Region, SphereAnalysis
 from Fill import FillError, balance_multiworld_progression, distribute_items_restrictive, distribute_planned, \
     flood_items
 from Options import StartInventoryPool
+from generation_profiler import GenerationProfiler, measure, measure_call
 from Utils import __version__, output_path, version_tuple, get_settings
 from settings import get_settings
 from worlds import AutoWorld
@@ -21,8 +28,31 @@ from worlds.generic.Rules import exclusion_rules, locality_rules
 
 __all__ = ["main"]
 
+OutputTask = Tuple[Callable[..., Any], Tuple[Any, ...]]
 
-def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = None):
+
+def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = None,
+         output_sink: Optional[Callable[[str, Dict[str, Any]], Any]] = None):
+    """Generate a multiworld from args.
+    If output_sink is passed, it is called with the folder holding the generated output files and the multidata,
+    instead of encoding the multidata to a file and creating the final zip archive.
+    If args.profile is set, the generation is profiled and the results are written next to the output,
+    even if the generation fails."""
+    if not args.profile:
+        return _main(args, seed, baked_server_options, output_sink, None)
+
+    profiler = GenerationProfiler()
+    try:
+        return _main(args, seed, baked_server_options, output_sink, profiler)
+    finally:
+        summary_path = output_path(f"AP_{profiler.seed_name}_Profile.json")
+        trace_path = output_path(f"AP_{profiler.seed_name}_Trace.json")
+        profiler.write(summary_path, trace_path)
+        logging.info(f"Wrote generation profile to {summary_path} and {trace_path}")
+
+
+def _main(args, seed: Optional[int], baked_server_options: Optional[Dict[str, object]],
+          output_sink: Optional[Callable[[str, Dict[str, Any]], Any]], profiler: Optional[GenerationProfiler]):
     if not baked_server_options:
         baked_server_options = get_settings().server_options.as_dict()
     assert isinstance(baked_server_options, dict)
@@ -33,6 +63,7 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
     start = time.perf_counter()
     # initialize the multiworld
     multiworld = MultiWorld(args.multi)
+    multiworld.profiler = profiler
 
     logger = logging.getLogger()
     multiworld.set_seed(seed, args.race, str(args.outputname) if args.outputname else None)
@@ -44,8 +75,12 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
     multiworld.player_name = args.name.copy()
     multiworld.sprite = args.sprite.copy()
     multiworld.sprite_pool = args.sprite_pool.copy()
+    if profiler:
+        profiler.seed_name = multiworld.seed_name
+        profiler.player_names = multiworld.player_name
 
-    multiworld.set_options(args)
+    with measure(profiler, "set_options"):
+        multiworld.set_options(args)
     if args.csv_output:
         from Options import dump_player_options
         dump_player_options(multiworld)
@@ -68,7 +103,8 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
 
     # This assertion method should not be necessary to run if we are not outputting any multidata.
     if not args.skip_output and not args.spoiler_only:
-        AutoWorld.call_stage(multiworld, "assert_generate")
+        with measure(profiler, "assert_generate"):
+            AutoWorld.call_stage(multiworld, "assert_generate")
 
     AutoWorld.call_all(multiworld, "generate_early")
 
@@ -173,14 +209,16 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
         assert len(multiworld.itempool) == len(new_itempool), "Item Pool amounts should not change."
         multiworld.itempool[:] = new_itempool
 
-    multiworld.link_items()
+    with measure(profiler, "link_items"):
+        multiworld.link_items()
 
     if any(multiworld.item_links.values()):
         multiworld._all_state = None
 
     logger.info("Running Item Plando.")
 
-    distribute_planned(multiworld)
+    with measure(profiler, "distribute_planned"):
+        distribute_planned(multiworld)
 
     logger.info('Running Pre Main Fill.')
 
@@ -189,14 +227,17 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
     logger.info(f'Filling the multiworld with {len(multiworld.itempool)} items.')
 
     if multiworld.algorithm == 'flood':
-        flood_items(multiworld)  # different algo, biased towards early game progress items
+        with measure(profiler, "flood_items"):
+            flood_items(multiworld)  # different algo, biased towards early game progress items
     elif multiworld.algorithm == 'balanced':
-        distribute_items_restrictive(multiworld, get_settings().generator.panic_method)
+        with measure(profiler, "distribute_items_restrictive"):
+            distribute_items_restrictive(multiworld, get_settings().generator.panic_method)
 
     AutoWorld.call_all(multiworld, 'post_fill')
 
     if multiworld.players > 1 and not args.skip_prog_balancing:
-        balance_multiworld_progression(multiworld)
+        with measure(profiler, "balance_multiworld_progression"):
+            balance_multiworld_progression(multiworld)
     else:
         logger.info("Progression balancing skipped.")
 
@@ -209,13 +250,17 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
 
     logger.info(f'Beginning output...')
     outfilebase = 'AP_' + multiworld.seed_name
+    # the placement is final now, so the spoiler and the output can share one analysis of its spheres
+    sphere_analysis = SphereAnalysis(multiworld)
 
     if args.spoiler_only:
         if args.spoiler > 1:
             logger.info('Calculating playthrough.')
-            multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2)
+            with measure(profiler, "create_playthrough"):
+                multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2, analysis=sphere_analysis)
 
-        multiworld.spoiler.to_file(output_path('%s_Spoiler.txt' % outfilebase))
+        with measure(profiler, "spoiler"):
+            multiworld.spoiler.to_file(output_path('%s_Spoiler.txt' % outfilebase))
         logger.info('Done. Skipped multidata modification. Total time: %s', time.perf_counter() - start)
         return multiworld
 
@@ -223,14 +268,19 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
     with output as temp_dir:
         output_players = [player for player in multiworld.player_ids if AutoWorld.World.generate_output.__code__
                           is not multiworld.worlds[player].generate_output.__code__]
-        with concurrent.futures.ThreadPoolExecutor(len(output_players) + 2) as pool:
-            check_accessibility_task = pool.submit(multiworld.fulfills_accessibility)
-
-            output_file_futures = [pool.submit(AutoWorld.call_stage, multiworld, "generate_output", temp_dir)]
-            for player in output_players:
-                # skip starting a thread for methods that say "pass".
-                output_file_futures.append(
-                    pool.submit(AutoWorld.call_single, multiworld, "generate_output", player, temp_dir))
+        output_tasks: List[OutputTask] = [
+            (measure_call, (profiler, "fulfills_accessibility", multiworld.fulfills_accessibility, None,
+                            sphere_analysis)),
+            (AutoWorld.call_stage, (multiworld, "generate_output", temp_dir)),
+        ]
+        # skip starting a thread or process for methods that say "pass".
+        output_tasks += [(AutoWorld.call_single, (multiworld, "generate_output", player, temp_dir))
+                         for player in output_players]
+        output_processes = _get_output_processes(args.output_processes, len(output_tasks))
+
+        with measure(profiler, "output"), concurrent.futures.ThreadPoolExecutor(len(output_tasks)) as pool, \
+                _run_output_tasks(multiworld, output_tasks, output_processes, pool) as output_task_futures:
+            check_accessibility_task, *output_file_futures = output_task_futures
 
             # collect ER hint info
             er_hint_data: Dict[int, Dict[int, str]] = {}
@@ -261,7 +311,7 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
                 precollected_hints = {player: set() for player in range(1, multiworld.players + 1 + len(multiworld.groups))}
 
                 for slot in multiworld.player_ids:
-                    slot_data[slot] = multiworld.worlds[slot].fill_slot_data()
+                    slot_data[slot] = AutoWorld.call_single(multiworld, "fill_slot_data", slot)
 
                 def precollect_hint(location: Location, auto_status: HintStatus):
                     entrance = er_hint_data.get(location.player, {}).get(location.address, "")
@@ -306,7 +356,7 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
 
                 # get spheres -> filter address==None -> skip empty
                 spheres: List[Dict[int, Set[int]]] = []
-                for sphere in multiworld.get_sendable_spheres():
+                for sphere in multiworld.get_sendable_spheres(sphere_analysis):
                     current_sphere: Dict[int, Set[int]] = collections.defaultdict(set)
                     for sphere_location in sphere:
                         current_sphere[sphere_location.player].add(sphere_location.address)
@@ -334,15 +384,15 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
                 }
                 AutoWorld.call_all(multiworld, "modify_multidata", multidata)
 
-                multidata = zlib.compress(pickle.dumps(multidata), 9)
-
+                if output_sink:
+                    return multidata  # handed to output_sink without encoding it first
                 with open(os.path.join(temp_dir, f'{outfilebase}.archipelago'), 'wb') as f:
-                    f.write(bytes([3]))  # version of format
-                    f.write(multidata)
+                    f.write(NetUtils.encode_multidata(multidata))
 
-            output_file_futures.append(pool.submit(write_multidata))
+            multidata_task = pool.submit(measure_call, profiler, "write_multidata", write_multidata)
+            output_file_futures.append(multidata_task)
             if not check_accessibility_task.result():
-                if not multiworld.can_beat_game():
+                if not sphere_analysis.can_beat_game():
                     raise FillError("Game appears as unbeatable. Aborting.", multiworld=multiworld)
                 else:
                     logger.warning("Location Accessibility requirements not fulfilled.")
@@ -355,17 +405,209 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
 
         if args.spoiler > 1:
             logger.info('Calculating playthrough.')
-            multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2)
+            with measure(profiler, "create_playthrough"):
+                multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2, analysis=sphere_analysis)
 
         if args.spoiler:
-            multiworld.spoiler.to_file(os.path.join(temp_dir, '%s_Spoiler.txt' % outfilebase))
-
-        zipfilename = output_path(f"AP_{multiworld.seed_name}.zip")
-        logger.info(f"Creating final archive at {zipfilename}")
-        with zipfile.ZipFile(zipfilename, mode="w", compression=zipfile.ZIP_DEFLATED,
-                             compresslevel=9) as zf:
-            for file in os.scandir(temp_dir):
-                zf.write(file.path, arcname=file.name)
+            with measure(profiler, "spoiler"):
+                multiworld.spoiler.to_file(os.path.join(temp_dir, '%s_Spoiler.txt' % outfilebase))
+
+        if output_sink:
+            with measure(profiler, "output_sink"):
+                output_sink(temp_dir, multidata_task.result())
+        else:
+            zipfilename = output_path(f"AP_{multiworld.seed_name}.zip")
+            logger.info(f"Creating final archive at {zipfilename}")
+            with measure(profiler, "write_archive"), \
+                    zipfile.ZipFile(zipfilename, mode="w", compression=zipfile.ZIP_DEFLATED, compresslevel=9) as zf:
+                for file in os.scandir(temp_dir):
+                    zf.write(file.path, arcname=file.name)
 
     logger.info('Done. Enjoy. Total Time: %s', time.perf_counter() - start)
     return multiworld
+
+
+def _get_output_processes(requested: int, task_count: int) -> int:
+    """Returns how many processes to fork for the output stage, 0 to run it in threads of this process."""
+    if requested <= 0:
+        return 0
+    if "fork" not in multiprocessing.get_all_start_methods():
+        logging.warning("Forking is not supported on this platform, generating output in threads instead.")
+        return 0
+    if multiprocessing.current_process().daemon:
+        # batch generation workers are daemonic, which are not allowed to have children
+        logging.info("Generating output in threads, as this generation already runs in a worker process.")
+        return 0
+    return min(requested, task_count)
+
+
+# Forked output processes inherit the finished multiworld and their task from these, instead of getting them pickled.
+_output_multiworld: Optional[MultiWorld] = None
+_output_tasks: List[OutputTask] = []
+_output_objects: Dict[int, object] = {}
+"""objects of the multiworld that output processes send back as references instead of copies, by id"""
+
+
+class _OutputPickler(pickle.Pickler):
+    def persistent_id(self, obj: object) -> Optional[int]:
+        # forked processes share the address of every object that existed before the fork
+        if id(obj) in _output_objects and _output_objects[id(obj)] is obj:
+            return id(obj)
+        return None
+
+
+class _OutputUnpickler(pickle.Unpickler):
+    def persistent_load(self, pid: int) -> object:
+        return _output_objects[pid]
+
+
+def _dumps(obj: object) -> bytes:
+    buffer = io.BytesIO()
+    _OutputPickler(buffer, pickle.HIGHEST_PROTOCOL).dump(obj)
+    return buffer.getvalue()
+
+
+def _loads(data: bytes) -> Any:
+    return _OutputUnpickler(io.BytesIO(data)).load()
+
+
+class _WorldSnapshot:
+    """What an output process needs to find the changes it made to the worlds and the spoiler."""
+    attributes: Dict[int, Dict[str, Any]]
+    unset_events: Dict[int, List[str]]
+    random_states: Dict[int, Any]
+    hashes: Dict[int, str]
+    entrances: Dict[Tuple[str, str, int], Any]
+    unreachables: Set[Location]
+
+    def __init__(self, multiworld: MultiWorld) -> None:
+        self.attributes = {player: dict(vars(world)) for player, world in multiworld.worlds.items()}
+        self.unset_events = {player: [name for name, value in attributes.items()
+                                      if isinstance(value, threading.Event) and not value.is_set()]
+                             for player, attributes in self.attributes.items()}
+        self.random_states = {player: world.random.getstate() for player, world in multiworld.worlds.items()}
+        self.hashes = multiworld.spoiler.hashes.copy()
+        self.entrances = multiworld.spoiler.entrances.copy()
+        self.unreachables = multiworld.spoiler.unreachables.copy()
+
+    def get_changes(self, multiworld: MultiWorld) -> Dict[str, Any]:
+        """
+        Returns the attributes that were assigned to worlds, the events that were set and the spoiler entries that
+        were added since the snapshot, pickled to be applied in the parent process by _apply_output_changes.
+        Changes made to objects that already existed are not found, except for the state of a world's random.
+        """
+        worlds: Dict[int, Tuple[Dict[str, bytes], List[str], Any]] = {}
+        for player, world in multiworld.worlds.items():
+            before = self.attributes[player]
+            attributes: Dict[str, bytes] = {}
+            for name, value in vars(world).items():
+                if (name not in before or before[name] is not value) and not isinstance(value, threading.Event):
+                    try:
+                        attributes[name] = _dumps(value)
+                    except Exception as e:
+                        logging.warning(f"{name} of player {player}, named {multiworld.player_name[player]}, "
+                                        f"can't be sent back from its output process: {e!r}")
+            random_state = world.random.getstate()
+            if random_state == self.random_states[player]:
+                random_state = None
+            events = [name for name in self.unset_events[player] if getattr(world, name).is_set()]
+            if attributes or events or random_state:
+                worlds[player] = attributes, events, random_state
+        spoiler = multiworld.spoiler
+        return {
+            "worlds": worlds,
+            "hashes": {player: value for player, value in spoiler.hashes.items() if self.hashes.get(player) != value},
+            "entrances": _dumps({key: value for key, value in spoiler.entrances.items()
+                                 if self.entrances.get(key) != value}),
+            "unreachables": _dumps(spoiler.unreachables - self.unreachables),
+        }
+
+
+def _apply_output_changes(multiworld: MultiWorld, changes: Dict[str, Any]) -> None:
+    for player, (attributes, events, random_state) in changes["worlds"].items():
+        world = multiworld.worlds[player]
+        for name, value in attributes.items():
+            setattr(world, name, _loads(value))
+        if random_state:
+            world.random.setstate(random_state)
+        # only after the attributes, as other threads may be waiting for these events to read them
+        for name in events:
+            getattr(world, name).set()
+    multiworld.spoiler.hashes.update(changes["hashes"])
+    multiworld.spoiler.entrances.update(_loads(changes["entrances"]))
+    multiworld.spoiler.unreachables.update(_loads(changes["unreachables"]))
+
+
+def _run_forked_output_task(index: int) -> Dict[str, Any]:
+    """Runs an output task in a forked process and returns its result or error and its changes to be sent back."""
+    multiworld = _output_multiworld
+    assert multiworld, "output tasks can only run in processes forked by _run_output_tasks"
+    function, args = _output_tasks[index]
+    profiler = multiworld.profiler
+    record_count = len(profiler.records) if profiler else 0
+    snapshot = _WorldSnapshot(multiworld)
+    message: Dict[str, Any]
+    try:
+        message = {"result": _dumps(function(*args))}
+    except Exception as e:
+        try:
+            error = _dumps(e)
+        except Exception:
+            # keep the message and the notes call_single added, if the exception itself can't be sent back
+            replacement = Exception(f"{type(e).__name__}: {e}")
+            replacement.__notes__ = list(getattr(e, "__notes__", ()))
+            error = _dumps(replacement)
+        message = {"error": error, "traceback": traceback.format_exc()}
+    # failed worlds get their changes back too, as the event they set when failing may be waited for
+    message["changes"] = snapshot.get_changes(multiworld)
+    message["records"] = profiler.records[record_count:] if profiler else []
+    return message
+
+
+@contextmanager
+def _run_output_tasks(multiworld: MultiWorld, tasks: List[OutputTask], processes: int,
+                      pool: concurrent.futures.ThreadPoolExecutor) -> Iterator[List[concurrent.futures.Future]]:
+    """
+    Runs the output tasks on pool, or if processes is not 0, in that many processes forked from the finished
+    multiworld. Changes a task makes to the worlds are sent back and applied before its future is done.
+    """
+    global _output_multiworld, _output_tasks, _output_objects
+    if not processes:
+        yield [pool.submit(function, *args) for function, args in tasks]
+        return
+
+    def on_done(future: concurrent.futures.Future, process_future: concurrent.futures.Future) -> None:
+        try:
+            message: Dict[str, Any] = process_future.result()
+            if multiworld.profiler:
+                multiworld.profiler.records.extend(message["records"])
+            _apply_output_changes(multiworld, message["changes"])
+            if "error" in message:
+                error: BaseException = _loads(message["error"])
+                error.__cause__ = RemoteTraceback(f'\n"""\n{message["traceback"]}"""')
+                future.set_exception(error)
+            else:
+                future.set_result(_loads(message["result"]))
+        except BaseException as e:
+            future.set_exception(e)
+
+    _output_multiworld = multiworld
+    _output_tasks = tasks
+    _output_objects = {id(obj): obj for obj in (
+        multiworld, *multiworld.worlds.values(), *multiworld.regions, *multiworld.get_locations(),
+        *multiworld.get_entrances(), *multiworld.itempool,
+        *(location.item for location in multiworld.get_filled_locations()),
+        *(item for items in multiworld.precollected_items.values() for item in items))}
+    futures: List[concurrent.futures.Future] = [concurrent.futures.Future() for _ in tasks]
+    logging.info(f"Forking {processes} output process{'es' if processes != 1 else ''}.")
+    # with fork, all processes are started on the first submit, before this process starts any output thread
+    process_pool = concurrent.futures.ProcessPoolExecutor(processes, multiprocessing.get_context("fork"))
+    try:
+        for index, future in enumerate(futures):
+            process_pool.submit(_run_forked_output_task, index).add_done_callback(partial(on_done, future))
+        yield futures
+    finally:
+        process_pool.shutdown(cancel_futures=True)
+        _output_multiworld = None
+        _output_tasks = []
+        _output_objects = {}
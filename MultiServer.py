@@ -43,7 +43,7 @@ import NetUtils
 import Utils
 from Utils import version_tuple, restricted_loads, Version, async_start, get_intended_text
 from NetUtils import Endpoint, ClientStatus, NetworkItem, decode, encode, NetworkPlayer, Permission, NetworkSlot, \
-    SlotType, LocationStore, Hint, HintStatus
+    SlotType, LocationStore, Hint, HintStatus, encode_data_package
 from BaseClasses import ItemClassification
 
 
@@ -124,6 +124,61 @@ def get_saving_second(seed_name: str, interval: int = 60) -> int:
     return int(hashlib.sha256(seed_name.encode()).hexdigest(), 16) % interval
 
 
+def apply_save_journal(savedata: typing.Dict[str, typing.Any], journal: typing.Iterable[bytes]) -> int:
+    """Replay journal entries from Context.get_save_update onto savedata, a snapshot from Context.get_save.
+    Entries of other snapshot generations are skipped. Returns the size of the replayed entries."""
+    generation = savedata.get("journal_generation", 0)
+    # timers are saved as tuples of (key, timestamp) pairs
+    timers = {section: {tuple(key): value for key, value in savedata.get(section, ())}
+              for section in ("client_activity_timers", "client_connection_timers")}
+    size = 0
+    for entry in journal:
+        entry_generation, records = restricted_loads(entry)
+        if entry_generation != generation:
+            continue
+        size += len(entry)
+        for section, key, value in records:
+            if section == "location_checks":
+                savedata.setdefault(section, {}).setdefault(key, set()).update(value)
+            elif section == "received_items":
+                # records hold their start index, so replaying items already contained in the snapshot is harmless
+                start, items = value
+                savedata.setdefault(section, {}).setdefault(key, [])[start:] = items
+            elif section == "hints":
+                old_hint, new_hint = value
+                hints = savedata.setdefault(section, {}).setdefault(key, set())
+                if old_hint is not None:
+                    hints.discard(old_hint)
+                if new_hint is not None:
+                    hints.add(new_hint)
+            elif section in timers:
+                timers[section][key] = value
+            else:
+                savedata.setdefault(section, {})[key] = value
+    if size:
+        for section, section_timers in timers.items():
+            savedata[section] = tuple(section_timers.items())
+    return size
+
+
+def read_save_journal(filename: str) -> typing.List[bytes]:
+    """Read the entries of a journal file written by Context._save, ignoring a partially written last entry."""
+    try:
+        with open(filename, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return []
+    entries = []
+    position = 0
+    while position + 4 <= len(data):
+        size = int.from_bytes(data[position:position + 4], "little")
+        if position + 4 + size > len(data):
+            break
+        entries.append(data[position + 4:position + 4 + size])
+        position += 4 + size
+    return entries
+
+
 class Client(Endpoint):
     version = Version(0, 0, 0)
     tags: typing.List[str]
@@ -215,12 +270,24 @@ class Context:
         self.slot_info = {}
         self.log_network = log_network
         self.endpoints = []
+        self.messages_received = 0  # websocket frames, used by WebHost to measure load
         self.clients = {}
         self.compatibility: int = compatibility
         self.shutdown_task = None
         self.data_filename = None
-        self.save_filename = None
+        self.save_filename: typing.Optional[str] = None
         self.saving = False
+        # append changes to a journal on save, writing a full snapshot only once the journal outgrows the last one
+        self.save_journaling = False
+        self.save_journal: typing.List[typing.Tuple[str, typing.Any, typing.Any]] = []
+        self.save_journal_lock = threading.Lock()
+        self.save_journal_generation = 0  # incremented with each snapshot, journal entries of older ones are stale
+        self.save_journal_size = 0
+        self.save_snapshot_size = 0
+        self.save_snapshot_needed = True
+        # collect messages to each endpoint within one loop tick into a single frame
+        self.coalesce_messages = False
+        self.outboxes: typing.Dict[Endpoint, typing.List[str]] = {}
         self.player_names: typing.Dict[team_slot, str] = {}
         self.player_name_lookup: typing.Dict[str, team_slot] = {}
         self.connect_names = {}  # names of slots clients can connect to
@@ -232,6 +299,8 @@ class Context:
         self.server = None
         self.countdown_timer = 0
         self.received_items = {}
+        self.pending_item_receivers: typing.Set[team_slot] = set()
+        self.item_send_queued = False
         self.start_inventory = {}
         self.name_aliases: typing.Dict[team_slot, str] = {}
         self.location_checks = collections.defaultdict(set)
@@ -239,6 +308,8 @@ class Context:
         self.location_check_points = location_check_points
         self.hints_used = collections.defaultdict(int)
         self.hints: typing.Dict[team_slot, typing.Set[Hint]] = collections.defaultdict(set)
+        # (team, finding player, location) -> not yet found hints for it -> (team, slot) hint sets holding them
+        self.hint_index: typing.Dict[typing.Tuple[int, int, int], typing.Dict[Hint, typing.Set[team_slot]]] = {}
         self.release_mode: str = release_mode
         self.remaining_mode: str = remaining_mode
         self.collect_mode: str = collect_mode
@@ -297,9 +368,9 @@ class Context:
             self.non_hintable_names[world_name] = world.hint_blacklist
 
         for game_package in self.gamespackage.values():
-            # remove groups from data sent to clients
-            del game_package["item_name_groups"]
-            del game_package["location_name_groups"]
+            # remove groups from data sent to clients, a previous Context in this process may have done so already
+            game_package.pop("item_name_groups", None)
+            game_package.pop("location_name_groups", None)
 
     def _init_game_data(self):
         for game_name, game_package in self.gamespackage.items():
@@ -328,10 +399,13 @@ class Context:
         return self.gamespackage[game]["location_name_to_id"] if game in self.gamespackage else None
 
     # General networking
-    async def send_msgs(self, endpoint: Endpoint, msgs: typing.Iterable[dict]) -> bool:
+    async def send_msgs(self, endpoint: Endpoint, msgs: typing.Iterable[typing.Dict[str, typing.Any]]) -> bool:
         if not endpoint.socket or not endpoint.socket.open:
             return False
         msg = self.dumper(msgs)
+        if self.coalesce_messages:
+            self.queue_encoded_msgs((endpoint,), msg)
+            return True
         try:
             await endpoint.socket.send(msg)
         except websockets.ConnectionClosed:
@@ -346,6 +420,9 @@ class Context:
     async def send_encoded_msgs(self, endpoint: Endpoint, msg: str) -> bool:
         if not endpoint.socket or not endpoint.socket.open:
             return False
+        if self.coalesce_messages:
+            self.queue_encoded_msgs((endpoint,), msg)
+            return True
         try:
             await endpoint.socket.send(msg)
         except websockets.ConnectionClosed:
@@ -358,6 +435,9 @@ class Context:
             return True
 
     async def broadcast_send_encoded_msgs(self, endpoints: typing.Iterable[Endpoint], msg: str) -> bool:
+        if self.coalesce_messages:
+            self.queue_encoded_msgs(endpoints, msg)
+            return True
         sockets = []
         for endpoint in endpoints:
             if endpoint.socket and endpoint.socket.open:
@@ -372,7 +452,38 @@ class Context:
                 self.logger.info(f"Outgoing broadcast: {msg}")
             return True
 
-    def broadcast_all(self, msgs: typing.List[dict]):
+    def queue_encoded_msgs(self, endpoints: typing.Iterable[Endpoint], msg: str) -> None:
+        """Add an encoded message array to the outbox of each endpoint, sent by flush_outboxes after this loop tick."""
+        if not self.outboxes:
+            loop = asyncio.get_running_loop()
+            # broadcasts are sent from tasks, let the ones created in this tick queue their messages first
+            loop.call_soon(loop.call_soon, self.flush_outboxes)
+        for endpoint in endpoints:
+            if endpoint.socket and endpoint.socket.open:
+                outbox = self.outboxes.get(endpoint)
+                if outbox is None:
+                    self.outboxes[endpoint] = [msg]
+                else:
+                    outbox.append(msg)
+
+    def flush_outboxes(self) -> None:
+        """Send each outbox as one frame, broadcasting to all endpoints that got the same messages."""
+        outboxes, self.outboxes = self.outboxes, {}
+        sockets_by_msgs: typing.Dict[typing.Tuple[str, ...], typing.List["ServerConnection"]] = {}
+        for endpoint, msgs in outboxes.items():
+            if endpoint.socket and endpoint.socket.open:
+                sockets_by_msgs.setdefault(tuple(msgs), []).append(endpoint.socket)
+        for msgs, sockets in sockets_by_msgs.items():
+            for frame in join_encoded_msgs(msgs):
+                try:
+                    websockets.broadcast(sockets, frame)
+                except RuntimeError:
+                    self.logger.exception("Exception during flush_outboxes")
+                else:
+                    if self.log_network:
+                        self.logger.info(f"Outgoing message: {frame}")
+
+    def broadcast_all(self, msgs: typing.List[typing.Dict[str, typing.Any]]):
         msg_is_text = all(msg["cmd"] == "PrintJSON" for msg in msgs)
         data = self.dumper(msgs)
         endpoints = (
@@ -386,7 +497,7 @@ class Context:
         self.logger.info("Notice (all): %s" % text)
         self.broadcast_all([{**{"cmd": "PrintJSON", "data": [{ "text": text }]}, **additional_arguments}])
 
-    def broadcast_team(self, team: int, msgs: typing.List[dict]):
+    def broadcast_team(self, team: int, msgs: typing.List[typing.Dict[str, typing.Any]]):
         msg_is_text = all(msg["cmd"] == "PrintJSON" for msg in msgs)
         data = self.dumper(msgs)
         endpoints = (
@@ -401,6 +512,7 @@ class Context:
         async_start(self.broadcast_send_encoded_msgs(endpoints, msgs))
 
     async def disconnect(self, endpoint: Client):
+        self.outboxes.pop(endpoint, None)
         if endpoint in self.endpoints:
             self.endpoints.remove(endpoint)
         if endpoint.slot and endpoint in self.clients[endpoint.team][endpoint.slot]:
@@ -439,14 +551,16 @@ class Context:
         self.data_filename = multidatapath
 
     @staticmethod
-    def decompress(data: bytes) -> dict:
+    def decompress(data: bytes) -> typing.MutableMapping[str, typing.Any]:
         format_version = data[0]
-        if format_version > 3:
+        if format_version > NetUtils.MULTIDATA_FORMAT:
             raise Utils.VersionException("Incompatible multidata.")
+        if format_version == NetUtils.MULTIDATA_FORMAT:
+            return NetUtils.Multidata(data)
         return restricted_loads(zlib.decompress(data[1:]))
 
-    def _load(self, decoded_obj: dict, game_data_packages: typing.Dict[str, typing.Any],
-              use_embedded_server_options: bool):
+    def _load(self, decoded_obj: typing.MutableMapping[str, typing.Any],
+              game_data_packages: typing.Dict[str, typing.Any], use_embedded_server_options: bool):
 
         self.read_data = {}
         # there might be a better place to put this.
@@ -485,8 +599,8 @@ class Context:
         self.connect_names = decoded_obj['connect_names']
         self.locations = LocationStore(decoded_obj.pop("locations"))  # pre-emptively free memory
         self.slot_data = decoded_obj['slot_data']
-        for slot, data in self.slot_data.items():
-            self.read_data[f"slot_data_{slot}"] = lambda data=data: data
+        for slot in self.slot_data:
+            self.read_data[f"slot_data_{slot}"] = lambda slot=slot: self.slot_data[slot]
         self.er_hint_data = {int(player): {int(address): name for address, name in loc_data.items()}
                              for player, loc_data in decoded_obj["er_hint_data"].items()}
 
@@ -495,7 +609,8 @@ class Context:
             self.start_inventory[slot] = [NetworkItem(item_code, -2, 0) for item_code in item_codes]
 
         for slot, hints in decoded_obj["precollected_hints"].items():
-            self.hints[0, slot].update(hints)
+            for hint in hints:
+                self.add_hint(0, slot, hint)
 
         # declare slots that aren't players as done
         for slot, slot_info in self.slot_info.items():
@@ -529,8 +644,12 @@ class Context:
 
     # saving
 
-    def save(self, now=False) -> bool:
+    def save(self, now=False, journaled=False) -> bool:
+        """Request a save. Pass journaled=True if every change since the last save was recorded through journal,
+        otherwise the next save writes a full snapshot."""
         if self.saving:
+            if not journaled:
+                self.save_snapshot_needed = True
             if now:
                 self.save_dirty = False
                 return self._save()
@@ -540,12 +659,55 @@ class Context:
 
         return False
 
+    def journal(self, section: str, key: typing.Any, value: typing.Any) -> None:
+        """Record a change to the value of key in section of get_save(), see apply_save_journal."""
+        if self.save_journaling:
+            with self.save_journal_lock:
+                self.save_journal.append((section, key, value))
+
+    def get_save_update(self, snapshot: bool = False) -> typing.Tuple[bool, bytes]:
+        """Serialize the changes since the last save. Returns True and a pickled get_save() if a full snapshot
+        replacing the previous save and its journal has to be written, otherwise False and a journal entry
+        to append, which is empty if nothing was journaled."""
+        with self.save_journal_lock:
+            records, self.save_journal = self.save_journal, []
+            if snapshot or self.save_snapshot_needed or not self.save_journaling \
+                    or self.save_journal_size >= self.save_snapshot_size:
+                self.save_snapshot_needed = False
+                self.save_journal_generation += 1
+                data = pickle.dumps(self.get_save())
+                self.save_snapshot_size = len(data)
+                self.save_journal_size = 0
+                return True, data
+        if not records:
+            return False, b""
+        data = pickle.dumps((self.save_journal_generation, records))
+        self.save_journal_size += len(data)
+        return False, data
+
+    def load_save(self, snapshot: bytes, journal: typing.Iterable[bytes] = ()):
+        """Restore a save written through get_save_update."""
+        savedata = restricted_loads(snapshot)
+        self.save_journal_size = apply_save_journal(savedata, journal)
+        self.save_snapshot_size = len(snapshot)
+        self.save_journal_generation = savedata.get("journal_generation", 0)
+        self.set_save(savedata)
+
     def _save(self, exit_save: bool = False) -> bool:
         try:
-            encoded_save = pickle.dumps(self.get_save())
-            with open(self.save_filename, "wb") as f:
-                f.write(zlib.compress(encoded_save))
+            snapshot, data = self.get_save_update(exit_save)
+            if snapshot:
+                with open(self.save_filename, "wb") as f:
+                    f.write(zlib.compress(data))
+                if self.save_journaling:
+                    # entries of the previous generation would be skipped anyway, so this may fail
+                    with open(self.save_filename + ".journal", "wb"):
+                        pass
+            elif data:
+                with open(self.save_filename + ".journal", "ab") as f:
+                    f.write(len(data).to_bytes(4, "little") + data)
         except Exception as e:
+            self.save_snapshot_needed = True  # journaled changes may be lost
             self.logger.exception(e)
             return False
         else:
@@ -561,8 +723,8 @@ class Context:
                     else self.data_filename + '_' + 'apsave'
             try:
                 with open(self.save_filename, 'rb') as f:
-                    save_data = restricted_loads(zlib.decompress(f.read()))
-                    self.set_save(save_data)
+                    snapshot = zlib.decompress(f.read())
+                self.load_save(snapshot, read_save_journal(self.save_filename + ".journal"))
             except FileNotFoundError:
                 self.logger.error('No save data found, starting a new game')
             except Exception as e:
@@ -586,6 +748,7 @@ class Context:
                             self.logger.debug("Saving via thread.")
                             self._save()
                     except OperationalError as e:
+                        self.save_snapshot_needed = True  # journaled changes may be lost
                         self.logger.exception(e)
                         self.logger.info(f"Saving failed. Retry in {self.auto_save_interval} seconds.")
                     else:
@@ -600,8 +763,7 @@ class Context:
                 import atexit
                 atexit.register(self._save, True)  # make sure we save on exit too
 
-    def get_save(self) -> dict:
-        self.recheck_hints()
+    def get_save(self) -> typing.Dict[str, typing.Any]:
         d = {
             "version": self.save_version,
             "connect_names": self.connect_names,
@@ -618,6 +780,7 @@ class Context:
             "random_state": self.random.getstate(),
             "group_collected": dict(self.group_collected),
             "stored_data": self.stored_data,
+            "journal_generation": self.save_journal_generation,
             "game_options": {"hint_cost": self.hint_cost, "location_check_points": self.location_check_points,
                              "server_password": self.server_password, "password": self.password,
                              "release_mode": self.release_mode,
@@ -647,6 +810,7 @@ class Context:
              in savedata["client_activity_timers"]})
         self.location_checks.update(savedata["location_checks"])
         self.random.setstate(savedata["random_state"])
+        self.recheck_hints()  # also indexes the loaded hints
 
         if "game_options" in savedata:
             self.hint_cost = savedata["game_options"]["hint_cost"]
@@ -699,11 +863,59 @@ class Context:
                     if slot is not None and slot != player:
                         self.replace_hint(hint_team, player, hint, new_hint)
             self.hints[hint_team, hint_slot] = new_hints
+        self.hint_index.clear()
+        for (hint_team, hint_slot), hints in self.hints.items():
+            for hint in hints:
+                self._index_hint(hint_team, hint_slot, hint)
+
+    def recheck_hints_for_locations(self, team: int, finding_player: int, locations: typing.Iterable[int],
+                                    changed: typing.Optional[typing.Set[team_slot]] = None) -> None:
+        """Refreshes only the hints for the given locations of finding_player, through hint_index.
+        If a set is passed for 'changed', each (team, slot) pair that has at least one hint modified will be added."""
+        for location in locations:
+            hints = self.hint_index.pop((team, finding_player, location), None)
+            if not hints:
+                continue
+            for hint, holders in hints.items():
+                new_hint = hint.re_check(self, team)
+                if hint == new_hint:
+                    self.hint_index.setdefault((team, finding_player, location), {})[hint] = holders
+                    continue
+                for holder in holders:
+                    holder_hints = self.hints[holder]
+                    if hint in holder_hints:
+                        holder_hints.remove(hint)
+                        holder_hints.add(new_hint)
+                        self._index_hint(*holder, new_hint)
+                        self.journal("hints", holder, (hint, new_hint))
+                        if changed is not None:
+                            changed.add(holder)
 
     def get_rechecked_hints(self, team: int, slot: int):
-        self.recheck_hints(team, slot)
+        # hint_index keeps hints up to date as locations get checked
         return self.hints[team, slot]
 
+    def add_hint(self, team: int, slot: int, hint: Hint) -> None:
+        """Remember hint for the (team, slot) hint set."""
+        self.hints[team, slot].add(hint)
+        self._index_hint(team, slot, hint)
+        self.journal("hints", (team, slot), (None, hint))
+
+    def _index_hint(self, team: int, slot: int, hint: Hint) -> None:
+        if not hint.found:
+            self.hint_index.setdefault((team, hint.finding_player, hint.location), {}) \
+                .setdefault(hint, set()).add((team, slot))
+
+    def _unindex_hint(self, team: int, slot: int, hint: Hint) -> None:
+        key = team, hint.finding_player, hint.location
+        hints = self.hint_index.get(key)
+        if hints and hint in hints:
+            hints[hint].discard((team, slot))
+            if not hints[hint]:
+                del hints[hint]
+                if not hints:
+                    del self.hint_index[key]
+
     def get_sphere(self, player: int, location_id: int) -> int:
         """Get sphere of a location, -1 if spheres are not available."""
         if self.spheres:
@@ -768,10 +980,10 @@ class Context:
                 # since hints are bidirectional, finding player and receiving player,
                 # we can check once if hint already exists
                 if hint not in self.hints[team, hint.finding_player]:
-                    self.hints[team, hint.finding_player].add(hint)
+                    self.add_hint(team, hint.finding_player, hint)
                     new_hint_events.add(hint.finding_player)
                     for player in self.slot_set(hint.receiving_player):
-                        self.hints[team, player].add(hint)
+                        self.add_hint(team, player, hint)
                         new_hint_events.add(player)
 
             self.logger.info("Notice (Team #%d): %s" % (team + 1, format_hint(self, team, hint)))
@@ -795,7 +1007,9 @@ class Context:
     def replace_hint(self, team: int, slot: int, old_hint: Hint, new_hint: Hint) -> None:
         if old_hint in self.hints[team, slot]:
             self.hints[team, slot].remove(old_hint)
-            self.hints[team, slot].add(new_hint)
+            self._unindex_hint(team, slot, old_hint)
+            self.journal("hints", (team, slot), (old_hint, None))
+            self.add_hint(team, slot, new_hint)
     
     # "events"
 
@@ -807,7 +1021,7 @@ class Context:
             collect_player(self, client.team, client.slot)
         if "auto" in self.release_mode:
             release_player(self, client.team, client.slot)
-        self.save()  # save goal completion flag
+        self.save(journaled=True)  # save goal completion flag
 
     def on_new_hint(self, team: int, slot: int):
         self.on_changed_hints(team, slot)
@@ -828,6 +1042,31 @@ class Context:
         if targets:
             self.broadcast(targets, [{"cmd": "SetReply", "key": key, "value": self.client_game_state[team, slot]}])
 
+    def on_locations_checked(self, team: int, slot: int, locations: typing.Set[int]):
+        pass
+
+    def on_items_received(self, team: int, slot: int, items: typing.Sequence[NetworkItem]):
+        pass
+
+
+def join_encoded_msgs(msgs: typing.Iterable[str], size_limit: int = 64 * 1024) -> typing.Iterator[str]:
+    """Join encoded message arrays into as few arrays as possible.
+    Starts a new array past size_limit, so big batches stay within the compression window."""
+    parts: typing.List[str] = []
+    size = 0
+    for msg in msgs:
+        inner = msg[1:-1]  # strip the array brackets
+        if not inner:
+            continue
+        if parts and size + len(inner) > size_limit:
+            yield "[" + ",".join(parts) + "]"
+            parts = []
+            size = 0
+        parts.append(inner)
+        size += len(inner) + 1
+    if parts:
+        yield "[" + ",".join(parts) + "]"
+
 
 def update_aliases(ctx: Context, team: int):
     cmd = ctx.dumper([{"cmd": "RoomUpdate",
@@ -849,6 +1088,7 @@ async def server(websocket: "ServerConnection", path: str = "/", ctx: Context =
         if ctx.log_network:
             ctx.logger.info("Sent Room Info")
         async for data in websocket:
+            ctx.messages_received += 1
             if ctx.log_network:
                 ctx.logger.info(f"Incoming message: {data}")
             for msg in decode(data):
@@ -934,12 +1174,16 @@ async def on_client_joined(ctx: Context, client: Client):
                                   "It may stop working in the future. If you are a player, please report this to the "
                                   "client's developer.")
     ctx.client_connection_timers[client.team, client.slot] = datetime.datetime.now(datetime.timezone.utc)
+    ctx.journal("client_connection_timers", (client.team, client.slot),
+                ctx.client_connection_timers[client.team, client.slot].timestamp())
 
 
 async def on_client_left(ctx: Context, client: Client):
     if len(ctx.clients[client.team][client.slot]) < 1:
         update_client_status(ctx, client, ClientStatus.CLIENT_UNKNOWN)
         ctx.client_connection_timers[client.team, client.slot] = datetime.datetime.now(datetime.timezone.utc)
+        ctx.journal("client_connection_timers", (client.team, client.slot),
+                    ctx.client_connection_timers[client.team, client.slot].timestamp())
 
     version_str = '.'.join(str(x) for x in client.version)
 
@@ -1018,20 +1262,41 @@ def get_start_inventory(ctx: Context, player: int, remote_start_inventory: bool)
 
 
 def send_new_items(ctx: Context):
-    for team, clients in ctx.clients.items():
-        for slot, clients in clients.items():
-            for client in clients:
-                if client.no_items:
-                    continue
-                start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
-                items = get_received_items(ctx, team, slot, client.remote_items)
-                if len(start_inventory) + len(items) > client.send_index:
-                    first_new_item = max(0, client.send_index - len(start_inventory))
-                    async_start(ctx.send_msgs(client, [{
-                        "cmd": "ReceivedItems",
-                        "index": client.send_index,
-                        "items": start_inventory[client.send_index:] + items[first_new_item:]}]))
-                    client.send_index = len(start_inventory) + len(items)
+    """Send ReceivedItems to the clients of every (team, slot) in ctx.pending_item_receivers."""
+    pending_item_receivers = ctx.pending_item_receivers
+    ctx.pending_item_receivers = set()
+    for team, slot in pending_item_receivers:
+        for client in ctx.clients.get(team, {}).get(slot, ()):
+            if client.no_items:
+                continue
+            start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
+            items = get_received_items(ctx, team, slot, client.remote_items)
+            if len(start_inventory) + len(items) > client.send_index:
+                first_new_item = max(0, client.send_index - len(start_inventory))
+                async_start(ctx.send_msgs(client, [{
+                    "cmd": "ReceivedItems",
+                    "index": client.send_index,
+                    "items": start_inventory[client.send_index:] + items[first_new_item:]}]))
+                client.send_index = len(start_inventory) + len(items)
+
+
+def queue_new_items(ctx: Context):
+    """Send new items once the checks currently being processed are done,
+    so that each receiver gets a single ReceivedItems for all of them."""
+    if ctx.item_send_queued:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:  # not running in the server's event loop, send right away
+        send_new_items(ctx)
+        return
+
+    def send_queued_items():
+        ctx.item_send_queued = False
+        send_new_items(ctx)
+
+    ctx.item_send_queued = True
+    loop.call_soon(send_queued_items)
 
 
 def update_checked_locations(ctx: Context, team: int, slot: int):
@@ -1065,6 +1330,7 @@ def collect_player(ctx: Context, team: int, slot: int, is_group: bool = False):
             if slot in group_players:
                 group_collected_players = ctx.group_collected.setdefault(group, set())
                 group_collected_players.add(slot)
+                ctx.journal("group_collected", group, set(group_collected_players))
                 if set(group_players) == group_collected_players:
                     collect_player(ctx, team, group, True)
 
@@ -1075,10 +1341,14 @@ def get_remaining(ctx: Context, team: int, slot: int) -> typing.List[typing.Tupl
 
 def send_items_to(ctx: Context, team: int, target_slot: int, *items: NetworkItem):
     for target in ctx.slot_set(target_slot):
-        for item in items:
-            if item.player != target_slot:
-                get_received_items(ctx, team, target, False).append(item)
-            get_received_items(ctx, team, target, True).append(item)
+        for remote_items in (False, True):
+            received_items = get_received_items(ctx, team, target, remote_items)
+            start = len(received_items)
+            received_items.extend(item for item in items if remote_items or item.player != target_slot)
+            if ctx.save_journaling and len(received_items) > start:
+                ctx.journal("received_items", (team, target, remote_items), (start, received_items[start:]))
+        ctx.pending_item_receivers.add((team, target))
+        ctx.on_items_received(team, target, items)
 
 
 def register_location_checks(ctx: Context, team: int, slot: int, locations: typing.Iterable[int],
@@ -1089,6 +1359,7 @@ def register_location_checks(ctx: Context, team: int, slot: int, locations: typi
     if new_locations:
         if count_activity:
             ctx.client_activity_timers[team, slot] = datetime.datetime.now(datetime.timezone.utc)
+            ctx.journal("client_activity_timers", (team, slot), ctx.client_activity_timers[team, slot].timestamp())
 
         sortable: list[tuple[int, int, int, int]] = []
         for location in new_locations:
@@ -1116,17 +1387,19 @@ def register_location_checks(ctx: Context, team: int, slot: int, locations: typi
         del sortable
 
         ctx.location_checks[team, slot] |= new_locations
-        send_new_items(ctx)
+        ctx.journal("location_checks", (team, slot), new_locations)
+        ctx.on_locations_checked(team, slot, new_locations)
+        queue_new_items(ctx)
         ctx.broadcast(ctx.clients[team][slot], [{
             "cmd": "RoomUpdate",
             "hint_points": get_slot_points(ctx, team, slot),
             "checked_locations": new_locations,  # send back new checks only
         }])
         updated_slots: typing.Set[tuple[int, int]] = set()
-        ctx.recheck_hints(team, slot, updated_slots)
+        ctx.recheck_hints_for_locations(team, slot, new_locations, updated_slots)
         for hint_team, hint_slot in updated_slots:
             ctx.on_changed_hints(hint_team, hint_slot)
-        ctx.save()
+        ctx.save(journaled=True)
 
 
 def collect_hints(ctx: Context, team: int, slot: int, item: typing.Union[int, str], auto_status: HintStatus) \
@@ -1586,8 +1859,12 @@ class ClientMessageProcessor(CommonCommandProcessor):
             )
             if usable:
                 new_item = NetworkItem(names[item_name], -1, self.client.slot)
-                get_received_items(self.ctx, self.client.team, self.client.slot, False).append(new_item)
-                get_received_items(self.ctx, self.client.team, self.client.slot, True).append(new_item)
+                for remote_items in (False, True):
+                    received_items = get_received_items(self.ctx, self.client.team, self.client.slot, remote_items)
+                    received_items.append(new_item)
+                    self.ctx.journal("received_items", (self.client.team, self.client.slot, remote_items),
+                                     (len(received_items) - 1, [new_item]))
+                self.ctx.pending_item_receivers.add((self.client.team, self.client.slot))
                 self.ctx.broadcast_text_all(
                     'Cheat console: sending "' + item_name + '" to ' + self.ctx.get_aliased_name(self.client.team,
                                                                                                  self.client.slot),
@@ -1606,9 +1883,7 @@ class ClientMessageProcessor(CommonCommandProcessor):
         cost = self.ctx.get_hint_cost(self.client.slot)
         auto_status = HintStatus.HINT_UNSPECIFIED if for_location else HintStatus.HINT_PRIORITY
         if not input_text:
-            hints = {hint.re_check(self.ctx, self.client.team) for hint in
-                     self.ctx.hints[self.client.team, self.client.slot]}
-            self.ctx.hints[self.client.team, self.client.slot] = hints
+            hints = self.ctx.get_rechecked_hints(self.client.team, self.client.slot)
             self.ctx.notify_hints(self.client.team, list(hints), recipients=(self.client.slot,))
             self.output(f"A hint costs {self.ctx.get_hint_cost(self.client.slot)} points. "
                         f"You have {points_available} points.")
@@ -1856,21 +2131,15 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
         if "games" in args:
             games = {name: game_data for name, game_data in ctx.gamespackage.items()
                      if name in set(args.get("games", []))}
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": {"games": games}}])
         # TODO: remove exclusions behaviour around 0.5.0
         elif exclusions:
             exclusions = set(exclusions)
             games = {name: game_data for name, game_data in ctx.gamespackage.items()
                      if name not in exclusions}
-
-            package = {"games": games}
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": package}])
-
         else:
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": {"games": ctx.gamespackage}}])
+            games = ctx.gamespackage
+        # game packages are encoded once per checksum instead of for every client
+        await ctx.send_encoded_msgs(client, f"[{{\"cmd\":\"DataPackage\",\"data\":{encode_data_package(games)}}}]")
 
     elif client.auth:
         if cmd == "ConnectUpdate":
@@ -1944,7 +2213,7 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
                 locs.append(NetworkItem(target_item, location, target_player, flags))
             ctx.notify_hints(client.team, hints, only_new=create_as_hint == 2)
             if locs and create_as_hint:
-                ctx.save()
+                ctx.save(journaled=True)
             await ctx.send_msgs(client, [{'cmd': 'LocationInfo', 'locations': locs}])
         
         elif cmd == 'UpdateHint':
@@ -1987,7 +2256,7 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
             concerning_slots = ctx.slot_set(hint.receiving_player) | {hint.finding_player}
             for slot in concerning_slots:
                 ctx.replace_hint(client.team, slot, hint, new_hint)
-            ctx.save()
+            ctx.save(journaled=True)
             for slot in concerning_slots:
                 ctx.on_changed_hints(client.team, slot)
         
@@ -2043,12 +2312,13 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
                 func = modify_functions[operation["operation"]]
                 value = func(value, operation["value"])
             ctx.stored_data[args["key"]] = args["value"] = value
+            ctx.journal("stored_data", args["key"], value)
             targets = set(ctx.stored_data_notification_clients[args["key"]])
             if args.get("want_reply", False):
                 targets.add(client)
             if targets:
                 ctx.broadcast(targets, [args])
-            ctx.save()
+            ctx.save(journaled=True)
 
         elif cmd == "SetNotify":
             if "keys" not in args or type(args["keys"]) != list:
@@ -2071,8 +2341,9 @@ def update_client_status(ctx: Context, client: Client, new_status: ClientStatus)
                 ctx.broadcast_text_all(f"Team #{client.team + 1} has completed all of their games! Congratulations!")
 
         ctx.client_game_state[client.team, client.slot] = new_status
+        ctx.journal("client_game_state", (client.team, client.slot), new_status)
         ctx.on_client_status_change(client.team, client.slot)
-        ctx.save()
+        ctx.save(journaled=True)
 
 
 class ServerCommandProcessor(CommonCommandProcessor):
@@ -2430,6 +2701,11 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument('--password', default=defaults["password"])
     parser.add_argument('--savefile', default=defaults["savefile"])
     parser.add_argument('--disable_save', default=defaults["disable_save"], action='store_true')
+    parser.add_argument('--journal_save', action='store_true',
+                        help="Append changes to a journal next to the savefile, "
+                             "instead of rewriting the whole savefile every time.")
+    parser.add_argument('--coalesce_messages', action='store_true',
+                        help="Send all messages to a client produced within one event loop tick as a single frame.")
     parser.add_argument('--cert', help="Path to a SSL Certificate for encryption.")
     parser.add_argument('--cert_key', help="Path to SSL Certificate Key file")
     parser.add_argument('--loglevel', default=defaults["loglevel"],
@@ -2553,6 +2829,8 @@ async def main(args: argparse.Namespace):
         logging.exception(f"Failed to read multiworld data ({e})")
         raise
 
+    ctx.save_journaling = args.journal_save
+    ctx.coalesce_messages = args.coalesce_messages
     ctx.init_save(not args.disable_save)
 
     ssl_context = load_server_cert(args.cert, args.cert_key) if args.cert else None
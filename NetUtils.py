@@ -117,6 +117,32 @@ def encode(obj: typing.Any) -> str:
     return _encode(_scan_for_TypedTuples(obj))
 
 
+# encoded game data packages by checksum and keys, the same package is sent to every connecting client
+_encoded_game_packages: typing.Dict[typing.Tuple[str, typing.Tuple[str, ...]], str] = {}
+_encoded_game_packages_limit = 256
+
+
+def encode_game_package(game_package: typing.Mapping[str, typing.Any]) -> str:
+    """Encode a single game's data package, reusing the previous encoding of a package with the same checksum."""
+    checksum = game_package.get("checksum")
+    if checksum is None:  # no checksum, so there is no way to tell if it changed
+        return encode(game_package)
+    # the same checksum can be encoded with or without its name groups
+    key = (checksum, tuple(game_package))
+    encoded = _encoded_game_packages.get(key)
+    if encoded is None:
+        if len(_encoded_game_packages) >= _encoded_game_packages_limit:
+            del _encoded_game_packages[next(iter(_encoded_game_packages))]
+        encoded = _encoded_game_packages[key] = encode(game_package)
+    return encoded
+
+
+def encode_data_package(games: typing.Mapping[str, typing.Mapping[str, typing.Any]]) -> str:
+    """Encode a data package {"games": games}, assembled from the cached encoding of each game."""
+    return "{\"games\":{" + ",".join(f"{encode(game)}:{encode_game_package(game_package)}"
+                                      for game, game_package in games.items()) + "}}"
+
+
 def get_any_version(data: dict) -> Version:
     data = {key.lower(): value for key, value in data.items()}  # .NET version classes have capitalized keys
     return Version(int(data["major"]), int(data["minor"]), int(data["build"]))
@@ -390,6 +416,160 @@ class Hint(typing.NamedTuple):
         return self.receiving_player == self.finding_player
 
 
+MULTIDATA_FORMAT = 4
+"""version byte of the multidata container written by encode_multidata"""
+
+_SectionIndex = typing.Dict[typing.Any, typing.Tuple[int, int]]
+
+
+def _encode_section(value: typing.Any) -> bytes:
+    import pickle
+    import zlib
+    return zlib.compress(pickle.dumps(value), 9)
+
+
+def encode_multidata(multidata: typing.Mapping[str, typing.Any]) -> bytes:
+    """
+    Encodes multidata into the sectioned container format:
+    format byte, 4 byte little endian length of the index, the zlib compressed pickled index and then
+    each top level key, and each slot's slot_data, as a zlib compressed pickle of its own.
+    Sections of a Multidata that were never decoded are copied over without decoding them.
+    """
+    raw_sections: typing.Dict[typing.Any, typing.Union[bytes, memoryview]] = {}
+    raw_slot_data: typing.Optional[typing.Dict[int, typing.Union[bytes, memoryview]]] = None
+    for key in multidata:
+        if key == "slot_data":
+            slot_data = multidata["slot_data"]
+            raw_slot_data = {}
+            for slot in slot_data:
+                if isinstance(slot_data, _MultidataSlotData) and slot not in slot_data.decoded:
+                    raw_slot_data[slot] = slot_data.get_raw(slot)
+                else:
+                    raw_slot_data[slot] = _encode_section(slot_data[slot])
+        elif isinstance(multidata, Multidata) and key not in multidata.decoded:
+            raw_sections[key] = multidata.get_raw(key)
+        else:
+            raw_sections[key] = _encode_section(multidata[key])
+
+    body: typing.List[typing.Union[bytes, memoryview]] = []
+    offset = 0
+
+    def add(raw: typing.Union[bytes, memoryview]) -> typing.Tuple[int, int]:
+        nonlocal offset
+        body.append(raw)
+        offset += len(raw)
+        return offset - len(raw), len(raw)
+
+    index = {
+        "sections": {key: add(raw) for key, raw in raw_sections.items()},
+        "slot_data": None if raw_slot_data is None else {slot: add(raw) for slot, raw in raw_slot_data.items()},
+    }
+    header = _encode_section(index)
+    return b"".join((bytes([MULTIDATA_FORMAT]), len(header).to_bytes(4, "little"), header, *body))
+
+
+class _MultidataSlotData(typing.Mapping[int, typing.Any]):
+    """slot_data of a Multidata, each slot's data is decoded on first access."""
+    decoded: typing.Dict[int, typing.Any]
+
+    def __init__(self, index: _SectionIndex, body: memoryview) -> None:
+        self._index = index
+        self._body = body
+        self.decoded = {}
+
+    def get_raw(self, slot: int) -> memoryview:
+        offset, length = self._index[slot]
+        return self._body[offset:offset + length]
+
+    def __getitem__(self, slot: int) -> typing.Any:
+        if slot not in self.decoded:
+            import zlib
+            from Utils import restricted_loads
+            self.decoded[slot] = restricted_loads(zlib.decompress(self.get_raw(slot)))
+        return self.decoded[slot]
+
+    def __iter__(self) -> typing.Iterator[int]:
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def check_sections(self) -> None:
+        """Loads the data of every slot that was not decoded yet once with restricted_loads, see Multidata."""
+        import zlib
+        from Utils import restricted_loads
+        for slot in self._index:
+            if slot not in self.decoded:
+                restricted_loads(zlib.decompress(self.get_raw(slot)))
+
+
+class Multidata(typing.MutableMapping[str, typing.Any]):
+    """
+    Read access to multidata in the sectioned container format.
+    Behaves like the dict the multidata was created from, but only decodes the sections that get accessed.
+    """
+    decoded: typing.Dict[str, typing.Any]
+
+    def __init__(self, data: typing.Union[bytes, memoryview]) -> None:
+        import zlib
+        from Utils import restricted_loads
+        data = memoryview(data)
+        if data[0] != MULTIDATA_FORMAT:
+            raise ValueError(f"Expected multidata format {MULTIDATA_FORMAT}, got {data[0]}.")
+        header_length = int.from_bytes(data[1:5], "little")
+        index = restricted_loads(zlib.decompress(data[5:5 + header_length]))
+        body = data[5 + header_length:]
+        self._index: _SectionIndex = index["sections"]
+        self._body = body
+        self.decoded = {}
+        if index["slot_data"] is not None:
+            self.decoded["slot_data"] = _MultidataSlotData(index["slot_data"], body)
+
+    def get_raw(self, key: str) -> memoryview:
+        offset, length = self._index[key]
+        return self._body[offset:offset + length]
+
+    def __getitem__(self, key: str) -> typing.Any:
+        if key not in self.decoded:
+            import zlib
+            from Utils import restricted_loads
+            self.decoded[key] = restricted_loads(zlib.decompress(self.get_raw(key)))
+        return self.decoded[key]
+
+    def __setitem__(self, key: str, value: typing.Any) -> None:
+        self.decoded[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+        self.decoded.pop(key, None)
+        self._index.pop(key, None)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.decoded or key in self._index
+
+    def __iter__(self) -> typing.Iterator[str]:
+        yield from self.decoded
+        yield from (key for key in self._index if key not in self.decoded)
+
+    def __len__(self) -> int:
+        return len(self.decoded.keys() | self._index.keys())
+
+    def check_sections(self) -> None:
+        """
+        Loads every section that was not decoded yet once with restricted_loads and throws the result away,
+        raising if any of them can't be loaded. Checked sections stay encoded, so they are still copied over as-is.
+        """
+        import zlib
+        from Utils import restricted_loads
+        for key in self._index:
+            if key not in self.decoded:
+                restricted_loads(zlib.decompress(self.get_raw(key)))
+        slot_data = self.decoded.get("slot_data")
+        if isinstance(slot_data, _MultidataSlotData):
+            slot_data.check_sections()
+
+
 class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tuple[int, int, int]]]):
     def __init__(self, values: typing.MutableMapping[int, typing.Dict[int, typing.Tuple[int, int, int]]]):
         super().__init__(values)
@@ -403,21 +583,31 @@ class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tu
         if len(self.get(0, {})):
             raise ValueError("Invalid player id 0 for location")
 
+        # receiver -> item -> [(sender, location, flags)], built once as the store does not change after loading
+        self._receiver_index: typing.Dict[int, typing.Dict[int, typing.List[typing.Tuple[int, int, int]]]] = {}
+        for sender, locations in sorted(self.items()):
+            for location_id, (item_id, receiver, *flags) in sorted(locations.items()):
+                self._receiver_index.setdefault(receiver, {}).setdefault(item_id, []).append(
+                    (sender, location_id, flags[0] if flags else 0))
+
     def find_item(self, slots: typing.Set[int], seeked_item_id: int
                   ) -> typing.Generator[typing.Tuple[int, int, int, int, int], None, None]:
-        for finding_player, check_data in self.items():
-            for location_id, (item_id, receiving_player, item_flags) in check_data.items():
-                if receiving_player in slots and item_id == seeked_item_id:
-                    yield finding_player, location_id, item_id, receiving_player, item_flags
+        found: typing.List[typing.Tuple[int, int, int, int]] = []
+        for receiving_player in slots:
+            for finding_player, location_id, item_flags in \
+                    self._receiver_index.get(receiving_player, {}).get(seeked_item_id, ()):
+                found.append((finding_player, location_id, receiving_player, item_flags))
+        if len(slots) > 1:
+            found.sort()
+        for finding_player, location_id, receiving_player, item_flags in found:
+            yield finding_player, location_id, seeked_item_id, receiving_player, item_flags
 
     def get_for_player(self, slot: int) -> typing.Dict[int, typing.Set[int]]:
-        import collections
-        all_locations: typing.Dict[int, typing.Set[int]] = collections.defaultdict(set)
-        for source_slot, location_data in self.items():
-            for location_id, values in location_data.items():
-                if values[1] == slot:
-                    all_locations[source_slot].add(location_id)
-        return all_locations
+        all_locations: typing.Dict[int, typing.Set[int]] = {}
+        for entries in self._receiver_index.get(slot, {}).values():
+            for source_slot, location_id, _ in entries:
+                all_locations.setdefault(source_slot, set()).add(location_id)
+        return {source_slot: all_locations[source_slot] for source_slot in sorted(all_locations)}
 
     def get_checked(self, state: typing.Dict[typing.Tuple[int, int], typing.Set[int]], team: int, slot: int
                     ) -> typing.List[int]:
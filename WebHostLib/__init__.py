@@ -53,6 +53,14 @@ app.config["PONY"] = {
     'create_db': True
 }
 app.config["MAX_ROLL"] = 20
+# decoded seeds and datapackages kept in memory for trackers, by count and by estimated total memory use
+app.config["TRACKER_DECODED_CACHE_ENTRIES"] = 64
+app.config["TRACKER_DECODED_CACHE_SIZE"] = 256 * 1024 * 1024
+# seconds a tracker event stream is held open before the browser reconnects
+app.config["TRACKER_EVENT_STREAM_TIME"] = 60
+# tracker event streams held open at once per process, each occupies a worker thread.
+# further streams answer with pending events right away and let the browser reconnect.
+app.config["TRACKER_EVENT_MAX_STREAMS"] = 5
 app.config["CACHE_TYPE"] = "SimpleCache"
 app.config["HOST_ADDRESS"] = ""
 app.config["ASSET_RIGHTS"] = False
@@ -1,25 +1,49 @@
-from flask import abort
+import hashlib
+from typing import Optional, Tuple
 
-from Utils import restricted_loads
+from flask import Response, abort, request
+
+from NetUtils import encode_data_package, encode_game_package
+from Utils import cache_argsless, restricted_loads
 from WebHostLib import cache
 from WebHostLib.models import GameDataPackage
 from . import api_endpoints
 
 
-@api_endpoints.route('/datapackage')
-@cache.cached()
-def get_datapackage():
+def make_data_package_response(encoded: str, etag: str) -> Response:
+    """Respond with an already encoded data package, or 304 if the client has the same version."""
+    response = Response(encoded, mimetype="application/json")
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+
+@cache_argsless
+def get_encoded_network_data_package() -> Tuple[str, str]:
     from worlds import network_data_package
-    return network_data_package
+    games = network_data_package["games"]
+    etag = hashlib.sha1(",".join(game_data["checksum"] for game_data in games.values()).encode()).hexdigest()
+    return encode_data_package(games), etag
 
 
-@api_endpoints.route('/datapackage/<string:checksum>')
 @cache.memoize(timeout=3600)
-def get_datapackage_by_checksum(checksum: str):
+def get_encoded_game_package(checksum: str) -> Optional[str]:
     package = GameDataPackage.get(checksum=checksum)
     if package:
-        return restricted_loads(package.data)
-    return abort(404)
+        return encode_game_package(restricted_loads(package.data))
+    return None
+
+
+@api_endpoints.route('/datapackage')
+def get_datapackage():
+    return make_data_package_response(*get_encoded_network_data_package())
+
+
+@api_endpoints.route('/datapackage/<string:checksum>')
+def get_datapackage_by_checksum(checksum: str):
+    encoded = get_encoded_game_package(checksum)
+    if encoded is None:
+        return abort(404)
+    return make_data_package_response(encoded, checksum)
 
 
 @api_endpoints.route('/datapackage_checksum')
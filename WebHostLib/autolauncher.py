@@ -3,6 +3,7 @@ from __future__ import annotations
 import json
 import logging
 import multiprocessing
+import queue
 import typing
 from datetime import timedelta, datetime
 from threading import Event, Thread
@@ -14,7 +15,14 @@ from pony.orm import db_session, select, commit, PrimaryKey
 from Utils import restricted_loads
 from .locker import Locker, AlreadyRunningException
 
+# seconds between checks for rooms to start, if no start was requested from this process.
+# Room starts may also be requested from other processes that share the database.
+ROOM_POLL_INTERVAL = 1
+# seconds between checks of all recently active rooms, to catch anything the incremental checks missed
+ROOM_RESCAN_INTERVAL = 60
+
 _stop_event = Event()
+_room_start_requested = Event()
 
 
 def stop():
@@ -23,6 +31,12 @@ def stop():
     stop_event = _stop_event
     _stop_event = Event()  # new event for new threads
     stop_event.set()
+    _room_start_requested.set()
+
+
+def request_room_start():
+    """Wake up autohost to start rooms that just became active, instead of waiting for the next poll."""
+    _room_start_requested.set()
 
 
 def handle_generation_success(seed_id):
@@ -99,27 +113,70 @@ def cleanup():
         logging.info(f"{rooms} Rooms, {seeds} Seeds and {slots} Slots have been deleted.")
 
 
+def get_placement_score(load: HosterLoad, total: HosterLoad) -> float:
+    """Share of a hoster in the total load of all hosters, summed up over all measured values."""
+    return sum(value / total_value for value, total_value in zip(load, total) if total_value)
+
+
+def place_room(hosters: typing.List[MultiworldInstance], room_id: UUID) -> MultiworldInstance:
+    """Start a room on the least loaded hoster.
+    Rooms are placed again every time they start, so rooms that restart rebalance over the hosters."""
+    loads = [hoster.get_load() for hoster in hosters]
+    total = HosterLoad(*(sum(values) for values in zip(*loads)))
+    hoster = min(zip(loads, hosters), key=lambda load_hoster: get_placement_score(load_hoster[0], total))[1]
+    hoster.start_room(room_id)
+    multiworlds[room_id] = hoster
+    return hoster
+
+
 def autohost(config: dict):
     def keep_running():
         stop_event = _stop_event
         try:
             with Locker("autohost"):
                 cleanup()
+                multiworlds.clear()  # left over from a previous autohost, whose hosters are gone
                 hosters = []
                 for x in range(config["HOSTERS"]):
                     hoster = MultiworldInstance(config, x)
                     hosters.append(hoster)
                     hoster.start()
 
-                while not stop_event.wait(0.1):
+                last_check = datetime.min
+                next_rescan = datetime.min
+                while not stop_event.is_set():
+                    recheck: typing.Set[UUID] = set()
+                    for hoster in hosters:
+                        if hoster.done():
+                            logging.error(f"{hoster.name} stopped unexpectedly, restarting it.")
+                            recheck |= hoster.collect()
+                            hoster.start()
+                        recheck |= hoster.update()
+                    for room_id in recheck:
+                        multiworlds.pop(room_id, None)
+
+                    now = datetime.utcnow()
                     with db_session:
-                        rooms = select(
-                            room for room in Room if
-                            room.last_activity >= datetime.utcnow() - timedelta(days=3))
+                        if now >= next_rescan:
+                            next_rescan = now + timedelta(seconds=ROOM_RESCAN_INTERVAL)
+                            rooms = list(select(
+                                room for room in Room if
+                                room.last_activity >= now - timedelta(days=3)))
+                        else:
+                            # activity is timestamped before it is committed, so look back a bit further
+                            since = last_check - timedelta(seconds=5)
+                            rooms = list(select(room for room in Room if room.last_activity >= since))
+                            rooms.extend(room for room in (Room.get(id=room_id) for room_id in recheck) if room)
+                        last_check = now
                         for room in rooms:
                             # we have to filter twice, as the per-room timeout can't currently be PonyORM transpiled.
-                            if room.last_activity >= datetime.utcnow() - timedelta(seconds=room.timeout + 5):
-                                hosters[room.id.int % len(hosters)].start_room(room.id)
+                            if room.id not in multiworlds and \
+                                    room.last_activity >= now - timedelta(seconds=room.timeout + 5):
+                                hoster = place_room(hosters, room.id)
+                                logging.debug(f"Placed room {room.id} on {hoster.name}.")
+
+                    _room_start_requested.wait(ROOM_POLL_INTERVAL)
+                    _room_start_requested.clear()
 
         except AlreadyRunningException:
             logging.info("Autohost reports as already running, not starting another.")
@@ -177,6 +234,8 @@ class MultiworldInstance():
         self.host = config["HOST_ADDRESS"]
         self.rooms_to_start = multiprocessing.Queue()
         self.rooms_shutting_down = multiprocessing.Queue()
+        self.load_reports = multiprocessing.Queue()
+        self.load = HosterLoad(0, 0, 0, 0.0)
         self.name = f"MultiHoster{id}"
 
     def start(self):
@@ -186,14 +245,33 @@ class MultiworldInstance():
         process = multiprocessing.Process(group=None, target=run_server_process,
                                           args=(self.name, self.ponyconfig, get_static_server_data(),
                                                 self.cert, self.key, self.host,
-                                                self.rooms_to_start, self.rooms_shutting_down),
+                                                self.rooms_to_start, self.rooms_shutting_down, self.load_reports),
                                           name=self.name)
         process.start()
         self.process = process
 
+    def update(self) -> typing.Set[UUID]:
+        """Reads the reports of the hosting process. Returns the rooms that shut down since the last update."""
+        shut_down = set()
+        try:
+            while True:
+                room_id = self.rooms_shutting_down.get_nowait()
+                self.room_ids.discard(room_id)
+                shut_down.add(room_id)
+        except queue.Empty:
+            pass
+        try:
+            while True:
+                self.load = self.load_reports.get_nowait()
+        except queue.Empty:
+            pass
+        return shut_down
+
+    def get_load(self) -> HosterLoad:
+        """Last reported load, counting rooms placed since then."""
+        return self.load._replace(rooms=len(self.room_ids))
+
     def start_room(self, room_id):
-        while not self.rooms_shutting_down.empty():
-            self.room_ids.remove(self.rooms_shutting_down.get(block=True, timeout=None))
         if room_id in self.room_ids:
             pass  # should already be hosted currently.
         else:
@@ -208,11 +286,19 @@ class MultiworldInstance():
     def done(self):
         return self.process and not self.process.is_alive()
 
-    def collect(self):
+    def collect(self) -> typing.Set[UUID]:
+        """Cleans up after the hosting process ended. Returns the rooms it was hosting."""
         self.process.join()  # wait for process to finish
         self.process = None
+        # anything still queued belonged to the old process
+        self.rooms_to_start = multiprocessing.Queue()
+        self.rooms_shutting_down = multiprocessing.Queue()
+        self.load_reports = multiprocessing.Queue()
+        self.load = HosterLoad(0, 0, 0, 0.0)
+        room_ids, self.room_ids = self.room_ids, set()
+        return room_ids
 
 
 from .models import Room, Generation, STATE_QUEUED, STATE_STARTED, STATE_ERROR, db, Seed, Slot
-from .customserver import run_server_process, get_static_server_data
+from .customserver import HosterLoad, run_server_process, get_static_server_data
 from .generate import gen_game
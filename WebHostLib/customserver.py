@@ -6,7 +6,6 @@ import datetime
 import functools
 import logging
 import multiprocessing
-import pickle
 import random
 import socket
 import threading
@@ -19,10 +18,43 @@ from pony.orm import commit, db_session, select
 
 import Utils
 
-from MultiServer import Context, server, auto_shutdown, ServerCommandProcessor, ClientMessageProcessor, load_server_cert
-from Utils import restricted_loads, cache_argsless
-from .locker import Locker
-from .models import Command, GameDataPackage, Room, db
+from MultiServer import Context, server, auto_shutdown, ServerCommandProcessor, ClientMessageProcessor, \
+    get_received_items, load_server_cert
+from NetUtils import Hint, NetworkItem, encode
+from Utils import cache_argsless
+from .locker import AlreadyRunningException, Locker
+from .models import Command, GameDataPackage, Room, SaveJournal, TrackerEvent, db, get_save_journal
+
+# seconds over which tracker deltas are collected before they are written to the DB
+TRACKER_EVENT_INTERVAL = 1
+# how long published tracker deltas are kept, has to cover the time a tracker page may lag behind the multisave
+TRACKER_EVENT_RETENTION = datetime.timedelta(minutes=5)
+# seconds between load reports of a hosting process to the autolauncher
+HOSTER_LOAD_REPORT_INTERVAL = 10
+# seconds between checks for Commands sent to the rooms of a hosting process
+DB_COMMAND_POLL_INTERVAL = 5
+
+
+class HosterLoad(typing.NamedTuple):
+    """Load of a room hosting process, reported to the autolauncher to place new rooms."""
+    rss: int  # resident memory in bytes
+    rooms: int
+    clients: int
+    message_rate: float  # received websocket messages per second
+
+
+def get_rss() -> int:
+    """Resident memory of the current process in bytes, 0 if it can't be determined."""
+    try:
+        import psutil
+    except ImportError:
+        try:
+            import os
+            with open("/proc/self/statm") as statm:
+                return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, AttributeError):
+            return 0
+    return psutil.Process().memory_info().rss
 
 
 class CustomClientMessageProcessor(ClientMessageProcessor):
@@ -57,10 +89,79 @@ class DBCommandProcessor(ServerCommandProcessor):
         self.ctx.logger.info(text)
 
 
+class DBCommandDispatcher(threading.Thread):
+    """Fetches the Commands of all rooms of a hosting process in a single query
+    and runs each of them on the event loop of its room.
+    Also writes the tracker deltas the rooms collected, see WebHostContext.queue_tracker_event."""
+    processors: typing.Dict[typing.Any, DBCommandProcessor]
+
+    def __init__(self):
+        super().__init__(name="DBCommandDispatcher", daemon=True)
+        self.processors = {}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.last_tracker_event_prune = time.monotonic()
+
+    def register(self, ctx: WebHostContext):
+        with self.lock:
+            self.processors[ctx.room_id] = DBCommandProcessor(ctx)
+        self.wakeup.set()  # pick up commands that were sent while the room was down
+
+    def unregister(self, room_id):
+        with self.lock:
+            self.processors.pop(room_id, None)
+
+    def dispatch(self):
+        with self.lock:
+            processors = {room_id: processor for room_id, processor in self.processors.items()
+                          if not processor.ctx.exit_event.is_set()}
+        if not processors:
+            return
+        room_ids = list(processors)
+        with db_session:
+            commands = select(command for command in Command if command.room.id in room_ids).order_by(Command.id)
+            for command in commands:
+                processor = processors[command.room.id]
+                processor.ctx.main_loop.call_soon_threadsafe(processor, command.commandtext)
+                command.delete()
+            commit()
+
+    def publish_tracker_events(self):
+        with self.lock:
+            contexts = [processor.ctx for processor in self.processors.values()]
+        batches = {}
+        for ctx in contexts:
+            events = ctx.take_tracker_events()
+            if events:
+                batches[ctx.room_id] = events
+        prune = time.monotonic() - self.last_tracker_event_prune > TRACKER_EVENT_RETENTION.total_seconds() / 2
+        if not batches and not prune:
+            return
+        with db_session:
+            for room_id, events in batches.items():
+                TrackerEvent(room=Room[room_id], data=encode(events))
+            if prune:
+                self.last_tracker_event_prune = time.monotonic()
+                cutoff = datetime.datetime.utcnow() - TRACKER_EVENT_RETENTION
+                select(event for event in TrackerEvent if event.time < cutoff).delete(bulk=True)
+
+    def run(self):
+        while True:
+            self.wakeup.wait(DB_COMMAND_POLL_INTERVAL)
+            self.wakeup.clear()
+            try:
+                self.dispatch()
+                self.publish_tracker_events()
+            except Exception as e:
+                logging.exception(e)
+            # collect tracker deltas queued in the meantime into one batch per room
+            time.sleep(TRACKER_EVENT_INTERVAL)
+
+
 class WebHostContext(Context):
     room_id: int
 
-    def __init__(self, static_server_data: dict, logger: logging.Logger):
+    def __init__(self, static_server_data: dict, logger: logging.Logger, command_dispatcher: DBCommandDispatcher):
         # static server data is used during _load_game_data to load required data,
         # without needing to import worlds system, which takes quite a bit of memory
         self.static_server_data = static_server_data
@@ -71,6 +172,12 @@ class WebHostContext(Context):
         self.main_loop = asyncio.get_running_loop()
         self.video = {}
         self.tags = ["AP", "WebHost"]
+        self.command_dispatcher = command_dispatcher
+        self.save_journaling = True
+        self.coalesce_messages = True
+        self.publishing_tracker_events = False
+        self.tracker_events: typing.List[typing.Dict[str, typing.Any]] = []
+        self.tracker_events_lock = threading.Lock()
 
     def __del__(self):
         try:
@@ -86,18 +193,50 @@ class WebHostContext(Context):
             setattr(self, key, value)
         self.non_hintable_names = collections.defaultdict(frozenset, self.non_hintable_names)
 
-    def listen_to_db_commands(self):
-        cmdprocessor = DBCommandProcessor(self)
-
-        while not self.exit_event.is_set():
-            with db_session:
-                commands = select(command for command in Command if command.room.id == self.room_id)
-                if commands:
-                    for command in commands:
-                        self.main_loop.call_soon_threadsafe(cmdprocessor, command.commandtext)
-                        command.delete()
-                    commit()
-            time.sleep(5)
+    def queue_tracker_event(self, event: typing.Dict[str, typing.Any]):
+        """Collect a delta for the trackers, the command dispatcher writes them to the DB as one TrackerEvent."""
+        if self.publishing_tracker_events:
+            with self.tracker_events_lock:
+                self.tracker_events.append(event)
+            self.command_dispatcher.wakeup.set()
+
+    def take_tracker_events(self) -> typing.List[typing.Dict[str, typing.Any]]:
+        with self.tracker_events_lock:
+            events, self.tracker_events = self.tracker_events, []
+        return events
+
+    def on_locations_checked(self, team: int, slot: int, locations: typing.Set[int]):
+        super().on_locations_checked(team, slot, locations)
+        self.queue_tracker_event({"cmd": "Checks", "team": team, "slot": slot, "locations": sorted(locations),
+                                  "checked": len(self.location_checks[team, slot])})
+
+    def on_items_received(self, team: int, slot: int, items: typing.Sequence[NetworkItem]):
+        super().on_items_received(team, slot, items)
+        if not self.publishing_tracker_events:
+            return
+        # order as shown on the tracker, which counts starting inventory first
+        order = len(self.start_inventory.get(slot, ())) + len(get_received_items(self, team, slot, True)) - len(items)
+        item_names = self.item_names[self.slot_info[slot].game]
+        self.queue_tracker_event({"cmd": "Items", "team": team, "slot": slot, "order": order, "items": items,
+                                  "item_names": {item.item: item_names[item.item] for item in items}})
+
+    def on_client_status_change(self, team: int, slot: int):
+        super().on_client_status_change(team, slot)
+        self.queue_tracker_event({"cmd": "Status", "team": team, "slot": slot,
+                                  "status": self.client_game_state[team, slot]})
+
+    def add_hint(self, team: int, slot: int, hint: Hint) -> None:
+        super().add_hint(team, slot, hint)
+        if not self.publishing_tracker_events or slot != hint.finding_player:
+            return  # hints are added once for the finder and once per receiver, only publish them once
+        finder_game = self.slot_info[hint.finding_player].game
+        self.queue_tracker_event({"cmd": "Hint", "team": team, "hint": hint, "names": [
+            self.get_aliased_name(team, hint.finding_player),
+            self.get_aliased_name(team, hint.receiving_player),
+            self.item_names[self.slot_info[hint.receiving_player].game][hint.item],
+            self.location_names[finder_game][hint.location],
+            finder_game,
+        ]})
 
     @db_session
     def load(self, room_id: int):
@@ -150,16 +289,22 @@ class WebHostContext(Context):
     def init_save(self, enabled: bool = True):
         self.saving = enabled
         if self.saving:
-            savegame_data = Room.get(id=self.room_id).multisave
-            if savegame_data:
-                self.set_save(restricted_loads(Room.get(id=self.room_id).multisave))
+            room = Room.get(id=self.room_id)
+            if room.multisave:
+                self.load_save(room.multisave, get_save_journal(room))
             self._start_async_saving(atexit_save=False)
-        threading.Thread(target=self.listen_to_db_commands, daemon=True).start()
+        self.publishing_tracker_events = True
+        self.command_dispatcher.register(self)
 
     @db_session
     def _save(self, exit_save: bool = False) -> bool:
         room = Room.get(id=self.room_id)
-        room.multisave = pickle.dumps(self.get_save())
+        snapshot, data = self.get_save_update(exit_save)
+        if snapshot:
+            room.multisave = data
+            select(entry for entry in SaveJournal if entry.room == room).delete(bulk=True)
+        elif data:
+            SaveJournal(room=room, data=data)
         # saving only occurs on activity, so we can "abuse" this information to mark this as last_activity
         if not exit_save:  # we don't want to count a shutdown as activity, which would restart the server again
             room.last_activity = datetime.datetime.utcnow()
@@ -226,7 +371,8 @@ def set_up_logging(room_id) -> logging.Logger:
 
 def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                        cert_file: typing.Optional[str], cert_key_file: typing.Optional[str],
-                       host: str, rooms_to_run: multiprocessing.Queue, rooms_shutting_down: multiprocessing.Queue):
+                       host: str, rooms_to_run: multiprocessing.Queue, rooms_shutting_down: multiprocessing.Queue,
+                       load_reports: multiprocessing.Queue):
     from setproctitle import setproctitle
 
     setproctitle(name)
@@ -270,12 +416,28 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
     gc.collect()  # free intermediate objects used during setup
 
     loop = asyncio.get_event_loop()
-
-    async def start_room(room_id):
+    command_dispatcher = DBCommandDispatcher()
+    command_dispatcher.start()
+    contexts: typing.Dict[typing.Any, WebHostContext] = {}
+    closed_rooms_messages = 0
+
+    async def report_load():
+        last_messages = 0
+        while True:
+            messages = closed_rooms_messages + sum(ctx.messages_received for ctx in contexts.values())
+            load_reports.put(HosterLoad(get_rss(), len(contexts),
+                                        sum(len(ctx.endpoints) for ctx in contexts.values()),
+                                        (messages - last_messages) / HOSTER_LOAD_REPORT_INTERVAL))
+            last_messages = messages
+            await asyncio.sleep(HOSTER_LOAD_REPORT_INTERVAL)
+
+    async def host_room(room_id):
+        nonlocal closed_rooms_messages
         with Locker(f"RoomLocker {room_id}"):
             try:
                 logger = set_up_logging(room_id)
-                ctx = WebHostContext(static_server_data, logger)
+                ctx = WebHostContext(static_server_data, logger, command_dispatcher)
+                contexts[room_id] = ctx
                 ctx.load(room_id)
                 ctx.init_save()
                 assert ctx.server is None
@@ -328,8 +490,12 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                     ctx._save()
                     setattr(asyncio.current_task(), "save", None)
             finally:
+                command_dispatcher.unregister(room_id)
+                if contexts.pop(room_id, None) is not None:
+                    closed_rooms_messages += ctx.messages_received
                 try:
                     ctx.save_dirty = False  # make sure the saving thread does not write to DB after final wakeup
+                    ctx.publishing_tracker_events = False
                     ctx.exit_event.set()  # make sure the saving thread stops at some point
                     # NOTE: async saving should probably be an async task and could be merged with shutdown_task
                     with (db_session):
@@ -337,10 +503,21 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                         room = Room.get(id=room_id)
                         room.last_activity = datetime.datetime.utcnow() - \
                                              datetime.timedelta(minutes=1, seconds=room.timeout)
+                        # the final save covers all published tracker deltas
+                        select(event for event in TrackerEvent if event.room == room).delete(bulk=True)
                     logging.info(f"Shutting down room {room_id} on {name}.")
                 finally:
                     await asyncio.sleep(5)
-                    rooms_shutting_down.put(room_id)
+
+    async def start_room(room_id):
+        try:
+            await host_room(room_id)
+        except AlreadyRunningException:
+            logging.info(f"Room {room_id} is still locked by another hoster, not starting it on {name}.")
+            await asyncio.sleep(5)
+        finally:
+            # report only once the room lock is released, so the room can be placed and started again right away
+            rooms_shutting_down.put(room_id)
 
     class Starter(threading.Thread):
         _tasks: typing.List[asyncio.Future]
@@ -366,6 +543,7 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
     starter = Starter()
     starter.daemon = True
     starter.start()
+    loop.create_task(report_load())
     try:
         loop.run_forever()
     finally:
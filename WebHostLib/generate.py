@@ -4,8 +4,8 @@ import os
 import pickle
 import random
 import tempfile
-import zipfile
 from collections import Counter
+from pathlib import Path
 from typing import Any, Dict, List, Optional, Union, Set
 
 from flask import flash, redirect, render_template, request, session, url_for
@@ -20,7 +20,7 @@ from settings import ServerOptions, GeneratorOptions
 from worlds.alttp.EntranceRandomizer import parse_arguments
 from .check import get_yaml_data, roll_options
 from .models import Generation, STATE_ERROR, STATE_QUEUED, Seed, UUID
-from .upload import upload_zip_to_db
+from .upload import upload_files_to_db
 
 
 def get_meta(options_source: dict, race: bool = False) -> Dict[str, Union[List[str], Dict[str, Any]]]:
@@ -137,6 +137,8 @@ def gen_game(gen_options: dict, meta: Optional[Dict[str, Any]] = None, owner=Non
         erargs.skip_output = False
         erargs.spoiler_only = False
         erargs.csv_output = False
+        erargs.output_processes = 0
+        erargs.profile = False
 
         name_counter = Counter()
         for player, (playerfile, settings) in enumerate(gen_options.items(), 1):
@@ -152,9 +154,14 @@ def gen_game(gen_options: dict, meta: Optional[Dict[str, Any]] = None, owner=Non
             erargs.name[player] = handle_name(erargs.name[player], player, name_counter)
         if len(set(erargs.name.values())) != len(erargs.name):
             raise Exception(f"Names have to be unique. Names: {Counter(erargs.name.values())}")
-        ERmain(erargs, seed, baked_server_options=meta["server_options"])
+        seed_id: Optional[UUID] = None
 
-        return upload_to_db(target.name, sid, owner, race)
+        def output_sink(folder: str, multidata: Dict[str, Any]):
+            nonlocal seed_id
+            seed_id = upload_to_db(folder, multidata, sid, owner, race)
+
+        ERmain(erargs, seed, baked_server_options=meta["server_options"], output_sink=output_sink)
+        return seed_id
     thread_pool = concurrent.futures.ThreadPoolExecutor(max_workers=1)
     thread = thread_pool.submit(task)
 
@@ -200,19 +207,17 @@ def wait_seed(seed: UUID):
     return render_template("waitSeed.html", seed_id=seed_id)
 
 
-def upload_to_db(folder, sid, owner, race):
-    for file in os.listdir(folder):
-        file = os.path.join(folder, file)
-        if file.endswith(".zip"):
-            with db_session:
-                with zipfile.ZipFile(file) as zfile:
-                    res = upload_zip_to_db(zfile, owner, {"race": race}, sid)
-                if type(res) == "str":
-                    raise Exception(res)
-                elif res:
-                    seed = res
-                    gen = Generation.get(id=seed.id)
-                    if gen is not None:
-                        gen.delete()
-                    return seed.id
-    raise Exception("Generation zipfile not found.")
+def upload_to_db(folder: str, multidata: Dict[str, Any], sid, owner, race):
+    """Store the output files of a generation and its multidata, handed over by Main.main, without zipping them."""
+    with db_session:
+        res = upload_files_to_db(((file.name, Path(file.path).read_bytes) for file in os.scandir(folder)),
+                                 owner, {"race": race}, sid, multidata)
+        if isinstance(res, str):
+            raise Exception(res)
+        elif res:
+            seed = res
+            gen = Generation.get(id=seed.id)
+            if gen is not None:
+                gen.delete()
+            return seed.id
+    raise Exception("Generation output could not be stored.")
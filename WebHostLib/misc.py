@@ -190,6 +190,10 @@ def host_room(room: UUID):
                       or room.last_activity < now - datetime.timedelta(seconds=room.timeout))
     with db_session:
         room.last_activity = now  # will trigger a spinup, if it's not already running
+    if should_refresh:
+        from .autolauncher import request_room_start
+        commit()  # make the activity visible to autohost before waking it
+        request_room_start()
 
     browser_tokens = "Mozilla", "Chrome", "Safari"
     automated = ("update" in request.args
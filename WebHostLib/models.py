@@ -1,6 +1,7 @@
-from datetime import datetime
+from datetime import date, datetime
+from typing import List
 from uuid import UUID, uuid4
-from pony.orm import Database, PrimaryKey, Required, Set, Optional, buffer, LongStr
+from pony.orm import Database, PrimaryKey, Required, Set, Optional, buffer, LongStr, select
 
 db = Database()
 
@@ -31,6 +32,29 @@ class Room(db.Entity):
     tracker = Optional(UUID, index=True)
     # Port special value -1 means the server errored out. Another attempt can be made with a page refresh
     last_port = Optional(int, default=lambda: 0)
+    tracker_events = Set('TrackerEvent', cascade_delete=True)
+    save_journal = Set('SaveJournal', cascade_delete=True)
+
+
+# batch of tracker deltas published by a running room, streamed to trackers by /tracker_events
+class TrackerEvent(db.Entity):
+    id = PrimaryKey(int, auto=True)
+    room = Required(Room, index=True)
+    time = Required(datetime, default=lambda: datetime.utcnow(), index=True)
+    data = Required(LongStr)  # JSON list of deltas
+
+
+# changes appended to Room.multisave since it was written, see MultiServer.apply_save_journal
+class SaveJournal(db.Entity):
+    id = PrimaryKey(int, auto=True)
+    room = Required(Room, index=True)
+    data = Required(buffer)
+
+
+def get_save_journal(room: Room) -> List[bytes]:
+    """Journal entries to apply on top of room.multisave, see MultiServer.apply_save_journal."""
+    return [entry.data for entry in select(entry for entry in SaveJournal if entry.room == room)
+            .order_by(SaveJournal.id)]
 
 
 class Seed(db.Entity):
@@ -61,3 +85,11 @@ class Generation(db.Entity):
 class GameDataPackage(db.Entity):
     checksum = PrimaryKey(str)
     data = Required(bytes)
+
+
+# rooms created per day and game, rolled up from Room by stats.rollup_games_played
+class GamesPlayed(db.Entity):
+    date = Required(date)
+    game = Required(str)
+    count = Required(int)
+    PrimaryKey(date, game)
@@ -123,6 +123,125 @@ window.addEventListener('load', () => {
             event.preventDefault();
         }
     });
+    // Live updates: apply the deltas a running room publishes, instead of re-rendering the page every minute.
+    const trackerWrapper = document.getElementById('tracker-wrapper');
+    const eventsUrl = trackerWrapper.getAttribute('data-events');
+    const trackedTeam = trackerWrapper.getAttribute('data-team');
+    const trackedPlayer = trackerWrapper.getAttribute('data-player');
+    const clientStatuses = {0: "Disconnected", 5: "Connected", 10: "Ready", 20: "Playing", 30: "Goal Completed"};
+    let live = false;
+
+    /**
+     * Find rows, including ones hidden by the search, of the tables matching tableSelector.
+     * @param {string} tableSelector
+     * @param {Object} attributes data attributes the rows need to have
+     * @returns {Array} pairs of DataTables API and row node
+     */
+    const findRows = (tableSelector, attributes) => {
+        const rowSelector = Object.entries(attributes).map(([key, value]) => `[data-${key}="${value}"]`).join('');
+        const rows = [];
+        $(tableSelector).each((i, table) => {
+            const api = $(table).DataTable();
+            $(api.rows().nodes()).filter(rowSelector).each((j, row) => rows.push([api, row]));
+        });
+        return rows;
+    };
+
+    const isTrackedSlot = (team, slot) => trackedPlayer !== null &&
+        team.toString() === trackedTeam && slot.toString() === trackedPlayer;
+
+    const applyChecks = (delta) => {
+        const hintTables = trackedPlayer !== null ? '#hints-table' : `#hints-table[data-team="${delta.team}"]`;
+        delta.locations.forEach((location) => {
+            if (isTrackedSlot(delta.team, delta.slot)) {
+                findRows('#locations-table', {location: location}).forEach(([api, row]) => {
+                    api.cell(row, 1).data('✔');
+                });
+            }
+            if (trackedPlayer === null || delta.team.toString() === trackedTeam) {
+                findRows(hintTables, {finder: delta.slot, location: location}).forEach(([api, row]) => {
+                    api.cell(row, 6).data('✔');
+                });
+            }
+        });
+        findRows('#checks-table', {team: delta.team, slot: delta.slot}).forEach(([api, row]) => {
+            const checks = $(row).children('.checks');
+            const total = parseInt(checks.attr('data-total'));
+            checks.attr('data-sort', delta.checked);
+            api.cell(checks[0]).data(`${delta.checked}/${total}`);
+            api.cell($(row).children('.percent')[0]).data(
+                total ? (delta.checked / total * 100).toFixed(2) : '100.00');
+            api.cell($(row).children('.activity')[0]).data('0');
+        });
+    };
+
+    const applyItems = (delta) => {
+        if (!isTrackedSlot(delta.team, delta.slot))
+            return;
+        const table = $('#received-table');
+        const api = table.DataTable();
+        let receivedCount = parseInt(table.attr('data-received-count'));
+        delta.items.forEach((item, index) => {
+            const order = delta.order + index;
+            if (order < receivedCount)
+                return;  // already part of the rendered page
+            receivedCount = order + 1;
+            const rows = findRows('#received-table', {item: item.item});
+            if (rows.length) {
+                const [, row] = rows[0];
+                api.cell(row, 1).data(parseInt(api.cell(row, 1).data()) + 1);
+                api.cell(row, 2).data(order);
+            } else {
+                const row = $('<tr><td></td><td>1</td></tr>').attr('data-item', item.item);
+                row.children().first().text(delta.item_names[item.item]);
+                row.append($('<td></td>').text(order));
+                api.row.add(row);
+            }
+        });
+        table.attr('data-received-count', receivedCount);
+    };
+
+    const applyStatus = (delta) => {
+        findRows('#checks-table', {team: delta.team, slot: delta.slot}).forEach(([api, row]) => {
+            api.cell($(row).children('.status')[0]).data(clientStatuses[delta.status] || 'Unknown State');
+        });
+    };
+
+    const applyHint = (delta) => {
+        const hint = delta.hint;
+        let hintTables;
+        if (trackedPlayer !== null) {
+            if (!isTrackedSlot(delta.team, hint.finding_player) && !isTrackedSlot(delta.team, hint.receiving_player))
+                return;
+            hintTables = '#hints-table';
+        } else {
+            hintTables = `#hints-table[data-team="${delta.team}"]`;
+        }
+        if (findRows(hintTables, {finder: hint.finding_player, location: hint.location}).length)
+            return;
+        $(hintTables).each((i, table) => {
+            const row = $('<tr></tr>').attr({'data-finder': hint.finding_player, 'data-location': hint.location});
+            delta.names.forEach((name) => row.append($('<td></td>').text(name)));
+            row.append($('<td></td>').text(hint.entrance || 'Vanilla'));
+            row.append($('<td class="center-column"></td>').text(hint.found ? '✔' : ''));
+            $(table).DataTable().row.add(row);
+        });
+    };
+
+    if (eventsUrl && window.EventSource) {
+        const deltaHandlers = {Checks: applyChecks, Items: applyItems, Status: applyStatus, Hint: applyHint};
+        const events = new EventSource(eventsUrl);
+        events.addEventListener('open', () => { live = true; });
+        events.addEventListener('message', (event) => {
+            JSON.parse(event.data).forEach((delta) => {
+                const handler = deltaHandlers[delta.cmd];
+                if (handler)
+                    handler(delta);
+            });
+            tables.draw(false);
+        });
+    }
+
     const target_second = parseInt(document.getElementById('tracker-wrapper').getAttribute('data-second')) + 3;
     console.log("Target second of refresh: " + target_second);
 
@@ -132,8 +251,16 @@ window.addEventListener('load', () => {
         return sleepSeconds || 60;
     }
 
+    // With live updates, a full refresh is only needed to pick up what deltas don't cover, such as aliases.
+    const liveRefreshMinutes = 10;
+    let minutesSinceRefresh = 0;
     let update_on_view = false;
     const update = () => {
+        if (live && ++minutesSinceRefresh < liveRefreshMinutes) {
+            updater = setTimeout(update, getSleepTimeSeconds() * 1000);
+            return;
+        }
+        minutesSinceRefresh = 0;
         if (document.hidden) {
             console.log("Document reporting as not visible, not updating Tracker...");
             update_on_view = true;
@@ -159,6 +286,8 @@ window.addEventListener('load', () => {
                         $(old_table.settings()[0].nScrollBody).scrollLeft(leftscroll);
                     });
                     $("#multi-stream-link").replaceWith(target.find("#multi-stream-link"));
+                    $("#received-table").attr("data-received-count",
+                        target.find("#received-table").attr("data-received-count"));
                 } else {
                     console.log("Failed to connect to Server, in order to update Table Data.");
                     console.log(response);
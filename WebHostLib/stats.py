@@ -10,25 +10,58 @@ from bokeh.models import HoverTool
 from bokeh.plotting import figure, ColumnDataSource
 from bokeh.resources import INLINE
 from flask import render_template
-from pony.orm import select
+from pony.orm import commit, count, exists, rollback, select
+from pony.orm.core import TransactionIntegrityError
 
 from . import app, cache
-from .models import Room
+from .models import GamesPlayed, Room, Slot
 
 PLOT_WIDTH = 600
 
 
+def count_games_played(day: date) -> typing.Counter[str]:
+    """Count the slots of each game in the rooms created on day, aggregated by the database."""
+    start = datetime.combine(day, datetime.min.time())
+    end = start + timedelta(days=1)
+    rooms_per_seed = dict(select((room.seed.id, count(room)) for room in Room
+                                 if room.creation_time >= start and room.creation_time < end))
+    played: typing.Counter[str] = Counter()
+    for seed_id, game, slots in select((slot.seed.id, slot.game, count(slot)) for slot in Slot
+                                       if exists(room for room in slot.seed.rooms
+                                                 if room.creation_time >= start and room.creation_time < end)):
+        played[game] += slots * rooms_per_seed[seed_id]
+    return played
+
+
+def rollup_games_played(cutoff: date, today: date) -> None:
+    """Store the games played on each day from cutoff until today that is not stored yet.
+    Past days don't change anymore, so each of them only has to be counted once."""
+    stored_days = set(select(games.date for games in GamesPlayed if games.date >= cutoff))
+    day = cutoff
+    while day < today:
+        if day not in stored_days:
+            for game, played in count_games_played(day).items():
+                GamesPlayed(date=day, game=game, count=played)
+        day += timedelta(days=1)
+    try:
+        commit()
+    except TransactionIntegrityError:
+        rollback()  # a concurrent request stored the same days
+
+
 def get_db_data(known_games: typing.Set[str]) -> typing.Tuple[typing.Counter[str],
                                                               typing.DefaultDict[datetime.date, typing.Dict[str, int]]]:
     games_played = defaultdict(Counter)
     total_games = Counter()
-    cutoff = date.today() - timedelta(days=30)
-    room: Room
-    for room in select(room for room in Room if room.creation_time >= cutoff):
-        for slot in room.seed.slots:
-            if slot.game in known_games:
-                total_games[slot.game] += 1
-                games_played[room.creation_time.date()][slot.game] += 1
+    today = datetime.utcnow().date()
+    cutoff = today - timedelta(days=30)
+    rollup_games_played(cutoff, today)
+    days = list(select((games.date, games.game, games.count) for games in GamesPlayed if games.date >= cutoff))
+    days.extend((today, game, played) for game, played in count_games_played(today).items())
+    for day, game, played in days:
+        if game in known_games:
+            total_games[game] += played
+            games_played[day][game] += played
     return total_games, games_played
 
 
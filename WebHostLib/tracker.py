@@ -1,23 +1,32 @@
 import datetime
 import collections
+import sys
+import threading
+import time
 from dataclasses import dataclass
 from typing import Any, Callable, Dict, List, Optional, Set, Tuple, NamedTuple, Counter
 from uuid import UUID
 from email.utils import parsedate_to_datetime
 
 from flask import make_response, render_template, request, Request, Response
+from pony.orm import db_session, select
 from werkzeug.exceptions import abort
 
-from MultiServer import Context, get_saving_second
+from MultiServer import Context, apply_save_journal, get_saving_second
 from NetUtils import ClientStatus, Hint, NetworkItem, NetworkSlot, SlotType
 from Utils import restricted_loads, KeyedDefaultDict
 from . import app, cache
-from .models import GameDataPackage, Room
+from .models import GameDataPackage, Room, Seed, TrackerEvent, get_save_journal
 
 # Multisave is currently updated, at most, every minute.
 TRACKER_CACHE_TIMEOUT_IN_SECONDS = 60
+# How long a browser waits before requesting the event stream again after it ended.
+TRACKER_EVENT_RETRY_IN_MILLISECONDS = 5000
+
+# number of tracker event streams currently held open by this process, limited by TRACKER_EVENT_MAX_STREAMS
+_open_tracker_event_streams = 0
+_open_tracker_event_streams_lock = threading.Lock()
 
-_multidata_cache = {}
 _multiworld_trackers: Dict[str, Callable] = {}
 _player_trackers: Dict[str, Callable] = {}
 
@@ -41,6 +50,118 @@ def _cache_results(func: Callable) -> Callable:
     return method_wrapper
 
 
+class _DecodedCache:
+    """Process-wide LRU of decoded seed data and datapackage lookups, shared by all requests and tracker variants.
+
+    Seeds and datapackages never change once stored, so entries are only evicted to stay below the configured
+    TRACKER_DECODED_CACHE_ENTRIES and TRACKER_DECODED_CACHE_SIZE. Size is the estimated memory use of the decoded
+    value, see _get_decoded_size. Cached values are shared between threads, so they have to be fully decoded and
+    never changed afterwards.
+    """
+    def __init__(self) -> None:
+        self._entries: collections.OrderedDict[Tuple[str, Any], Tuple[Any, int]] = collections.OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, Any], load: Callable[[], Tuple[Any, int]]) -> Any:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key][0]
+
+        # decode outside the lock, a concurrent request for the same key only wastes some work
+        value, size = load()
+        max_entries = app.config["TRACKER_DECODED_CACHE_ENTRIES"]
+        max_size = app.config["TRACKER_DECODED_CACHE_SIZE"]
+        if max_entries <= 0 or size > max_size:
+            return value
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = value, size
+                self._size += size
+            while len(self._entries) > max_entries or self._size > max_size:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+_decoded_cache = _DecodedCache()
+
+
+def _get_decoded_size(value: Any) -> int:
+    """Estimates the memory use of a decoded object graph, counting objects shared within it once."""
+    seen: Set[int] = set()
+    size = 0
+    stack = [value]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif hasattr(obj, "__dict__"):
+            stack.append(vars(obj))
+    return size
+
+
+class _IdToName(Dict[int, str]):
+    """id to name lookup of a datapackage, naming unknown ids without adding them, as the lookup is shared."""
+    unknown: str
+
+    def __init__(self, unknown: str, names: Dict[int, str]) -> None:
+        super().__init__(names)
+        self.unknown = unknown
+
+    def __missing__(self, code: int) -> str:
+        return f"Unknown {self.unknown} (ID: {code})"
+
+
+class _GameLookups(NamedTuple):
+    item_id_to_name: Dict[int, str]
+    location_id_to_name: Dict[int, str]
+    item_name_to_id: Dict[str, int]
+    location_name_to_id: Dict[str, int]
+
+
+def _get_multidata(seed: Seed) -> Dict[str, Any]:
+    """Returns the decoded multidata of a seed, without loading the multidata blob from the database if cached."""
+    def load() -> Tuple[Dict[str, Any], int]:
+        multidata = Context.decompress(seed.multidata)
+        # decode all sections of the container format now, instead of on first access by concurrent requests
+        decoded = {key: multidata[key] for key in multidata}
+        if "slot_data" in decoded:
+            decoded["slot_data"] = {slot: data for slot, data in decoded["slot_data"].items()}
+        return decoded, _get_decoded_size(decoded)
+
+    return _decoded_cache.get(("seed", seed.id), load)
+
+
+def _get_game_lookups(checksum: str) -> _GameLookups:
+    """Returns the id and name lookup tables of the datapackage with the given checksum."""
+    def load() -> Tuple[_GameLookups, int]:
+        game_package = restricted_loads(GameDataPackage.get(checksum=checksum).data)
+        lookups = _GameLookups(
+            _IdToName("Item", {id: name for name, id in game_package["item_name_to_id"].items()}),
+            _IdToName("Location", {id: name for name, id in game_package["location_name_to_id"].items()}),
+            game_package["item_name_to_id"],
+            game_package["location_name_to_id"],
+        )
+        return lookups, _get_decoded_size(lookups)
+
+    return _decoded_cache.get(("datapackage", checksum), load)
+
+
 @dataclass
 class TrackerData:
     """A helper dataclass that is instantiated each time an HTTP request comes in for tracker data.
@@ -56,8 +177,9 @@ class TrackerData:
     def __init__(self, room: Room):
         """Initialize a new RoomMultidata object for the current room."""
         self.room = room
-        self._multidata = Context.decompress(room.seed.multidata)
+        self._multidata = _get_multidata(room.seed)
         self._multisave = restricted_loads(room.multisave) if room.multisave else {}
+        apply_save_journal(self._multisave, get_save_journal(room))
         self._tracker_cache = {}
 
         self.item_name_to_id: Dict[str, Dict[str, int]] = {}
@@ -71,15 +193,13 @@ class TrackerData:
             game_name: KeyedDefaultDict(lambda code: f"Unknown Game {game_name} - Location (ID: {code})")
         })
         for game, game_package in self._multidata["datapackage"].items():
-            game_package = restricted_loads(GameDataPackage.get(checksum=game_package["checksum"]).data)
-            self.item_id_to_name[game] = KeyedDefaultDict(lambda code: f"Unknown Item (ID: {code})", {
-                id: name for name, id in game_package["item_name_to_id"].items()})
-            self.location_id_to_name[game] = KeyedDefaultDict(lambda code: f"Unknown Location (ID: {code})", {
-                id: name for name, id in game_package["location_name_to_id"].items()})
+            lookups = _get_game_lookups(game_package["checksum"])
+            self.item_id_to_name[game] = lookups.item_id_to_name
+            self.location_id_to_name[game] = lookups.location_id_to_name
 
             # Normal lookup tables as well.
-            self.item_name_to_id[game] = game_package["item_name_to_id"]
-            self.location_name_to_id[game] = game_package["location_name_to_id"]
+            self.item_name_to_id[game] = lookups.item_name_to_id
+            self.location_name_to_id[game] = lookups.location_name_to_id
 
     def get_seed_name(self) -> str:
         """Retrieves the seed name."""
@@ -413,10 +533,10 @@ def render_generic_tracker(tracker_data: TrackerData, team: int, player: int) ->
 
     received_items_in_order = {}
     starting_inventory = tracker_data.get_player_starting_inventory(team, player)
+    received_items = tracker_data.get_player_received_items(team, player)
     for index, item in enumerate(starting_inventory):
         received_items_in_order[item] = index
-    for index, network_item in enumerate(tracker_data.get_player_received_items(team, player),
-                                         start=len(starting_inventory)):
+    for index, network_item in enumerate(received_items, start=len(starting_inventory)):
         received_items_in_order[network_item.item] = index
 
     return render_template(
@@ -431,6 +551,7 @@ def render_generic_tracker(tracker_data: TrackerData, team: int, player: int) ->
         locations=tracker_data.get_player_locations(team, player),
         checked_locations=tracker_data.get_player_checked_locations(team, player),
         received_items=received_items_in_order,
+        received_count=len(starting_inventory) + len(received_items),
         saving_second=tracker_data.get_room_saving_second(),
         game=game,
         games=tracker_data.get_room_games(),
@@ -487,6 +608,55 @@ def get_multiworld_sphere_tracker(tracker: UUID):
     return render_generic_multiworld_sphere_tracker(tracker_data)
 
 
+@app.route("/tracker_events/<suuid:tracker>")
+def get_tracker_events(tracker: UUID) -> Response:
+    """Server-sent event stream of the deltas a running room publishes, see customserver.WebHostContext.
+
+    Each event is one published batch, a JSON list of deltas. Without a Last-Event-ID all retained batches are sent,
+    trackers apply them idempotently on top of the possibly older rendered page.
+    The stream stays open for TRACKER_EVENT_STREAM_TIME seconds, after which browsers reconnect on their own.
+    Beyond TRACKER_EVENT_MAX_STREAMS open streams, the pending events are answered right away instead.
+    """
+    room = Room.get(tracker=tracker)
+    if not room:
+        abort(404)
+    room_id = room.id
+
+    try:
+        last_event_id = int(request.headers.get("Last-Event-ID", request.args.get("last_event_id", 0)))
+    except ValueError:
+        abort(400)
+    stream_time: float = app.config["TRACKER_EVENT_STREAM_TIME"]
+    max_streams: int = app.config["TRACKER_EVENT_MAX_STREAMS"]
+
+    def stream():
+        global _open_tracker_event_streams
+        nonlocal last_event_id
+        with _open_tracker_event_streams_lock:
+            held_open = _open_tracker_event_streams < max_streams
+            if held_open:
+                _open_tracker_event_streams += 1
+        try:
+            yield f"retry: {TRACKER_EVENT_RETRY_IN_MILLISECONDS}\n\n"
+            end = time.monotonic() + (stream_time if held_open else 0)
+            while True:
+                with db_session:
+                    events = [(event.id, event.data) for event in
+                              select(event for event in TrackerEvent if event.room.id == room_id
+                                     and event.id > last_event_id).order_by(TrackerEvent.id)]
+                for last_event_id, data in events:
+                    yield f"id: {last_event_id}\ndata: {data}\n\n"
+                if time.monotonic() >= end:
+                    break
+                time.sleep(1)
+        finally:
+            if held_open:
+                with _open_tracker_event_streams_lock:
+                    _open_tracker_event_streams -= 1
+
+    return Response(stream(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
 # TODO: This is a temporary solution until a proper Tracker API can be implemented for tracker templates and data to
 #       live in their respective world folders.
 
@@ -1,4 +1,5 @@
 import base64
+import functools
 import json
 import pickle
 import typing
@@ -14,7 +15,7 @@ from pony.orm.core import TransactionIntegrityError
 import schema
 
 import MultiServer
-from NetUtils import SlotType
+from NetUtils import Multidata, SlotType, encode_multidata
 from Utils import VersionException, __version__
 from worlds import GamesPackage
 from worlds.Files import AutoPatchRegister
@@ -49,28 +50,56 @@ def banned_file(filename: str) -> bool:
 
 
 def process_multidata(compressed_multidata, files={}):
-    game_data: GamesPackage
-
     decompressed_multidata = MultiServer.Context.decompress(compressed_multidata)
+    if isinstance(decompressed_multidata, Multidata):
+        # nothing is stored before every section passed restricted_loads, including those only copied over.
+        # the sections changed below are decoded for good, so each section is loaded exactly once.
+        for key in ("datapackage", "slot_info"):
+            if key in decompressed_multidata:
+                decompressed_multidata[key]
+        decompressed_multidata.check_sections()
+    slots = store_multidata_rows(decompressed_multidata, files, True)
+
+    if isinstance(decompressed_multidata, Multidata):
+        # only the sections touched above get encoded again
+        compressed_multidata = encode_multidata(decompressed_multidata)
+    else:
+        compressed_multidata = compressed_multidata[0:1] + zlib.compress(pickle.dumps(decompressed_multidata), 9)
+    return slots, compressed_multidata
+
+
+def process_generated_multidata(multidata: typing.Dict[str, typing.Any], files={}):
+    """Like process_multidata, for multidata handed over in memory by Main.main in this process,
+    which does not have to be decoded and validated first."""
+    slots = store_multidata_rows(multidata, files, False)
+    return slots, encode_multidata(multidata)
+
+
+def store_multidata_rows(multidata: typing.MutableMapping[str, typing.Any], files: typing.Dict[int, bytes],
+                         validate: bool) -> typing.Set[Slot]:
+    """Moves the data packages of multidata into GameDataPackage rows, leaving only their checksums,
+    and creates the Slot rows for its players."""
+    game_data: GamesPackage
 
     slots: typing.Set[Slot] = set()
-    if "datapackage" in decompressed_multidata:
+    if "datapackage" in multidata:
         # strip datapackage from multidata, leaving only the checksums
         game_data_packages: typing.List[GameDataPackage] = []
-        for game, game_data in decompressed_multidata["datapackage"].items():
+        for game, game_data in multidata["datapackage"].items():
             if game_data.get("checksum"):
-                original_checksum = game_data.pop("checksum")
-                game_data = games_package_schema.validate(game_data)
-                game_data = {key: value for key, value in sorted(game_data.items())}
-                game_data["checksum"] = data_package_checksum(game_data)
-                if original_checksum != game_data["checksum"]:
-                    raise Exception(f"Original checksum {original_checksum} != "
-                                    f"calculated checksum {game_data['checksum']} "
-                                    f"for game {game}.")
+                if validate:
+                    original_checksum = game_data.pop("checksum")
+                    game_data = games_package_schema.validate(game_data)
+                    game_data = {key: value for key, value in sorted(game_data.items())}
+                    game_data["checksum"] = data_package_checksum(game_data)
+                    if original_checksum != game_data["checksum"]:
+                        raise Exception(f"Original checksum {original_checksum} != "
+                                        f"calculated checksum {game_data['checksum']} "
+                                        f"for game {game}.")
 
                 game_data_package = GameDataPackage(checksum=game_data["checksum"],
                                                     data=pickle.dumps(game_data))
-                decompressed_multidata["datapackage"][game] = {
+                multidata["datapackage"][game] = {
                     "version": game_data.get("version", 0),
                     "checksum": game_data["checksum"],
                 }
@@ -81,8 +110,8 @@ def process_multidata(compressed_multidata, files={}):
                     del game_data_package
                     rollback()
 
-    if "slot_info" in decompressed_multidata:
-        for slot, slot_info in decompressed_multidata["slot_info"].items():
+    if "slot_info" in multidata:
+        for slot, slot_info in multidata["slot_info"].items():
             # Ignore Player Groups (e.g. item links)
             if slot_info.type == SlotType.group:
                 continue
@@ -91,88 +120,99 @@ def process_multidata(compressed_multidata, files={}):
                            player_id=slot,
                            game=slot_info.game))
         flush()  # commit slots
-
-    compressed_multidata = compressed_multidata[0:1] + zlib.compress(pickle.dumps(decompressed_multidata), 9)
-    return slots, compressed_multidata
+    return slots
 
 
 def upload_zip_to_db(zfile: zipfile.ZipFile, owner=None, meta={"race": False}, sid=None):
-    if not owner:
-        owner = session["_id"]
     infolist = zfile.infolist()
     if all(allowed_options(file.filename) or file.is_dir() for file in infolist):
         flash(Markup("Error: Your .zip file only contains options files. "
                      'Did you mean to <a href="/generate">generate a game</a>?'))
         return
 
+    return upload_files_to_db(((file.filename, functools.partial(zfile.read, file)) for file in infolist),
+                              owner, meta, sid)
+
+
+def upload_files_to_db(named_files: typing.Iterable[typing.Tuple[str, typing.Callable[[], bytes]]], owner=None,
+                       meta={"race": False}, sid=None,
+                       generated_multidata: typing.Optional[typing.Dict[str, typing.Any]] = None):
+    """Creates a Seed from the files of a generation, given as file names and functions reading their content.
+    generated_multidata is the multidata handed over in memory by Main.main, if it is not one of the files."""
+    if not owner:
+        owner = session["_id"]
+
     spoiler = ""
     files = {}
     multidata = None
 
     # Load files.
-    for file in infolist:
-        handler = AutoPatchRegister.get_handler(file.filename)
-        if banned_file(file.filename):
+    for filename, read in named_files:
+        handler = AutoPatchRegister.get_handler(filename)
+        if banned_file(filename):
             return "Uploaded data contained a rom file, which is likely to contain copyrighted material. " \
                    "Your file was deleted."
 
         # AP Container
         elif handler:
-            data = zfile.open(file, "r").read()
+            data = read()
             patch = handler(BytesIO(data))
             patch.read()
             files[patch.player] = data
 
         # Spoiler
-        elif file.filename.endswith(".txt"):
-            spoiler = zfile.open(file, "r").read().decode("utf-8-sig")
+        elif filename.endswith(".txt"):
+            spoiler = read().decode("utf-8-sig")
 
         # Multi-data
-        elif file.filename.endswith(".archipelago"):
+        elif filename.endswith(".archipelago"):
             try:
-                multidata = zfile.open(file).read()
+                multidata = read()
             except:
                 flash("Could not load multidata. File may be corrupted or incompatible.")
                 multidata = None
 
         # Minecraft
-        elif file.filename.endswith(".apmc"):
-            data = zfile.open(file, "r").read()
+        elif filename.endswith(".apmc"):
+            data = read()
             metadata = json.loads(base64.b64decode(data).decode("utf-8"))
             files[metadata["player_id"]] = data
 
         # Factorio
-        elif file.filename.endswith(".zip"):
+        elif filename.endswith(".zip"):
             try:
-                _, _, slot_id, *_ = file.filename.split('_')[0].split('-', 3)
+                _, _, slot_id, *_ = filename.split('_')[0].split('-', 3)
             except ValueError:
-                flash("Error: Unexpected file found in .zip: " + file.filename)
+                flash("Error: Unexpected file found in .zip: " + filename)
                 return
-            data = zfile.open(file, "r").read()
+            data = read()
             files[int(slot_id[1:])] = data
 
         # All other files using the standard MultiWorld.get_out_file_name_base method
         else:
             try:
-                _, _, slot_id, *_ = file.filename.split('.')[0].split('_', 3)
+                _, _, slot_id, *_ = filename.split('.')[0].split('_', 3)
             except ValueError:
-                flash("Error: Unexpected file found in .zip: " + file.filename)
+                flash("Error: Unexpected file found in .zip: " + filename)
                 return
-            data = zfile.open(file, "r").read()
+            data = read()
             files[int(slot_id[1:])] = data
 
     # Load multi data.
-    if multidata:
+    if generated_multidata:
+        slots, multidata = process_generated_multidata(generated_multidata, files)
+    elif multidata:
         slots, multidata = process_multidata(multidata, files)
-
-        seed = Seed(multidata=multidata, spoiler=spoiler, slots=slots, owner=owner, meta=json.dumps(meta),
-                    id=sid if sid else uuid.uuid4())
-        flush()  # create seed
-        for slot in slots:
-            slot.seed = seed
-        return seed
     else:
         flash("No multidata was found in the zip file, which is required.")
+        return
+
+    seed = Seed(multidata=multidata, spoiler=spoiler, slots=slots, owner=owner, meta=json.dumps(meta),
+                id=sid if sid else uuid.uuid4())
+    flush()  # create seed
+    for slot in slots:
+        slot.seed = seed
+    return seed
 
 
 @app.route("/uploads", methods=["GET", "POST"])
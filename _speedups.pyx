@@ -1,6 +1,5 @@
 #cython: language_level=3
 #distutils: language = c
-#distutils: depends = intset.h
 
 """
 Provides faster implementation of some core parts.
@@ -27,32 +26,12 @@ cdef extern from *:
 ctypedef uint32_t ap_player_t  # on AMD64 this is faster (and smaller) than 64bit ints
 ctypedef uint32_t ap_flags_t
 ctypedef int64_t ap_id_t
+ctypedef uint32_t ap_entry_index_t  # index into LocationStore.entries, half the size of size_t on 64bit
 
 cdef ap_player_t MAX_PLAYER_ID = 1000000  # limit the size of indexing array
+cdef size_t MAX_ENTRY_COUNT = 0xffffffff  # limit of ap_entry_index_t
 cdef size_t INVALID_SIZE = <size_t>(-1)  # this is all 0xff... adding 1 results in 0, but it's not negative
 
-# configure INTSET for player
-cdef extern from *:
-    """
-    #define INTSET_NAME ap_player_set
-    #define INTSET_TYPE uint32_t  // has to match ap_player_t
-    """
-
-# create INTSET for player
-cdef extern from "intset.h":
-    """
-    #undef INTSET_NAME
-    #undef INTSET_TYPE
-    """
-    ctypedef struct ap_player_set:
-        pass
-
-    ap_player_set* ap_player_set_new(size_t bucket_count) nogil
-    void ap_player_set_free(ap_player_set* set) nogil
-    bint ap_player_set_add(ap_player_set* set, ap_player_t val) nogil
-    bint ap_player_set_contains(ap_player_set* set, ap_player_t val) nogil
-
-
 cdef struct LocationEntry:
     # layout is so that
     # 64bit player: location+sender and item+receiver 128bit comparisons, if supported
@@ -92,6 +71,9 @@ cdef class LocationStore:
     cdef size_t entry_count
     cdef IndexEntry* sender_index  # 16KB/1000 players
     cdef size_t sender_index_size
+    cdef ap_entry_index_t* receiver_entries  # 400KB/100k items, entries sorted by receiver, item
+    cdef IndexEntry* receiver_index  # 16KB/1000 players, ranges in receiver_entries
+    cdef size_t receiver_index_size
     cdef list _keys  # ~36KB/1000 players, speed up iter (28 per int + 8 per list entry)
     cdef list _items  # ~64KB/1000 players, speed up items (56 per tuple + 8 per list entry)
     cdef list _proxies  # ~92KB/1000 players, speed up self[player] (56 per struct + 28 per len + 8 per list entry)
@@ -100,7 +82,8 @@ cdef class LocationStore:
     def get_size(self):
         from sys import getsizeof
         size = getsizeof(self) + getsizeof(self._mem) + getsizeof(self._len) \
-                + sizeof(LocationEntry) * self.entry_count + sizeof(IndexEntry) * self.sender_index_size
+                + sizeof(LocationEntry) * self.entry_count + sizeof(IndexEntry) * self.sender_index_size \
+                + sizeof(ap_entry_index_t) * self.entry_count + sizeof(IndexEntry) * self.receiver_index_size
         size += getsizeof(self._keys) + getsizeof(self._items) + getsizeof(self._proxies)
         size += sum(sizeof(key) for key in self._keys)
         size += sum(sizeof(item) for item in self._items)
@@ -117,6 +100,7 @@ cdef class LocationStore:
 
         # iterate over everything to get all maxima and validate everything
         cdef size_t max_sender = INVALID_SIZE  # keep track of highest used player id for indexing
+        cdef size_t max_receiver = 0
         cdef size_t sender_count = 0
         cdef size_t count = 0
         for sender, locations in locations_dict.items():
@@ -131,6 +115,7 @@ cdef class LocationStore:
                 receiver = data[1]
                 if receiver < 1 or receiver > MAX_PLAYER_ID:
                     raise ValueError(f"Invalid player id {receiver} for item")
+                max_receiver = max(max_receiver, receiver)
                 count += 1
             sender_count += 1
 
@@ -143,15 +128,21 @@ cdef class LocationStore:
 
         if not count:
             warnings.warn("Game has no locations")
+        elif count > MAX_ENTRY_COUNT:
+            raise ValueError(f"Too many locations ({count})")
 
         # allocate the arrays and invalidate index (0xff...)
         if count:
             # leaving entries as NULL if there are none, makes potential memory errors more visible
             self.entries = <LocationEntry*>self._mem.alloc(count, sizeof(LocationEntry))
+            self.receiver_entries = <ap_entry_index_t*>self._mem.alloc(count, sizeof(ap_entry_index_t))
         self.sender_index = <IndexEntry*>self._mem.alloc(max_sender + 1, sizeof(IndexEntry))
         self._raw_proxies = <PyObject**>self._mem.alloc(max_sender + 1, sizeof(PyObject*))
+        self.receiver_index = <IndexEntry*>self._mem.alloc(max_receiver + 1, sizeof(IndexEntry))
 
         assert (not self.entries) == (not count)
+        assert (not self.receiver_entries) == (not count)
+        assert self.receiver_index
         assert self.sender_index
         assert self._raw_proxies
 
@@ -172,6 +163,16 @@ cdef class LocationStore:
                 self.sender_index[sender].count += 1
                 i += 1
 
+        # build receiver index, sorted by receiver, then item, then entry, which keeps sender, location order
+        cdef ap_player_t receiver_id
+        cdef list receiver_order = sorted([(self.entries[i].receiver, self.entries[i].item, i) for i in range(count)])
+        for i, (receiver_id, _, entry_index) in enumerate(receiver_order):
+            if not self.receiver_index[receiver_id].count:
+                self.receiver_index[receiver_id].start = i
+            self.receiver_index[receiver_id].count += 1
+            self.receiver_entries[i] = entry_index
+        del receiver_order
+
         # build pyobject caches
         self._proxies.append(None)  # player 0
         assert self.sender_index[0].count == 0
@@ -187,6 +188,7 @@ cdef class LocationStore:
             self._raw_proxies[i] = <PyObject*>proxy
 
         self.sender_index_size = max_sender + 1
+        self.receiver_index_size = max_receiver + 1
         self.entry_count = count
         self._len = sender_count
 
@@ -215,48 +217,65 @@ cdef class LocationStore:
         return self._items
 
     # specialized accessors
+    cdef size_t _find_receiver_item(self, ap_player_t receiver, ap_id_t item) nogil:
+        # returns the position of the first entry for receiver, item in receiver_entries or INVALID_SIZE
+        if receiver >= self.receiver_index_size:
+            return INVALID_SIZE
+        # binary search, receiver's range is sorted by item
+        cdef size_t l = self.receiver_index[receiver].start
+        cdef size_t e = l + self.receiver_index[receiver].count
+        cdef size_t r = e
+        cdef size_t m
+        while l < r:
+            m = (l + r) // 2
+            if self.entries[self.receiver_entries[m]].item < item:
+                l = m + 1
+            else:
+                r = m
+        if l < e and self.entries[self.receiver_entries[l]].item == item:
+            return l
+        return INVALID_SIZE
+
     def find_item(self, slots: Set[int], seeked_item_id: int) -> Generator[Tuple[int, int, int, int, int], None, None]:
         cdef ap_id_t item = seeked_item_id
         cdef ap_player_t receiver
-        cdef ap_player_set* receivers
-        cdef size_t slot_count = len(slots)
-        if slot_count == 1:
-            # specialized implementation for single slot
-            receiver = list(slots)[0]
-            with nogil:
-                for entry in self.entries[:self.entry_count]:
-                    if entry.item == item and entry.receiver == receiver:
-                        with gil:
-                            yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
-        elif slot_count:
-            # generic implementation with lookup in set
-            receivers = ap_player_set_new(min(1023, slot_count))  # limit top level struct to 16KB
-            if not receivers:
-                raise MemoryError()
-            try:
-                for receiver in slots:
-                    if not ap_player_set_add(receivers, receiver):
-                        raise MemoryError()
-                with nogil:
-                    for entry in self.entries[:self.entry_count]:
-                        if entry.item == item and ap_player_set_contains(receivers, entry.receiver):
-                            with gil:
-                                yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
-            finally:
-                ap_player_set_free(receivers)
+        cdef LocationEntry* entry
+        cdef size_t i
+        cdef list found = []
+        for slot in slots:
+            if slot < 0 or slot > MAX_PLAYER_ID:
+                continue
+            receiver = slot
+            i = self._find_receiver_item(receiver, item)
+            if i == INVALID_SIZE:
+                continue
+            while i < self.entry_count and self.entries[self.receiver_entries[i]].receiver == receiver \
+                    and self.entries[self.receiver_entries[i]].item == item:
+                found.append(self.receiver_entries[i])
+                i += 1
+        if len(slots) > 1:
+            found.sort()  # yield in sender, location order, same as a full scan would
+        for i in found:
+            entry = self.entries + i
+            yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
 
     def get_for_player(self, slot: int) -> Dict[int, Set[int]]:
-        cdef ap_player_t receiver = slot
         all_locations: Dict[int, Set[int]] = {}
-        with nogil:
-            for entry in self.entries[:self.entry_count]:
-                if entry.receiver == receiver:
-                    with gil:
-                        sender: int = entry.sender
-                        if sender not in all_locations:
-                            all_locations[sender] = set()
-                        all_locations[sender].add(entry.location)
-        return all_locations
+        if slot < 0 or slot >= self.receiver_index_size:
+            return all_locations
+        cdef ap_player_t receiver = slot
+        cdef LocationEntry* entry
+        cdef ap_entry_index_t i
+        cdef size_t start = self.receiver_index[receiver].start
+        cdef size_t count = self.receiver_index[receiver].count
+        for i in self.receiver_entries[start:start + count]:
+            entry = self.entries + i
+            sender: int = entry.sender
+            if sender not in all_locations:
+                all_locations[sender] = set()
+            all_locations[sender].add(entry.location)
+        # receiver's range is sorted by item first, restore sender order
+        return {sender: all_locations[sender] for sender in sorted(all_locations)}
 
     def get_checked(self, state: State, team: int, slot: int) -> List[int]:
         cdef ap_player_t sender = slot
@@ -0,0 +1,171 @@
+"""
+Opt-in profiling of a generation, enabled with Generate.py --profile.
+
+Each measured call records its wall time, the CPU time of the thread it ran on and how much the peak resident set size
+of the process grew, attributed to a stage and, for calls into worlds, to the world's game and the player.
+The results can be written as a JSON summary and as a trace that can be loaded into chrome://tracing or Perfetto.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, NamedTuple, Optional, Tuple, TypeVar
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+T = TypeVar("T")
+
+__all__ = ["GenerationProfiler", "ProfileRecord", "get_peak_rss", "measure", "measure_call"]
+
+
+def get_peak_rss() -> Optional[int]:
+    """Returns the peak resident set size of this process in bytes, or None if the platform does not report it."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # kibibytes everywhere but macOS
+
+
+class ProfileRecord(NamedTuple):
+    stage: str
+    game: Optional[str]
+    """game of the world that was called, None for stages that are not a call into a world"""
+    player: Optional[int]
+    """player of the world that was called, None for stage methods and stages that are not a call into a world"""
+    start: float
+    """seconds since profiling started"""
+    wall: float
+    cpu: float
+    peak_rss_delta: Optional[int]
+    """growth of the peak resident set size of the whole process in bytes, while this call ran"""
+    process: int
+    thread: int
+
+
+class GenerationProfiler:
+    """
+    Collects ProfileRecords of a generation.
+
+    Records of a stage and of the world calls it is made of overlap, so totals per stage are only summed up from records
+    that have neither a game nor a player. Measuring is thread-safe, CPU time is that of the measuring thread, while
+    peak RSS growth is process-wide and can be attributed to any of the stages running at the same time.
+    """
+    records: List[ProfileRecord]
+    seed_name: str
+    player_names: Dict[int, str]
+
+    def __init__(self) -> None:
+        self.records = []
+        self.seed_name = ""
+        self.player_names = {}
+        self.start = time.perf_counter()
+
+    @contextmanager
+    def measure(self, stage: str, game: Optional[str] = None, player: Optional[int] = None) -> Iterator[None]:
+        peak_rss = get_peak_rss()
+        cpu = time.thread_time()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start
+            cpu = time.thread_time() - cpu
+            peak_rss_delta = None if peak_rss is None else get_peak_rss() - peak_rss
+            # list.append is atomic, so threads can record without a lock
+            self.records.append(ProfileRecord(stage, game, player, start - self.start, wall, cpu, peak_rss_delta,
+                                              os.getpid(), threading.get_ident()))
+
+    @staticmethod
+    def _add(totals: Dict[str, Dict[str, Any]], record: ProfileRecord) -> None:
+        stage = totals.setdefault(record.stage, {"calls": 0, "wall": 0.0, "cpu": 0.0, "peak_rss_delta": None})
+        stage["calls"] += 1
+        stage["wall"] += record.wall
+        stage["cpu"] += record.cpu
+        if record.peak_rss_delta is not None:
+            stage["peak_rss_delta"] = max(stage["peak_rss_delta"] or 0, record.peak_rss_delta)
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Returns the totals of all records per stage, per game and per player, slowest first.
+        Times are in seconds, peak_rss_delta is the largest growth of a single call in bytes.
+        """
+        stages: Dict[str, Dict[str, Any]] = {}
+        games: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        players: Dict[int, Dict[str, Dict[str, Any]]] = {}
+        player_games: Dict[int, str] = {}
+        for record in self.records:
+            if record.game is None and record.player is None:
+                self._add(stages, record)
+            if record.game is not None:
+                self._add(games.setdefault(record.game, {}), record)
+            if record.player is not None:
+                self._add(players.setdefault(record.player, {}), record)
+                player_games[record.player] = record.game
+
+        def by_wall(totals: Dict[Any, Dict[str, Any]]) -> Dict[Any, Dict[str, Any]]:
+            return dict(sorted(totals.items(), key=lambda item: item[1]["wall"], reverse=True))
+
+        def total_wall(totals: Dict[str, Dict[str, Any]]) -> float:
+            return sum(stage["wall"] for stage in totals.values())
+
+        return {
+            "seed_name": self.seed_name,
+            "wall": time.perf_counter() - self.start,
+            "stages": by_wall(stages),
+            "games": {game: {"wall": total_wall(totals), "stages": by_wall(totals)}
+                      for game, totals in sorted(games.items(), key=lambda item: total_wall(item[1]), reverse=True)},
+            "players": {player: {"name": self.player_names.get(player, f"Player{player}"), "game": player_games[player],
+                                 "wall": total_wall(totals), "stages": by_wall(totals)}
+                        for player, totals in sorted(players.items(), key=lambda item: total_wall(item[1]),
+                                                     reverse=True)},
+        }
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """Returns all records as complete events of the Chrome Trace Event Format, one track per thread."""
+        threads: Dict[Tuple[int, int], int] = {}
+        events: List[Dict[str, Any]] = []
+        for record in sorted(self.records, key=lambda record: record.start):
+            name = record.stage
+            if record.player is not None:
+                name += f" {self.player_names.get(record.player, f'Player{record.player}')} ({record.game})"
+            elif record.game is not None:
+                name += f" ({record.game})"
+            events.append({
+                "name": name,
+                "cat": "world" if record.game is not None else "stage",
+                "ph": "X",
+                "ts": record.start * 1_000_000,
+                "dur": record.wall * 1_000_000,
+                "pid": record.process,
+                "tid": threads.setdefault((record.process, record.thread), len(threads)),
+                "args": {"cpu": record.cpu, "peak_rss_delta": record.peak_rss_delta,
+                         "game": record.game, "player": record.player},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write(self, summary_path: str, trace_path: str) -> None:
+        with open(summary_path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+        with open(trace_path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+
+
+def measure(profiler: Optional[GenerationProfiler], stage: str,
+            game: Optional[str] = None, player: Optional[int] = None) -> ContextManager[None]:
+    """Measures a stage with profiler, or does nothing if profiling is disabled."""
+    if profiler is None:
+        return nullcontext()
+    return profiler.measure(stage, game, player)
+
+
+def measure_call(profiler: Optional[GenerationProfiler], stage: str, function: Callable[..., T], *args: Any) -> T:
+    """Calls function with args, measured as stage. Useful to measure work submitted to an executor."""
+    with measure(profiler, stage):
+        return function(*args)
@@ -5,3 +5,9 @@ if __name__ == "__main__":
     load_worlds.run_load_worlds_benchmark()
     import locations
     locations.run_locations_benchmark()
+    import collection_state_copy
+    collection_state_copy.run_collection_state_copy_benchmark()
+    import fill
+    fill.run_fill_benchmark()
+    import memory
+    memory.run_memory_benchmark()
@@ -0,0 +1,80 @@
+def run_collection_state_copy_benchmark():
+    """Compare the cost of CollectionState.copy with and without copy_on_write as player count grows."""
+    import argparse
+    import logging
+    import gc
+    import typing
+
+    from time_it import TimeIt
+
+    from Utils import init_logging
+    from BaseClasses import MultiWorld, CollectionState
+    from worlds import AutoWorld
+    from worlds.AutoWorld import call_all
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    class BenchmarkRunner:
+        game: str = "Timespinner"
+        player_counts: typing.Tuple[int, ...] = (1, 10, 50, 100, 250)
+        gen_steps: typing.Tuple[str, ...] = (
+            "generate_early",
+            "create_regions",
+            "create_items",
+            "set_rules",
+            "connect_entrances",
+        )
+        copy_iterations: int = 1_000
+
+        def create_multiworld(self, players: int) -> MultiWorld:
+            multiworld = MultiWorld(players)
+            multiworld.game = {player: self.game for player in multiworld.player_ids}
+            multiworld.player_name = {player: f"Tester{player}" for player in multiworld.player_ids}
+            multiworld.set_seed(0)
+            multiworld.state = CollectionState(multiworld)
+            args = argparse.Namespace()
+            for name, option in AutoWorld.AutoWorldRegister.world_types[self.game].options_dataclass.type_hints.items():
+                setattr(args, name, {
+                    player: option.from_any(getattr(option, "default")) for player in multiworld.player_ids
+                })
+            multiworld.set_options(args)
+            for step in self.gen_steps:
+                call_all(multiworld, step)
+            return multiworld
+
+        def copy_test(self, state: CollectionState, players: int, copy_on_write: bool) -> float:
+            # speculative use as done by fill: copy, collect a single item for a single player, check reachability
+            item = next(iter(state.multiworld.itempool))
+            origin = state.multiworld.worlds[item.player].get_region(
+                state.multiworld.worlds[item.player].origin_region_name)
+            with TimeIt(f"{players} players {self.copy_iterations} "
+                        f"{'copy on write' if copy_on_write else 'full'} copies", logger) as t:
+                for _ in range(self.copy_iterations):
+                    copy = state.copy(copy_on_write=copy_on_write)
+                    copy.collect(item, True)
+                    origin.can_reach(copy)
+            return t.dif
+
+        def main(self):
+            results: typing.Dict[int, typing.Tuple[float, float]] = {}
+            for players in self.player_counts:
+                multiworld = self.create_multiworld(players)
+                state = multiworld.get_all_state(False)
+                gc.collect()
+                results[players] = (self.copy_test(state, players, False), self.copy_test(state, players, True))
+                del multiworld, state
+                gc.collect()
+
+            for players, (full, copy_on_write) in results.items():
+                logger.info(f"{players:4} players: {full / self.copy_iterations * 1_000_000:10.2f} us per full copy, "
+                            f"{copy_on_write / self.copy_iterations * 1_000_000:10.2f} us per copy on write copy.")
+
+    runner = BenchmarkRunner()
+    runner.main()
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_collection_state_copy_benchmark()
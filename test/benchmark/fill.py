@@ -0,0 +1,84 @@
+def run_fill_benchmark():
+    """Compare finding placement candidates through PlacementCandidates against a scan over all open locations."""
+    import argparse
+    import gc
+    import logging
+    import typing
+
+    from time_it import TimeIt
+
+    from Utils import init_logging
+    from BaseClasses import CollectionState, Location, MultiWorld
+    from worlds import AutoWorld
+    from worlds.AutoWorld import call_all
+    from Fill import PlacementCandidates, distribute_items_restrictive, sweep_from_pool
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    class BenchmarkRunner:
+        # games that don't need a ROM and have restrictive item rules or many locations
+        games: typing.Tuple[str, ...] = ("Timespinner", "Hollow Knight", "Clique", "A Hat in Time")
+        player_counts: typing.Tuple[int, ...] = (10, 50, 150)
+        gen_steps: typing.Tuple[str, ...] = (
+            "generate_early",
+            "create_regions",
+            "create_items",
+            "set_rules",
+            "connect_entrances",
+            "generate_basic",
+            "pre_fill",
+        )
+
+        def create_multiworld(self, players: int) -> MultiWorld:
+            multiworld = MultiWorld(players)
+            multiworld.game = {player: self.games[player % len(self.games)] for player in multiworld.player_ids}
+            multiworld.player_name = {player: f"Tester{player}" for player in multiworld.player_ids}
+            multiworld.set_seed(0)
+            multiworld.state = CollectionState(multiworld)
+            args = argparse.Namespace()
+            for player, game in multiworld.game.items():
+                for name, option in AutoWorld.AutoWorldRegister.world_types[game].options_dataclass.type_hints.items():
+                    player_options = getattr(args, name, {})
+                    player_options[player] = option.from_any(option.default)
+                    setattr(args, name, player_options)
+            multiworld.set_options(args)
+            for step in self.gen_steps:
+                call_all(multiworld, step)
+            return multiworld
+
+        def find_test(self, multiworld: MultiWorld, players: int) -> None:
+            # every progression item looks for its first fit in all open locations, as fill_restrictive does
+            items = [item for item in multiworld.itempool if item.advancement]
+            locations: typing.List[Location] = multiworld.get_unfilled_locations()
+            multiworld.random.shuffle(locations)
+            state = sweep_from_pool(multiworld.state, items)
+            logger.info(f"{players} players: {len(items)} progression items, {len(locations)} open locations")
+
+            with TimeIt(f"{players} players scanning locations", logger):
+                scanned = [next((location for location in locations if location.can_fill(state, item, True)), None)
+                           for item in items]
+            with TimeIt(f"{players} players building candidate index", logger):
+                candidates = PlacementCandidates(locations)
+            with TimeIt(f"{players} players finding candidates", logger):
+                found = [candidates.find(state, item, True) for item in items]
+            assert found == scanned, "candidate index has to find the same locations as a scan"
+
+        def main(self) -> None:
+            for players in self.player_counts:
+                multiworld = self.create_multiworld(players)
+                gc.collect()
+                self.find_test(multiworld, players)
+                with TimeIt(f"{players} players distribute_items_restrictive", logger):
+                    distribute_items_restrictive(multiworld)
+                del multiworld
+                gc.collect()
+
+    runner = BenchmarkRunner()
+    runner.main()
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_fill_benchmark()
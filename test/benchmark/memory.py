@@ -0,0 +1,96 @@
+def run_memory_benchmark():
+    """Report how much memory Locations, Entrances and Regions take, by themselves and within a generation."""
+    import argparse
+    import gc
+    import logging
+    import tracemalloc
+    import typing
+
+    from Utils import init_logging
+    from BaseClasses import CollectionState, Entrance, Location, MultiWorld, Region
+    from worlds import AutoWorld
+    from worlds.AutoWorld import call_all
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    class BenchmarkRunner:
+        games: typing.Tuple[str, ...] = ("Timespinner", "Clique", "A Hat in Time")
+        player_counts: typing.Tuple[int, ...] = (50, 250, 500)
+        setup_steps: typing.Tuple[str, ...] = ("generate_early",)
+        # the steps that create the regions, their locations and entrances, and the rules on them
+        measured_steps: typing.Tuple[str, ...] = ("create_regions", "create_items", "set_rules", "connect_entrances")
+        object_count: int = 100_000
+
+        def create_multiworld(self, players: int) -> MultiWorld:
+            multiworld = MultiWorld(players)
+            multiworld.game = {player: self.games[player % len(self.games)] for player in multiworld.player_ids}
+            multiworld.player_name = {player: f"Tester{player}" for player in multiworld.player_ids}
+            multiworld.set_seed(0)
+            multiworld.state = CollectionState(multiworld)
+            args = argparse.Namespace()
+            for player, game in multiworld.game.items():
+                for name, option in AutoWorld.AutoWorldRegister.world_types[game].options_dataclass.type_hints.items():
+                    player_options = getattr(args, name, {})
+                    player_options[player] = option.from_any(option.default)
+                    setattr(args, name, player_options)
+            multiworld.set_options(args)
+            for step in self.setup_steps:
+                call_all(multiworld, step)
+            return multiworld
+
+        def object_test(self) -> None:
+            # objects as created by most worlds: a region with exits and locations, which all get an access rule
+            multiworld = MultiWorld(1)
+            regions: typing.List[Region] = []
+            locations: typing.List[Location] = []
+            entrances: typing.List[Entrance] = []
+            gc.collect()
+            tracemalloc.start()
+            for index in range(self.object_count):
+                regions.append(Region(f"Region {index}", 1, multiworld))
+            region_size = tracemalloc.get_traced_memory()[0]
+            for index in range(self.object_count):
+                location = Location(1, f"Location {index}", index, regions[index])
+                location.access_rule = lambda state: True
+                locations.append(location)
+            location_size = tracemalloc.get_traced_memory()[0] - region_size
+            for index in range(self.object_count):
+                entrance = Entrance(1, f"Entrance {index}", regions[index])
+                entrance.access_rule = lambda state: True
+                entrances.append(entrance)
+            entrance_size = tracemalloc.get_traced_memory()[0] - region_size - location_size
+            tracemalloc.stop()
+            for name, size in (("Region", region_size), ("Location", location_size), ("Entrance", entrance_size)):
+                logger.info(f"{name:8}: {size / self.object_count:8.1f} bytes per object, including its name.")
+
+        def generation_test(self, players: int) -> None:
+            multiworld = self.create_multiworld(players)
+            gc.collect()
+            tracemalloc.start()
+            for step in self.measured_steps:
+                call_all(multiworld, step)
+            gc.collect()
+            size, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            regions = len(multiworld.regions)
+            locations = len(multiworld.get_locations())
+            entrances = len(multiworld.get_entrances())
+            logger.info(f"{players:4} players: {regions} regions, {locations} locations, {entrances} entrances "
+                        f"in {size / 1024 / 1024:.1f} MiB ({peak / 1024 / 1024:.1f} MiB peak), "
+                        f"{size / (regions + locations + entrances):.1f} bytes per object.")
+
+        def main(self) -> None:
+            self.object_test()
+            for players in self.player_counts:
+                self.generation_test(players)
+                gc.collect()
+
+    runner = BenchmarkRunner()
+    runner.main()
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_memory_benchmark()
@@ -3,10 +3,10 @@ import unittest
 
 from Options import Accessibility
 from test.general import generate_items, generate_locations, generate_test_multiworld
-from Fill import FillError, balance_multiworld_progression, fill_restrictive, \
-    distribute_early_items, distribute_items_restrictive
+from Fill import FillError, MaximumExplorationState, PlacementCandidates, balance_multiworld_progression, \
+    fill_restrictive, distribute_early_items, distribute_items_restrictive, swap_location_item, sweep_from_pool
 from BaseClasses import Entrance, LocationProgressType, MultiWorld, Region, Item, Location, \
-    ItemClassification
+    ItemClassification, SphereAnalysis
 from worlds.generic.Rules import CollectionRule, add_item_rule, locality_rules, set_rule
 
 
@@ -448,6 +448,105 @@ class TestFillRestrictive(unittest.TestCase):
         self.assertTrue(multiworld.state.prog_items[item.player][item.name], "Sweep did not collect - Test flawed")
         self.assertEqual(multiworld.state.prog_items[item.player][item.name], 1, "Sweep collected multiple times")
 
+    def test_sweep_across_players(self):
+        """Test that sweep keeps going when items for one player unlock locations holding items for another"""
+        multiworld = generate_test_multiworld(2)
+        player1 = generate_player_data(multiworld, 1, 1, 2)
+        player2 = generate_player_data(multiworld, 2, 0, 1)
+        key1, reward1 = player1.prog_items
+        key2 = player2.prog_items[0]
+        gated1 = player1.generate_region(player1.menu, 1, lambda state: state.has(key1.name, 1))
+        gated2 = player2.generate_region(player2.menu, 1, lambda state: state.has(key2.name, 2))
+        player1.locations[0].place_locked_item(key2)
+        gated2.locations[0].place_locked_item(key1)
+        gated1.locations[0].place_locked_item(reward1)
+
+        multiworld.state.sweep_for_advancements()
+        self.assertTrue(multiworld.state.has(reward1.name, 1))
+        self.assertEqual(len(multiworld.state.advancements), 3)
+
+    def test_incremental_exploration_state(self):
+        """Test that updating a MaximumExplorationState matches sweeping the new pool from scratch"""
+        multiworld = generate_test_multiworld(2)
+        player1 = generate_player_data(multiworld, 1, 2, 2)
+        player2 = generate_player_data(multiworld, 2, 1, 1)
+        key1, other1 = player1.prog_items
+        key2 = player2.prog_items[0]
+        gated1 = player1.generate_region(player1.menu, 1, lambda state: state.has(key1.name, 1))
+        gated2 = player2.generate_region(player2.menu, 1, lambda state: state.has(key2.name, 2))
+        # player 1's gated location unlocks player 2's gated location, which holds another player 1 item
+        gated1.locations[0].place_locked_item(key2)
+        gated2.locations[0].place_locked_item(other1)
+
+        pool = [key1]
+        exploration = MaximumExplorationState(multiworld.state, pool)
+        self.assertTrue(exploration.state.has_all((key1.name, other1.name), 1))
+        self.assertTrue(exploration.state.has(key2.name, 2))
+
+        pool.remove(key1)
+        exploration.update(pool, removed=[key1])
+        fresh = sweep_from_pool(multiworld.state, pool)
+        for player in multiworld.player_ids:
+            self.assertEqual(+exploration.state.prog_items[player], +fresh.prog_items[player])
+        self.assertFalse(gated2.can_reach(exploration.state))
+
+        pool.append(key1)
+        exploration.update(pool)
+        self.assertTrue(exploration.state.has(other1.name, 1))
+        self.assertTrue(gated2.can_reach(exploration.state))
+
+    def test_placement_candidates_match_scan(self):
+        """Test that the placement candidate index finds the same location as checking can_fill in order"""
+        multiworld = generate_test_multiworld(2)
+        player1 = generate_player_data(multiworld, 1, 6, 2, 1)
+        player2 = generate_player_data(multiworld, 2, 4, 1)
+        key = player1.prog_items[0]
+        gated = player1.generate_region(player1.menu, 2, lambda state: state.has(key.name, 1))
+        locations = player1.locations + player2.locations
+        shared_rule = lambda item: item.player == 2
+        for location in locations[::3]:
+            location.item_rule = shared_rule
+        locations[1].progress_type = LocationProgressType.EXCLUDED
+        locations[4].always_allow = lambda state, item: item.name == key.name
+        multiworld.random.shuffle(locations)
+
+        candidates = PlacementCandidates(locations)
+        state = multiworld.state
+        for _ in range(len(locations)):
+            for item in player1.prog_items + player1.basic_items + player2.prog_items:
+                for check_access in (True, False):
+                    for player in (None, 1):
+                        with self.subTest(item=item, check_access=check_access, player=player):
+                            expected = next((location for location in locations
+                                             if location not in candidates.filled
+                                             and (player is None or location.player == player)
+                                             and location.can_fill(state, item, check_access)), None)
+                            self.assertIs(candidates.find(state, item, check_access, player), expected)
+            # fill the first open location, so the next round looks at fewer
+            candidates.remove(next(location for location in locations if location not in candidates.filled))
+        self.assertFalse(candidates)
+        self.assertFalse(gated.can_reach(state))
+        self.assertEqual(candidates.remaining(locations), [])
+
+    def test_placement_candidates_use_can_fill_overrides(self):
+        """Test that the placement candidate index asks locations that override can_fill"""
+        class OddItemLocation(Location):
+            def can_fill(self, state, item, check_access=True) -> bool:
+                return int(item.name[-1]) % 2 == 1 and super().can_fill(state, item, check_access)
+
+        multiworld = generate_test_multiworld()
+        player1 = generate_player_data(multiworld, 1, 2, 0, 2)
+        odd = OddItemLocation(1, "odd", None, player1.menu)
+        player1.menu.locations.append(odd)
+        locations = [odd] + player1.locations
+        even_item, odd_item = player1.basic_items
+
+        candidates = PlacementCandidates(locations)
+        self.assertIs(candidates.find(multiworld.state, even_item), player1.locations[0])
+        self.assertIs(candidates.find(multiworld.state, odd_item), odd)
+        candidates.remove(odd)
+        self.assertIs(candidates.find(multiworld.state, odd_item), player1.locations[0])
+
     def test_correct_item_instance_removed_from_pool(self):
         """Test that a placed item gets removed from the submitted pool"""
         multiworld = generate_test_multiworld()
@@ -858,3 +957,15 @@ class TestBalanceMultiworldProgression(unittest.TestCase):
 
         self.assertRegionContains(
             self.player1.regions[2], self.player2.prog_items[0])
+
+    def test_spheres_follow_placement(self) -> None:
+        """Test that one analysis can be shared between sphere consumers, while the public methods never go stale"""
+        analysis = SphereAnalysis(self.multiworld)
+        self.assertEqual([len(sphere) for sphere in self.multiworld.get_spheres(analysis)], [20, 20, 20])
+        self.assertTrue(self.multiworld.fulfills_accessibility(analysis=analysis))
+        self.assertEqual(len(analysis.spheres), 3)
+        self.assertTrue(self.multiworld.can_beat_game())
+
+        swap_location_item(self.player2.prog_items[0].location, self.player1.regions[1].locations[0])
+        self.assertEqual([len(sphere) for sphere in self.multiworld.get_spheres()], [20, 40])
+        self.assertTrue(self.multiworld.fulfills_accessibility())
@@ -1,7 +1,9 @@
 import unittest
 from collections import Counter
+
+from BaseClasses import Entrance, Location, LocationProgressType
 from worlds.AutoWorld import AutoWorldRegister, call_all
-from . import setup_solo_multiworld
+from . import generate_items, generate_locations, generate_test_multiworld, setup_solo_multiworld
 
 
 class TestBase(unittest.TestCase):
@@ -63,6 +65,61 @@ class TestBase(unittest.TestCase):
                 self.assertGreaterEqual(location_count, len(multiworld.get_locations()),
                                         f"{game_name} modified locations count during pre_fill")
     
+    def test_fill_status_indexes(self):
+        """Tests that filled and unfilled location queries follow item placement, moves and removals."""
+        multiworld = generate_test_multiworld(2)
+        region = multiworld.get_region("Menu", 1)
+        locations = generate_locations(3, 1, region)
+        other_locations = generate_locations(1, 2, multiworld.get_region("Menu", 2))
+        items = generate_items(2, 1)
+
+        self.assertEqual(multiworld.get_unfilled_locations(1), locations)
+        self.assertEqual(multiworld.get_filled_locations(), [])
+
+        multiworld.push_item(locations[0], items[0], False)
+        locations[1].place_locked_item(items[1])
+        self.assertEqual(multiworld.get_filled_locations(1), locations[:2])
+        self.assertEqual(multiworld.get_unfilled_locations(), [locations[2], *other_locations])
+
+        locations[2].item, locations[1].item = locations[1].item, None
+        self.assertEqual(multiworld.get_filled_locations(1), [locations[0], locations[2]])
+        self.assertEqual(multiworld.get_unfilled_locations(1), [locations[1]])
+        self.assertEqual(list(multiworld.get_unfilled_locations_for_players([], [1, 2])),
+                         [locations[1], *other_locations])
+
+        # worlds clear items directly, e.g. to retry their own placement
+        locations[0].item = None
+        region.locations.remove(locations[2])
+        self.assertEqual(multiworld.get_filled_locations(), [])
+        # locations leaving and re-entering an index keep their creation order
+        self.assertEqual(multiworld.get_unfilled_locations(1), locations[:2])
+
+    def test_slotted_subclasses(self):
+        """Tests that worlds can still subclass Location and Entrance with rules, defaults and extra attributes."""
+        class RuleEntrance(Entrance):
+            def access_rule(self, state) -> bool:
+                return False
+
+        class ExtraLocation(Location):
+            progress_type = LocationProgressType.EXCLUDED
+
+        multiworld = generate_test_multiworld(1)
+        region = multiworld.get_region("Menu", 1)
+        entrance = RuleEntrance(1, "Entrance", region)
+        self.assertFalse(entrance.can_reach(multiworld.state))
+
+        location = Location(1, "Location", 1, region)
+        self.assertIs(location.access_rule, Location.access_rule)
+        location.access_rule = lambda state: False
+        location.extra = True
+        self.assertIsNot(location.access_rule, Location.access_rule)
+        self.assertTrue(location.extra)
+
+        extra_location = ExtraLocation(1, "Extra Location", 2, region)
+        self.assertEqual(extra_location.progress_type, LocationProgressType.EXCLUDED)
+        extra_location.extra = True
+        self.assertTrue(extra_location.extra)
+
     def test_location_group(self):
         """Test that all location name groups contain valid locations and don't share names."""
         for game_name, world_type in AutoWorldRegister.world_types.items():
@@ -0,0 +1,59 @@
+import unittest
+
+from NetUtils import MULTIDATA_FORMAT, Multidata, NetworkSlot, SlotType, encode_multidata
+
+
+class TestMultidata(unittest.TestCase):
+    multidata = {
+        "seed_name": "12345",
+        "slot_info": {1: NetworkSlot("Player1", "Test", SlotType.player),
+                      2: NetworkSlot("Player2", "Test", SlotType.player)},
+        "slot_data": {1: {"goal": 1}, 2: {"goal": 2}},
+        "locations": {1: {10: (20, 2, 0)}, 2: {10: (20, 1, 0)}},
+        "datapackage": {"Test": {"checksum": "abc"}},
+    }
+
+    def test_round_trip(self) -> None:
+        """Tests that the sectioned format decodes to the data that was encoded."""
+        data = encode_multidata(self.multidata)
+        self.assertEqual(data[0], MULTIDATA_FORMAT)
+        multidata = Multidata(data)
+        self.assertEqual(set(multidata), set(self.multidata))
+        self.assertEqual(dict(multidata["slot_data"]), self.multidata["slot_data"])
+        for key, value in self.multidata.items():
+            if key != "slot_data":
+                self.assertEqual(multidata[key], value)
+
+    def test_sections_are_decoded_lazily(self) -> None:
+        """Tests that only accessed sections, and only accessed slots' slot_data, get decoded."""
+        multidata = Multidata(encode_multidata(self.multidata))
+        self.assertEqual(multidata["slot_data"][2], {"goal": 2})
+        self.assertEqual(multidata.pop("locations"), self.multidata["locations"])
+        self.assertNotIn("locations", multidata)
+        self.assertNotIn("datapackage", multidata.decoded)
+        self.assertEqual(list(multidata["slot_data"].decoded), [2])
+
+    def test_reencode(self) -> None:
+        """Tests that modified sections are stored again, while untouched sections are carried over."""
+        multidata = Multidata(encode_multidata(self.multidata))
+        multidata["datapackage"]["Test"]["version"] = 1
+        multidata = Multidata(encode_multidata(multidata))
+        self.assertEqual(multidata["datapackage"], {"Test": {"checksum": "abc", "version": 1}})
+        self.assertEqual(multidata["slot_data"][1], {"goal": 1})
+        self.assertEqual(multidata["slot_info"], self.multidata["slot_info"])
+
+    def test_check_sections(self) -> None:
+        """Tests that checking loads every undecoded section and slot with restricted_loads, without keeping them."""
+        import datetime
+        import pickle
+        multidata = Multidata(encode_multidata(self.multidata))
+        multidata["slot_info"]
+        multidata.check_sections()
+        self.assertEqual(list(multidata.decoded), ["slot_data", "slot_info"])
+        self.assertEqual(multidata["slot_data"].decoded, {})
+
+        for unsafe in ({**self.multidata, "seed_name": datetime.date.today()},
+                       {**self.multidata, "slot_data": {1: {"goal": 1}, 2: {"goal": datetime.date.today()}}}):
+            multidata = Multidata(encode_multidata(unsafe))
+            with self.assertRaises(pickle.UnpicklingError):
+                multidata.check_sections()
@@ -0,0 +1,56 @@
+import concurrent.futures
+import multiprocessing
+import sys
+import threading
+import unittest
+
+from Main import _run_output_tasks
+from worlds.AutoWorld import call_single
+from . import generate_items, generate_locations, generate_test_multiworld
+
+
+@unittest.skipUnless("fork" in multiprocessing.get_all_start_methods(), "Forking is not supported on this platform.")
+class TestForkedOutput(unittest.TestCase):
+    def test_changes_are_sent_back(self):
+        """Tests that what forked output tasks do to their worlds and the spoiler arrives in the multiworld."""
+        multiworld = generate_test_multiworld(2)
+        location = generate_locations(1, 1, multiworld.get_region("Menu", 1))[0]
+        location.place_locked_item(generate_items(1, 2)[0])
+        world = multiworld.worlds[1]
+        world.output_done = threading.Event()
+
+        def generate_output(output_directory: str) -> None:
+            world.output_name = output_directory
+            world.output_location = location
+            world.output_roll = world.random.random()
+            multiworld.spoiler.hashes[1] = "hash"
+            world.output_done.set()
+
+        def fail(output_directory: str) -> None:
+            raise ValueError(output_directory)
+
+        world.generate_output = generate_output
+        multiworld.worlds[2].generate_output = fail
+        tasks = [
+            (multiworld.fulfills_accessibility, ()),
+            (call_single, (multiworld, "generate_output", 1, "output")),
+            (call_single, (multiworld, "generate_output", 2, "failed")),
+        ]
+        random_state = world.random.getstate()
+        with concurrent.futures.ThreadPoolExecutor(1) as pool, \
+                _run_output_tasks(multiworld, tasks, 2, pool) as futures:
+            self.assertTrue(world.output_done.wait(60))
+            self.assertTrue(futures[0].result())
+            self.assertIsNone(futures[1].result())
+            with self.assertRaises(ValueError) as context:
+                futures[2].result()
+
+        self.assertEqual(world.output_name, "output")
+        self.assertIs(world.output_location, location)
+        self.assertEqual(multiworld.spoiler.hashes, {1: "hash"})
+        # the random continues where the output process left it
+        self.assertNotEqual(world.random.getstate(), random_state)
+        world.random.setstate(random_state)
+        self.assertEqual(world.random.random(), world.output_roll)
+        if sys.version_info >= (3, 11, 0):
+            self.assertIn("for player 2, named Tester2.", context.exception.__notes__[0])
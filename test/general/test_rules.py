@@ -0,0 +1,64 @@
+import unittest
+
+from BaseClasses import CollectionState, Location
+from worlds.generic.Rules import And, CanReach, ForbidItems, Has, HasAll, HasAny, Or, add_item_rule, add_rule, \
+    all_of, always, any_of, forbid_item, never, set_rule
+from . import generate_items, generate_test_multiworld
+
+
+class TestRuleObjects(unittest.TestCase):
+    def test_combination(self) -> None:
+        """Ensure combined rules are flattened and their has checks merged."""
+        def function(state: CollectionState) -> bool:
+            return True
+
+        rule = Has("A", 1) & Has("B", 1) & (Has("A", 1, 3) & function) & HasAll(["C", "B"], 1)
+        self.assertIs(type(rule), And)
+        self.assertEqual(rule, And([function, Has("A", 1, 3), HasAll(["B", "C"], 1)]))
+        self.assertEqual(rule.rules[-1], function, "plain functions should be evaluated last")
+        self.assertEqual(rule.items_read, {("A", 1), ("B", 1), ("C", 1)})
+        self.assertTrue(rule.opaque)
+
+        rule = Has("A", 1, 2) | Has("A", 1, 5) | HasAny(["B"], 1) | Has("C", 2) | CanReach("Menu", 1)
+        self.assertIs(type(rule), Or)
+        self.assertEqual(set(rule.rules), {Has("A", 1, 2), Has("B", 1), Has("C", 2), CanReach("Menu", 1)})
+        self.assertEqual(rule.regions_read, {("Menu", 1)})
+        self.assertFalse(rule.opaque)
+
+        self.assertEqual(any_of(Has("A", 1), Has("B", 1)), HasAny(["A", "B"], 1))
+        self.assertEqual(all_of(Has("A", 1), always), Has("A", 1))
+        self.assertIs(all_of(Has("A", 1), never), never)
+        self.assertIs(any_of(Has("A", 1), always), always)
+        self.assertIs(any_of(never, never), never)
+        self.assertEqual(all_of(ForbidItems([("A", 1)]), ForbidItems([("B", 1)])), ForbidItems([("A", 1), ("B", 1)]))
+
+    def test_helpers(self) -> None:
+        """Ensure rules built by add_rule and the item rule helpers are flat and keep their result."""
+        multiworld = generate_test_multiworld(1)
+        menu = multiworld.get_region("Menu", 1)
+        location = Location(1, "Location", None, menu)
+        first, second, third = generate_items(3, 1, True)
+
+        set_rule(location, Has(first.name, 1))
+        for item in (second, third):
+            add_rule(location, lambda state, item_name=item.name: state.has(item_name, 1))
+        self.assertEqual(len(location.access_rule.rules), 3)
+        add_rule(location, Has(first.name, 1, 2), "or")
+        self.assertIs(type(location.access_rule), Or)
+
+        state = CollectionState(multiworld)
+        self.assertFalse(location.access_rule(state))
+        for item in (first, second, third):
+            state.collect(item, True)
+        self.assertTrue(location.access_rule(state))
+        state.remove(second)
+        self.assertFalse(location.access_rule(state))
+        state.collect(first, True)
+        self.assertTrue(location.access_rule(state))
+
+        for item in (first, second):
+            forbid_item(location, item.name, 1)
+        self.assertEqual(location.item_rule, ForbidItems([(first.name, 1), (second.name, 1)]))
+        add_item_rule(location, lambda item: item.advancement)
+        self.assertFalse(location.item_rule(first))
+        self.assertTrue(location.item_rule(third))
@@ -27,3 +27,127 @@ class TestBase(unittest.TestCase):
                     with self.subTest("Step", step=step):
                         call_all(multiworld, step)
                         self.assertTrue(multiworld.get_all_state(False, True))
+
+
+class TestCopyOnWrite(unittest.TestCase):
+    def test_copies_are_independent(self) -> None:
+        """Ensure copy-on-write copies and their parent never see each other's changes."""
+        from . import generate_items, generate_test_multiworld
+
+        multiworld = generate_test_multiworld(3)
+        state = multiworld.state
+        first, second = generate_items(2, 1, True)
+        state.collect(first, True)
+
+        copy = state.copy(copy_on_write=True)
+        self.assertTrue(copy.has(first.name, 1))
+        copy.collect(second, True)
+        self.assertTrue(copy.has(second.name, 1))
+        self.assertFalse(state.has(second.name, 1))
+
+        nested = copy.copy(copy_on_write=True)
+        state.remove(first)
+        self.assertFalse(state.has(first.name, 1))
+        self.assertTrue(copy.has(first.name, 1))
+        self.assertTrue(nested.has_all((first.name, second.name), 1))
+
+        for player in multiworld.player_ids:
+            self.assertTrue(multiworld.get_region("Menu", player).can_reach(nested))
+        self.assertEqual(len(nested.prog_items), len(state.prog_items))
+        self.assertEqual(nested.prog_items[1], copy.copy().prog_items[1])
+
+    def test_changes_only_copy_the_changed_player(self) -> None:
+        """Ensure changing either side of a copy-on-write copy leaves the other side and its other players alone."""
+        from collections import Counter
+        from BaseClasses import CollectionState
+        from . import generate_items, generate_test_multiworld
+
+        multiworld = generate_test_multiworld(2)
+        item = generate_items(1, 1, True)[0]
+        menu = multiworld.get_region("Menu", 1)
+
+        def collect(state: CollectionState) -> None:
+            state.collect(item, True)
+
+        def remove(state: CollectionState) -> None:
+            state.collect(item, True)
+            state.remove(item)
+
+        def update_reachable_regions(state: CollectionState) -> None:
+            state.stale[1] = True
+            state.update_reachable_regions(1)
+
+        operations = {
+            "collect": collect,
+            "remove": remove,
+            "update_reachable_regions": update_reachable_regions,
+            "setitem": lambda state: state.prog_items.__setitem__(1, Counter({item.name: 1})),
+            "delitem": lambda state: state.prog_items.__delitem__(1),
+            "pop": lambda state: state.prog_items.pop(1),
+            "popitem": lambda state: state.prog_items.popitem(),
+            "setdefault": lambda state: state.prog_items.setdefault(3, Counter()),
+            "update": lambda state: state.prog_items.update({1: Counter({item.name: 1})}),
+            "clear": lambda state: state.prog_items.clear(),
+        }
+        for name, operation in operations.items():
+            for changed_side in ("parent", "child"):
+                with self.subTest(name, changed=changed_side):
+                    parent = CollectionState(multiworld)
+                    self.assertTrue(menu.can_reach(parent))
+                    child = parent.copy(copy_on_write=True)
+                    changed, unchanged = (parent, child) if changed_side == "parent" else (child, parent)
+                    before = unchanged.copy()
+                    player_2_items = changed.prog_items[2]
+                    operation(changed)
+                    self.assertEqual(unchanged.prog_items, before.prog_items)
+                    self.assertEqual(unchanged.reachable_regions, before.reachable_regions)
+                    self.assertEqual(unchanged.blocked_connections, before.blocked_connections)
+                    self.assertFalse(unchanged.has(item.name, 1))
+                    if 2 in changed.prog_items:
+                        # players that weren't changed are still shared instead of copied
+                        self.assertIs(changed.prog_items[2], player_2_items)
+                        self.assertIs(unchanged.prog_items[2], player_2_items)
+
+
+class TestTrackedItemConditions(unittest.TestCase):
+    def test_only_dependent_entrances_are_rechecked(self) -> None:
+        """Ensure tracked item conditions skip unrelated entrances without missing any that became passable."""
+        from BaseClasses import CollectionState, Region
+        from . import generate_items, generate_test_multiworld
+
+        multiworld = generate_test_multiworld(1)
+        multiworld.worlds[1].track_item_conditions = True
+        menu = multiworld.get_region("Menu", 1)
+        key, other_key, unrelated = generate_items(3, 1, True)
+        checks = {"key": 0, "everything": 0}
+
+        def key_rule(state: CollectionState) -> bool:
+            checks["key"] += 1
+            return state.has(key.name, 1)
+
+        def everything_rule(state: CollectionState) -> bool:
+            # looking at the whole inventory can't be narrowed down to single items
+            checks["everything"] += 1
+            return sum(state.prog_items[1].values()) >= 3
+
+        regions = []
+        for name, rule in (("Key Region", key_rule), ("Everything Region", everything_rule)):
+            region = Region(name, 1, multiworld)
+            multiworld.regions.append(region)
+            menu.connect(region, rule=rule)
+            regions.append(region)
+        key_region, everything_region = regions
+
+        state = CollectionState(multiworld)
+        self.assertFalse(key_region.can_reach(state))
+        state.collect(unrelated, True)
+        self.assertFalse(key_region.can_reach(state))
+        self.assertEqual(checks["key"], 1)
+        self.assertEqual(checks["everything"], 2)
+
+        copy = state.copy()
+        copy.collect(other_key, True)
+        copy.collect(key, True)
+        self.assertTrue(key_region.can_reach(copy))
+        self.assertTrue(everything_region.can_reach(copy))
+        self.assertFalse(key_region.can_reach(state))
@@ -0,0 +1,80 @@
+# Benchmark for _speedups.LocationStore and NetUtils._LocationStore hint and collect lookups.
+# Run from the project root with `python -m test.netutils.benchmark_location_store`.
+import random
+import typing
+
+if typing.TYPE_CHECKING:
+    from NetUtils import LocationStore
+
+RawLocations = typing.Dict[int, typing.Dict[int, typing.Tuple[int, int, int]]]
+
+
+def generate_locations(players: int, locations_per_player: int, seed: int = 0) -> RawLocations:
+    """Create a room of `players` slots with randomly placed items, similar to a real multidata."""
+    rng = random.Random(seed)
+    items_per_player = max(1, locations_per_player // 2)  # half the items are duplicates, like filler
+    return {
+        sender: {
+            sender * 10_000 + location: (rng.randrange(items_per_player), rng.randint(1, players), 0)
+            for location in range(locations_per_player)
+        }
+        for sender in range(1, players + 1)
+    }
+
+
+def linear_find_item(locations: RawLocations, slots: typing.Set[int], seeked_item_id: int
+                     ) -> typing.List[typing.Tuple[int, int, int, int, int]]:
+    """Reference full scan, how find_item worked before the receiver index."""
+    return [(sender, location, item, receiver, flags)
+            for sender, sender_locations in locations.items()
+            for location, (item, receiver, flags) in sender_locations.items()
+            if receiver in slots and item == seeked_item_id]
+
+
+def run_location_store_benchmark() -> None:
+    """Compare hint and collect lookups on the indexed stores against a full scan as the room grows."""
+    import logging
+
+    from NetUtils import LocationStore, _LocationStore
+    from Utils import init_logging
+    from test.benchmark.time_it import TimeIt
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    lookups = 1_000
+    stores: typing.Dict[str, typing.Callable[[RawLocations], typing.Any]] = {"python": _LocationStore}
+    if LocationStore is not _LocationStore:
+        stores["speedups"] = LocationStore
+
+    for players, locations_per_player in ((10, 100), (100, 250), (500, 200)):
+        locations = generate_locations(players, locations_per_player)
+        rng = random.Random(players)
+        queries = [(rng.randint(1, players), rng.randrange(max(1, locations_per_player // 2)))
+                   for _ in range(lookups)]
+        logger.info(f"{players} players, {players * locations_per_player} locations:")
+
+        with TimeIt(f"{lookups} full scan hints", logger):
+            for slot, item in queries:
+                linear_find_item(locations, {slot}, item)
+
+        for name, store_type in stores.items():
+            with TimeIt(f"{name} store construction", logger):
+                store: "LocationStore" = store_type(locations)
+            with TimeIt(f"{lookups} {name} hints", logger):
+                for slot, item in queries:
+                    for _ in store.find_item({slot}, item):
+                        pass
+            with TimeIt(f"{lookups} {name} team hints", logger):
+                for slot, item in queries:
+                    for _ in store.find_item({slot, slot % players + 1}, item):
+                        pass
+            with TimeIt(f"{lookups} {name} collects", logger):
+                for slot, _ in queries:
+                    store.get_for_player(slot)
+            if hasattr(store, "get_size"):
+                logger.info(f"{name} store size: {store.get_size() / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    run_location_store_benchmark()
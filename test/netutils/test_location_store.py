@@ -112,6 +112,17 @@ class Base:
             self.assertEqual(sorted(self.store.find_item(set(range(2048)), 13)),
                              [(1, 13, 13, 1, 0)])
 
+        def test_find_item_matches_full_scan(self) -> None:
+            # the receiver index has to return the same results in the same order as a scan over all locations
+            for slots in ({1}, {2}, {1, 2}, {1, 2, 3, 4, 5}):
+                for item in (11, 12, 13, 21, 22, 23, 99):
+                    with self.subTest(slots=slots, item=item):
+                        expected = [(sender, location, item, data[1], data[2])
+                                    for sender, locations in sorted(sample_data.items())
+                                    for location, data in sorted(locations.items())
+                                    if data[0] == item and data[1] in slots]
+                        self.assertEqual(list(self.store.find_item(slots, item)), expected)
+
         def test_get_for_player(self) -> None:
             self.assertEqual(self.store.get_for_player(3), {4: {9}})
             self.assertEqual(self.store.get_for_player(1), {1: {13}, 2: {22, 23}})
@@ -1,8 +1,10 @@
 # Tests for Generate.py (ArchipelagoGenerate.exe)
 
+import json
 import unittest
 import os
 import os.path
+import shutil
 import sys
 
 from pathlib import Path
@@ -72,6 +74,57 @@ class TestGenerateMain(unittest.TestCase):
 
         self.assertOutput(self.output_tempdir.name)
 
+    def test_generate_output_processes(self):
+        sys.argv = [sys.argv[0], '--seed', '0', '--output_processes', '2',
+                    '--player_files_path', str(self.abs_input_dir),
+                    '--outputpath', self.output_tempdir.name]
+        print(f'Testing Generate.py {sys.argv} in {os.getcwd()}')
+        Main.main(*Generate.main())
+
+        self.assertOutput(self.output_tempdir.name)
+
+    def test_generate_profile(self):
+        sys.argv = [sys.argv[0], '--seed', '0', '--profile',
+                    '--player_files_path', str(self.abs_input_dir),
+                    '--outputpath', self.output_tempdir.name]
+        print(f'Testing Generate.py {sys.argv} in {os.getcwd()}')
+        Main.main(*Generate.main())
+
+        self.assertOutput(self.output_tempdir.name)
+        output_path = Path(self.output_tempdir.name)
+        with open(next(output_path.glob("*_Profile.json"))) as f:
+            summary = json.load(f)
+        for stage in ("create_regions", "distribute_items_restrictive", "fulfills_accessibility", "output",
+                      "write_multidata"):
+            self.assertIn(stage, summary["stages"])
+        self.assertEqual(len(summary["players"]), 1)
+        player = next(iter(summary["players"].values()))
+        self.assertIn(player["game"], summary["games"])
+        self.assertIn("generate_early", player["stages"])
+        with open(next(output_path.glob("*_Trace.json"))) as f:
+            trace = json.load(f)
+        self.assertTrue(trace["traceEvents"])
+
+    def test_generate_batch(self):
+        with TemporaryDirectory(prefix="AP_batch_") as batch_path:
+            good_dir = Path(batch_path) / "a_good"
+            bad_dir = Path(batch_path) / "b_bad"
+            good_dir.mkdir()
+            bad_dir.mkdir()
+            shutil.copy(self.abs_input_dir / "test.yaml", good_dir)
+            (bad_dir / "test.yaml").write_text("name: Player{NUMBER}\ngame: No Such Game\n")
+            sys.argv = [sys.argv[0], '--seed', '0', '--batch_path', batch_path, '--workers', '2',
+                        '--outputpath', self.output_tempdir.name]
+            print(f'Testing Generate.py {sys.argv} in {os.getcwd()}')
+            results = Generate.batch_main(Generate.mystery_argparse())
+
+        self.assertEqual([result.player_files_path for result in results], [str(good_dir), str(bad_dir)])
+        good, bad = results
+        self.assertIsNone(good.error)
+        self.assertTrue(good.seed_name)
+        self.assertIn("No Such Game", bad.error)
+        self.assertOutput(self.output_tempdir.name)
+
     def test_generate_yaml(self):
         # override host.yaml
         from settings import get_settings
@@ -108,6 +161,9 @@ class TestGenerateWeights(TestGenerateMain):
     # don't need to run these tests
     test_generate_absolute = None
     test_generate_relative = None
+    test_generate_output_processes = None
+    test_generate_profile = None
+    test_generate_batch = None
 
     def test_generate_yaml(self):
         from settings import get_settings
@@ -1,5 +1,12 @@
+import asyncio
+import types
+import typing
 import unittest
-from MultiServer import Context, ServerCommandProcessor
+from MultiServer import Client, Context, ServerCommandProcessor, queue_new_items, send_items_to
+from NetUtils import Endpoint, Hint, HintStatus, NetworkItem
+
+if typing.TYPE_CHECKING:
+    from NetUtils import ServerConnection
 
 
 class TestResolvePlayerName(unittest.TestCase):
@@ -38,3 +45,183 @@ class TestResolvePlayerName(unittest.TestCase):
         assert p.resolve_player("ABC") == (1, 2, "abc"), "case insensitive resolves when 1 match"
         assert p.resolve_player("abcd") == (1, 3, "abCD"), "case insensitive resolves when 1 match"
         assert not p.resolve_player("aB"), "partial name shouldn't resolve to player"
+
+
+class TestItemDelivery(unittest.IsolatedAsyncioTestCase):
+    async def test_only_receivers_get_items(self) -> None:
+        ctx = Context("", 0, "", "", 0, 0, False)
+        sent: typing.List[typing.Tuple[Endpoint, typing.List[typing.Dict[str, typing.Any]]]] = []
+
+        async def send_msgs(endpoint: Endpoint, msgs: typing.Iterable[typing.Dict[str, typing.Any]]) -> bool:
+            sent.append((endpoint, list(msgs)))
+            return True
+
+        ctx.send_msgs = send_msgs
+        finder, receiver = (typing.cast(Client, types.SimpleNamespace(no_items=False, remote_start_inventory=False,
+                                                                      remote_items=True, send_index=0))
+                            for _ in range(2))
+        clients: typing.Dict[int, typing.Dict[int, typing.List[Client]]] = {0: {1: [finder], 2: [receiver]}}
+        ctx.clients = clients
+        items = [NetworkItem(5, 10, 1, 0), NetworkItem(6, 11, 1, 0)]
+
+        for item in items:
+            send_items_to(ctx, 0, 2, item)
+            queue_new_items(ctx)
+        await asyncio.sleep(0)  # queued send
+        await asyncio.sleep(0)  # send_msgs task
+
+        self.assertEqual(sent, [(receiver, [{"cmd": "ReceivedItems", "index": 0, "items": items}])],
+                         "checks processed together should reach only their receiver, in one packet")
+        self.assertEqual(receiver.send_index, 2)
+        self.assertEqual(finder.send_index, 0)
+        self.assertFalse(ctx.pending_item_receivers)
+
+
+class TestMessageCoalescing(unittest.IsolatedAsyncioTestCase):
+    async def test_one_frame_per_tick(self) -> None:
+        """Messages of one loop tick reach each client as a single frame, in order and filtered."""
+        from unittest import mock
+        from MultiServer import join_encoded_msgs
+
+        ctx = Context("", 0, "", "", 0, 0, False)
+        ctx.coalesce_messages = True
+
+        class FakeClient:
+            def __init__(self, no_text: bool) -> None:
+                self.socket = types.SimpleNamespace(open=True)
+                self.auth = True
+                self.no_text = no_text
+
+        client, textless = (typing.cast(Client, FakeClient(no_text)) for no_text in (False, True))
+        ctx.endpoints = [client, textless]
+        clients: typing.Dict[int, typing.Dict[int, typing.List[Client]]] = {0: {1: [client], 2: [textless]}}
+        ctx.clients = clients
+        frames: typing.List[typing.Tuple[typing.List["ServerConnection"], str]] = []
+
+        def broadcast(sockets: typing.Iterable["ServerConnection"], frame: str) -> None:
+            frames.append((list(sockets), frame))
+
+        with mock.patch("websockets.broadcast", broadcast):
+            ctx.broadcast_all([{"cmd": "PrintJSON", "data": [{"text": "first"}]}])
+            await ctx.send_msgs(textless, [{"cmd": "Bounced"}])
+            ctx.broadcast_team(0, [{"cmd": "RoomUpdate"}])
+            self.assertFalse(frames, "nothing should be sent before the end of the tick")
+            await asyncio.sleep(0)  # broadcast tasks
+            await asyncio.sleep(0)  # flush
+
+        frames_by_socket: typing.Dict[int, str] = {id(socket): frame for sockets, frame in frames for socket in sockets}
+        self.assertEqual(len(frames), 2)
+        self.assertEqual(ctx.loader(frames_by_socket[id(client.socket)]),
+                         [{"cmd": "PrintJSON", "data": [{"text": "first"}]}, {"cmd": "RoomUpdate"}])
+        self.assertEqual(ctx.loader(frames_by_socket[id(textless.socket)]), [{"cmd": "Bounced"}, {"cmd": "RoomUpdate"}])
+        self.assertFalse(ctx.outboxes)
+
+        self.assertEqual(list(join_encoded_msgs(["[1,2]", "[]", "[3]", "[4]"], size_limit=4)), ["[1,2]", "[3,4]"])
+
+
+class TestHintIndex(unittest.TestCase):
+    def test_checks_update_hints(self) -> None:
+        ctx = Context("", 0, "", "", 0, 0, False)
+        checked = Hint(2, 1, 10, 5, False)
+        unchecked = Hint(2, 1, 11, 6, False)
+        other = Hint(1, 2, 10, 7, False)
+        for hint in (checked, unchecked, other):
+            ctx.add_hint(0, hint.finding_player, hint)
+            ctx.add_hint(0, hint.receiving_player, hint)
+
+        ctx.location_checks[0, 1] |= {10}
+        changed: typing.Set[typing.Tuple[int, int]] = set()
+        ctx.recheck_hints_for_locations(0, 1, {10}, changed)
+
+        found = checked._replace(found=True, status=HintStatus.HINT_FOUND)
+        self.assertEqual(changed, {(0, 1), (0, 2)})
+        self.assertEqual(ctx.get_rechecked_hints(0, 1), {found, unchecked, other})
+        self.assertEqual(ctx.get_rechecked_hints(0, 2), {found, unchecked, other})
+        full_recheck = {key: set(hints) for key, hints in ctx.hints.items()}
+        ctx.recheck_hints()
+        self.assertEqual(ctx.hints, full_recheck, "indexed recheck should match a full recheck")
+        self.assertNotIn((0, 1, 10), ctx.hint_index)
+        self.assertIn((0, 2, 10), ctx.hint_index)
+
+
+class TestSaveJournal(unittest.TestCase):
+    def test_journal_replays_to_same_save(self) -> None:
+        import os
+        import pickle
+        import tempfile
+        import zlib
+        from MultiServer import read_save_journal
+
+        def create_context() -> Context:
+            ctx = Context("", 0, "", "", 0, 0, False)
+            ctx.save_journaling = True
+            ctx.saving = True
+            ctx.save_filename = os.path.join(tempdir, "test.apsave")
+            return ctx
+
+        def load_context() -> Context:
+            ctx = create_context()
+            assert ctx.save_filename is not None
+            with open(ctx.save_filename, "rb") as f:
+                ctx.load_save(zlib.decompress(f.read()), read_save_journal(ctx.save_filename + ".journal"))
+            return ctx
+
+        def comparable_save(ctx: Context) -> typing.Dict[str, typing.Any]:
+            save = ctx.get_save()
+            del save["journal_generation"], save["random_state"]
+            return save
+
+        with tempfile.TemporaryDirectory() as tempdir:
+            ctx = create_context()
+            assert ctx.save_filename is not None
+            journal_filename = ctx.save_filename + ".journal"
+            ctx.location_checks[0, 1] |= {10}
+            ctx.save(True)
+            self.assertFalse(os.path.exists(journal_filename) and
+                             os.path.getsize(journal_filename))
+
+            # enough small changes to stay below the size of the snapshot
+            ctx.location_checks[0, 1] |= {11}
+            ctx.journal("location_checks", (0, 1), {11})
+            send_items_to(ctx, 0, 2, NetworkItem(5, 11, 1, 0))
+            hint = Hint(2, 1, 12, 6, False)
+            ctx.add_hint(0, 1, hint)
+            ctx.add_hint(0, 1, Hint(2, 1, 13, 7, False))
+            ctx.replace_hint(0, 1, hint, hint._replace(status=HintStatus.HINT_PRIORITY))
+            ctx.client_game_state[0, 1] = 30
+            ctx.journal("client_game_state", (0, 1), 30)
+            ctx.stored_data["key"] = [1]
+            ctx.journal("stored_data", "key", [1])
+            ctx.save(True, journaled=True)
+            self.assertGreater(os.path.getsize(journal_filename), 0)
+            self.assertEqual(comparable_save(load_context()), comparable_save(ctx))
+
+            # a change that is not journaled has to write a full snapshot
+            ctx.name_aliases[0, 1] = "alias"
+            ctx.save(True)
+            self.assertEqual(os.path.getsize(journal_filename), 0)
+            self.assertEqual(comparable_save(load_context()), comparable_save(ctx))
+
+            # entries from before the latest snapshot and a partially written last entry are skipped
+            ctx.stored_data["key"] = [2]
+            ctx.journal("stored_data", "key", [2])
+            ctx.save(True, journaled=True)
+            with open(journal_filename, "rb") as f:
+                journal = f.read()
+            stale_entry = pickle.dumps((ctx.save_journal_generation - 1, [("stored_data", "key", [3])]))
+            with open(journal_filename, "wb") as f:
+                f.write(len(stale_entry).to_bytes(4, "little") + stale_entry + journal + b"\0\0")
+            self.assertEqual(load_context().stored_data["key"], [2])
+
+    def test_journal_records_in_snapshot_replay_once(self) -> None:
+        import pickle
+        from MultiServer import apply_save_journal
+
+        # a snapshot can be taken between a change and its journal record, so the record also applies to it
+        item = NetworkItem(5, 11, 1, 0)
+        hint = Hint(2, 1, 12, 6, False)
+        savedata = {"journal_generation": 1, "received_items": {(0, 2, True): [item]}, "hints": {(0, 1): {hint}}}
+        entry = pickle.dumps((1, [("received_items", (0, 2, True), (0, [item])), ("hints", (0, 1), (None, hint))]))
+        apply_save_journal(savedata, [entry])
+        self.assertEqual(savedata["received_items"], {(0, 2, True): [item]})
+        self.assertEqual(savedata["hints"], {(0, 1): {hint}})
@@ -0,0 +1,35 @@
+import json
+
+from . import TestBase
+
+
+class TestDataPackage(TestBase):
+    def test_encoded_data_package(self) -> None:
+        """Verify the data package assembled from cached game packages matches a full encoding."""
+        from NetUtils import encode, encode_data_package
+        from worlds import network_data_package
+
+        games = network_data_package["games"]
+        self.assertEqual(json.loads(encode_data_package(games)), json.loads(encode({"games": games})))
+        # second time from cache
+        self.assertEqual(encode_data_package(games), encode_data_package(games))
+        groupless = {"Archipelago": {key: value for key, value in games["Archipelago"].items()
+                                     if key not in ("item_name_groups", "location_name_groups")}}
+        self.assertEqual(json.loads(encode_data_package(groupless)), {"games": groupless})
+
+    def test_etag(self) -> None:
+        """Verify the data package is only sent again if the client's version is outdated."""
+        from worlds import network_data_package
+
+        response = self.client.get("/api/datapackage")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, json.loads(json.dumps(network_data_package)))
+        etag = response.headers["ETag"]
+        response = self.client.get("/api/datapackage", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(response.data)
+        response = self.client.get("/api/datapackage", headers={"If-None-Match": "\"outdated\""})
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get("/api/datapackage/invalid")
+        self.assertEqual(response.status_code, 404)
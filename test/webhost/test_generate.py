@@ -71,3 +71,36 @@ class TestGenerate(TestBase):
                           "Response shows unexpected error")
             self.assertIn("generate-game-form", response.text,
                           "Response did not get user back to the form")
+
+    def test_generation_stored_without_zip(self) -> None:
+        """
+        Verify that generation output is stored directly as a Seed, with its data package moved to GameDataPackage.
+        """
+        import os
+        import tempfile
+        from pony.orm import db_session
+        from MultiServer import Context
+        from WebHostLib.generate import upload_to_db
+        from WebHostLib.models import GameDataPackage, Seed
+
+        with open(os.path.join(os.path.dirname(__file__), "data", "One_Archipelago.archipelago"), "rb") as f:
+            multidata = dict(Context.decompress(f.read()))
+        with tempfile.TemporaryDirectory() as folder:
+            with open(os.path.join(folder, f"AP_{multidata['seed_name']}_Spoiler.txt"), "w") as f:
+                f.write("Spoiler")
+            with self.app.app_context():
+                seed_id = upload_to_db(folder, multidata, None, 1, False)
+
+        with db_session:
+            seed = Seed.get(id=seed_id)
+            self.assertIsNotNone(seed)
+            self.assertEqual(seed.spoiler, "Spoiler")
+            self.assertEqual([(slot.player_id, slot.game) for slot in seed.slots], [(1, "Archipelago")])
+            stored_multidata = Context.decompress(seed.multidata)
+            package = stored_multidata["datapackage"]["Archipelago"]
+            self.assertEqual(set(package), {"version", "checksum"})
+            self.assertIsNotNone(GameDataPackage.get(checksum=package["checksum"]))
+            self.assertEqual(stored_multidata["connect_names"], multidata["connect_names"])
+            for slot in seed.slots:
+                slot.delete()
+            seed.delete()
@@ -191,3 +191,47 @@ class TestHostFakeRoom(TestBase):
         with db_session:
             commands = select(command for command in Command if command.room.id == self.room_id)  # type: ignore
             self.assertNotIn("/help", (command.commandtext for command in commands))
+
+    def test_command_dispatcher(self) -> None:
+        """Verify queued commands are routed to their room's loop, and commands of other rooms are left alone."""
+        import threading
+        from types import SimpleNamespace
+        from pony.orm import db_session, select
+        from WebHostLib.customserver import DBCommandDispatcher
+        from WebHostLib.models import Command, Room, Seed
+
+        class FakeLoop:
+            def __init__(self) -> None:
+                self.calls = []
+
+            def call_soon_threadsafe(self, callback, *args) -> None:
+                self.calls.append((callback, *args))
+
+        with db_session:
+            room = Room.get(id=self.room_id)
+            other_room = Room(seed=Seed(multidata=b"", owner=room.owner), owner=room.owner, tracker=uuid4())
+            other_room_id = other_room.id
+            Command(room=room, commandtext="/help")
+            Command(room=other_room, commandtext="/exit")
+            Command(room=room, commandtext="/status")
+
+        try:
+            loop = FakeLoop()
+            dispatcher = DBCommandDispatcher()
+            dispatcher.register(SimpleNamespace(room_id=self.room_id, main_loop=loop, exit_event=threading.Event()))
+            dispatcher.dispatch()
+            self.assertEqual([call[1:] for call in loop.calls], [("/help",), ("/status",)])
+            self.assertTrue(all(call[0].ctx.room_id == self.room_id for call in loop.calls))
+
+            dispatcher.unregister(self.room_id)
+            dispatcher.dispatch()
+            self.assertEqual(len(loop.calls), 2)
+            with db_session:
+                remaining = [command.commandtext for command in select(command for command in Command)]
+                self.assertEqual(remaining, ["/exit"])
+        finally:
+            with db_session:
+                other_room = Room.get(id=other_room_id)
+                select(command for command in Command if command.room.id == other_room_id).delete(bulk=True)
+                other_room.seed.delete()
+                other_room.delete()
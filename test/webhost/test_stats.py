@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from . import TestBase
+
+
+class TestGamesPlayed(TestBase):
+    def setUp(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.models import Room, Seed, Slot
+
+        super().setUp()
+
+        self.now = datetime.utcnow()
+        self.yesterday = (self.now - timedelta(days=1)).date()
+        owner = uuid4()
+        with db_session:
+            seed = Seed(multidata=b"", owner=owner)
+            Slot(player_id=1, player_name="Player1", seed=seed, game="Clique")
+            Slot(player_id=2, player_name="Player2", seed=seed, game="Clique")
+            Slot(player_id=3, player_name="Player3", seed=seed, game="Timespinner")
+            # two rooms yesterday, one today and one that is too old to be counted
+            Room(seed=seed, owner=owner, creation_time=self.now - timedelta(days=1))
+            Room(seed=seed, owner=owner, creation_time=self.now - timedelta(days=1))
+            Room(seed=seed, owner=owner, creation_time=self.now)
+            Room(seed=seed, owner=owner, creation_time=self.now - timedelta(days=40))
+            self.seed_id = seed.id
+
+    def tearDown(self) -> None:
+        from pony.orm import db_session, delete
+        from WebHostLib.models import GamesPlayed, Seed
+
+        with db_session:
+            delete(games for games in GamesPlayed)
+            seed = Seed.get(id=self.seed_id)
+            for room in seed.rooms:
+                room.delete()
+            for slot in seed.slots:
+                slot.delete()
+            seed.delete()
+
+    def test_past_days_are_rolled_up(self) -> None:
+        """Verify past days are counted once into GamesPlayed and today is counted live."""
+        from pony.orm import db_session, select
+        from WebHostLib.models import GamesPlayed, Room
+        from WebHostLib.stats import get_db_data
+
+        known_games = {"Clique", "Timespinner"}
+        with db_session:
+            total_games, games_played = get_db_data(known_games)
+            self.assertEqual(total_games, {"Clique": 6, "Timespinner": 3})
+            self.assertEqual(games_played[self.yesterday], {"Clique": 4, "Timespinner": 2})
+            self.assertEqual(games_played[self.now.date()], {"Clique": 2, "Timespinner": 1})
+            self.assertEqual(set(select((games.date, games.game, games.count) for games in GamesPlayed)),
+                             {(self.yesterday, "Clique", 4), (self.yesterday, "Timespinner", 2)})
+
+        with db_session:
+            # deleting rooms of a stored day no longer changes its count
+            for room in select(room for room in Room if room.seed.id == self.seed_id):
+                if room.creation_time.date() == self.yesterday:
+                    room.delete()
+        with db_session:
+            total_games, games_played = get_db_data({"Clique"})
+            self.assertEqual(total_games, {"Clique": 6})
+            self.assertEqual(games_played[self.yesterday], {"Clique": 4})
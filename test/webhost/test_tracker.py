@@ -93,3 +93,71 @@ class TestTracker(TestBase):
                 headers={"If-Modified-Since": "Wed, 21 Oct 2015 07:28:00"},  # missing timezone
             )
             self.assertEqual(response.status_code, 400)
+
+    def test_decoded_seed_is_shared(self) -> None:
+        """
+        Verify that different trackers of a room decode its multidata only once
+        """
+        from unittest import mock
+        from WebHostLib import tracker
+
+        tracker._decoded_cache.clear()
+        with self.app.app_context(), self.app.test_request_context(), \
+                mock.patch.object(tracker.Context, "decompress", wraps=tracker.Context.decompress) as decompress:
+            for endpoint in ("get_player_tracker", "get_generic_game_tracker"):
+                response = self.client.get(
+                    url_for(
+                        endpoint,
+                        tracker=self.tracker_uuid,
+                        tracked_team=0,
+                        tracked_player=1,
+                    ),
+                )
+                self.assertEqual(response.status_code, 200)
+            self.assertEqual(decompress.call_count, 1)
+            (multidata, _), = (entry for key, entry in tracker._decoded_cache._entries.items() if key[0] == "seed")
+            self.assertIs(type(multidata), dict)
+            self.assertIs(type(multidata["slot_data"]), dict)
+        tracker._decoded_cache.clear()
+
+    def test_unknown_ids_are_not_cached(self) -> None:
+        """
+        Verify that looking up unknown ids does not grow the shared datapackage lookups
+        """
+        from WebHostLib.tracker import _IdToName
+
+        lookup = _IdToName("Item", {1: "Sword"})
+        self.assertEqual(lookup[1], "Sword")
+        self.assertEqual(lookup[2], "Unknown Item (ID: 2)")
+        self.assertEqual(lookup, {1: "Sword"})
+
+    def test_tracker_events(self) -> None:
+        """
+        Verify that the event stream sends published deltas, and only newer ones when resuming
+        """
+        from pony.orm import db_session
+        from WebHostLib.models import Room, TrackerEvent
+
+        # streams beyond the limit answer right away instead of staying open for TRACKER_EVENT_STREAM_TIME
+        max_streams = self.app.config["TRACKER_EVENT_MAX_STREAMS"]
+        self.app.config["TRACKER_EVENT_MAX_STREAMS"] = 0
+        self.addCleanup(self.app.config.__setitem__, "TRACKER_EVENT_MAX_STREAMS", max_streams)
+
+        with db_session:
+            room = Room.get(id=self.room_id)
+            first = TrackerEvent(room=room, data='[{"cmd": "Status", "team": 0, "slot": 1, "status": 20}]')
+            second = TrackerEvent(room=room, data='[{"cmd": "Status", "team": 0, "slot": 1, "status": 30}]')
+        with self.app.app_context(), self.app.test_request_context():
+            url = url_for("get_tracker_events", tracker=self.tracker_uuid)
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.mimetype, "text/event-stream")
+            body = response.get_data(as_text=True)
+            self.assertIn(f"id: {first.id}\ndata: {first.data}\n\n", body)
+            self.assertIn(f"id: {second.id}\ndata: {second.data}\n\n", body)
+
+            body = self.client.get(url, headers={"Last-Event-ID": str(first.id)}).get_data(as_text=True)
+            self.assertNotIn(f"id: {first.id}\n", body)
+            self.assertIn(f"id: {second.id}\n", body)
+
+            self.assertEqual(self.client.get(url, headers={"Last-Event-ID": "x"}).status_code, 400)
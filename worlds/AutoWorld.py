@@ -13,6 +13,7 @@ from typing import (Any, Callable, ClassVar, Dict, FrozenSet, Iterable, List, Ma
 from Options import item_and_loc_options, ItemsAccessibility, OptionGroup, PerGameCommonOptions
 from BaseClasses import CollectionState
 from Utils import deprecate
+from generation_profiler import measure
 
 if TYPE_CHECKING:
     from BaseClasses import MultiWorld, Item, Location, Tutorial, Region, Entrance
@@ -160,9 +161,15 @@ class WebWorldRegister(type):
 
 
 def _timed_call(method: Callable[..., Any], *args: Any,
-                multiworld: Optional["MultiWorld"] = None, player: Optional[int] = None) -> Any:
+                multiworld: Optional["MultiWorld"] = None, player: Optional[int] = None,
+                game: Optional[str] = None) -> Any:
     start = time.perf_counter()
-    ret = method(*args)
+    if multiworld and multiworld.profiler:
+        with multiworld.profiler.measure(method.__name__, game if player is None else multiworld.game[player],
+                                         player):
+            ret = method(*args)
+    else:
+        ret = method(*args)
     taken = time.perf_counter() - start
     if taken > 1.0:
         if player and multiworld:
@@ -190,19 +197,20 @@ def call_single(multiworld: "MultiWorld", method_name: str, player: int, *args:
 
 def call_all(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
     world_types: Set[AutoWorldRegister] = set()
-    for player in multiworld.player_ids:
-        prev_item_count = len(multiworld.itempool)
-        world_types.add(multiworld.worlds[player].__class__)
-        call_single(multiworld, method_name, player, *args)
-        if __debug__:
-            new_items = multiworld.itempool[prev_item_count:]
-            for i, item in enumerate(new_items):
-                for other in new_items[i+1:]:
-                    assert item is not other, (
-                        f"Duplicate item reference of \"{item.name}\" in \"{multiworld.worlds[player].game}\" "
-                        f"of player \"{multiworld.player_name[player]}\". Please make a copy instead.")
-
-    call_stage(multiworld, method_name, *args)
+    with measure(multiworld.profiler, method_name):
+        for player in multiworld.player_ids:
+            prev_item_count = len(multiworld.itempool)
+            world_types.add(multiworld.worlds[player].__class__)
+            call_single(multiworld, method_name, player, *args)
+            if __debug__:
+                new_items = multiworld.itempool[prev_item_count:]
+                for i, item in enumerate(new_items):
+                    for other in new_items[i+1:]:
+                        assert item is not other, (
+                            f"Duplicate item reference of \"{item.name}\" in \"{multiworld.worlds[player].game}\" "
+                            f"of player \"{multiworld.player_name[player]}\". Please make a copy instead.")
+
+        call_stage(multiworld, method_name, *args)
 
 
 def call_stage(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
@@ -210,7 +218,7 @@ def call_stage(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
     for world_type in sorted(world_types, key=lambda world: world.__name__):
         stage_callable = getattr(world_type, f"stage_{method_name}", None)
         if stage_callable:
-            _timed_call(stage_callable, multiworld, *args)
+            _timed_call(stage_callable, multiworld, *args, multiworld=multiworld, game=world_type.game)
 
 
 class WebWorld(metaclass=WebWorldRegister):
@@ -315,6 +323,12 @@ class World(metaclass=AutoWorldRegister):
     If False, everything is rechecked at every step, which is slower computationally, 
     but may be desirable in complex/dynamic worlds."""
 
+    track_item_conditions: bool = False
+    """If True, CollectionState records which items each blocked Entrance's access rule reads and only rechecks it
+    once one of those items changed, instead of rechecking every blocked Entrance whenever anything was collected.
+    Requires explicit_indirect_conditions, and Entrance access rules that only depend on the state through this
+    player's items (state.has, state.count, etc.) and indirect conditions."""
+
     multiworld: "MultiWorld"
     """autoset on creation. The MultiWorld object for the currently generating multiworld."""
     player: int
@@ -423,6 +437,10 @@ class World(metaclass=AutoWorldRegister):
         """
         This method gets called from a threadpool, do not use multiworld.random here.
         If you need any last-second randomization, use self.random instead.
+
+        With Generate.py --output_processes, it gets called in a process forked from the finished multiworld instead.
+        Attributes it assigns to the world, `threading.Event`s of the world it sets and entries it adds to the spoiler
+        are sent back to the generating process, changes to other objects that already existed are not.
         """
         pass
 
@@ -14,6 +14,299 @@ else:
     ItemRule = typing.Callable[[object], bool]
 
 
+class Rule:
+    """
+    Base of composable rule objects. A Rule is called like the function it replaces, so it can be used as any
+    access_rule or item_rule. Combining rules with & and | (or all_of and any_of) flattens them and merges what can
+    be merged, instead of nesting closures that can't be inspected.
+    """
+    __slots__ = ()
+    cost: typing.ClassVar[int] = 10
+    """Relative cost of evaluating the rule, cheaper rules are evaluated first within And and Or."""
+
+    def __call__(self, arg: typing.Any) -> bool:
+        raise NotImplementedError
+
+    def __and__(self, other: typing.Callable[[typing.Any], bool]) -> typing.Callable[[typing.Any], bool]:
+        return all_of(self, other)
+
+    def __or__(self, other: typing.Callable[[typing.Any], bool]) -> typing.Callable[[typing.Any], bool]:
+        return any_of(self, other)
+
+    def __rand__(self, other: typing.Callable[[typing.Any], bool]) -> typing.Callable[[typing.Any], bool]:
+        return all_of(other, self)
+
+    def __ror__(self, other: typing.Callable[[typing.Any], bool]) -> typing.Callable[[typing.Any], bool]:
+        return any_of(other, self)
+
+    def _key(self) -> typing.Tuple[typing.Any, ...]:
+        raise NotImplementedError
+
+    def __eq__(self, other: object) -> bool:
+        return type(self) is type(other) and self._key() == other._key()  # type: ignore[attr-defined]
+
+    def __hash__(self) -> int:
+        return hash((type(self), self._key()))
+
+    @property
+    def items_read(self) -> typing.FrozenSet[typing.Tuple[str, int]]:
+        """(item name, player) pairs this rule checks."""
+        return frozenset()
+
+    @property
+    def regions_read(self) -> typing.FrozenSet[typing.Tuple[str, int]]:
+        """(region name, player) pairs whose reachability this rule checks."""
+        return frozenset()
+
+    @property
+    def opaque(self) -> bool:
+        """If the rule depends on something besides items_read and regions_read, e.g. a plain function."""
+        return False
+
+
+class _Constant(Rule):
+    __slots__ = ("value",)
+    cost = 0
+
+    def __init__(self, value: bool) -> None:
+        self.value = value
+
+    def __call__(self, arg: typing.Any) -> bool:
+        return self.value
+
+    def _key(self) -> typing.Tuple[typing.Any, ...]:
+        return self.value,
+
+    def __repr__(self) -> str:
+        return "always" if self.value else "never"
+
+
+always = _Constant(True)
+never = _Constant(False)
+
+
+class Has(Rule):
+    __slots__ = ("item", "player", "count")
+    cost = 1
+
+    def __init__(self, item: str, player: int, count: int = 1) -> None:
+        self.item = item
+        self.player = player
+        self.count = count
+
+    def __call__(self, state: "BaseClasses.CollectionState") -> bool:
+        return state.has(self.item, self.player, self.count)
+
+    def _key(self) -> typing.Tuple[typing.Any, ...]:
+        return self.item, self.player, self.count
+
+    @property
+    def items_read(self) -> typing.FrozenSet[typing.Tuple[str, int]]:
+        return frozenset(((self.item, self.player),))
+
+    def __repr__(self) -> str:
+        return f"Has({self.item!r}, {self.player}{f', {self.count}' if self.count != 1 else ''})"
+
+
+class HasAll(Rule):
+    __slots__ = ("items", "player")
+    cost = 2
+
+    def __init__(self, items: typing.Iterable[str], player: int) -> None:
+        self.items = tuple(dict.fromkeys(items))
+        self.player = player
+
+    def __call__(self, state: "BaseClasses.CollectionState") -> bool:
+        return state.has_all(self.items, self.player)
+
+    def _key(self) -> typing.Tuple[typing.Any, ...]:
+        return frozenset(self.items), self.player
+
+    @property
+    def items_read(self) -> typing.FrozenSet[typing.Tuple[str, int]]:
+        return frozenset((item, self.player) for item in self.items)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({list(self.items)!r}, {self.player})"
+
+
+class HasAny(HasAll):
+    __slots__ = ()
+
+    def __call__(self, state: "BaseClasses.CollectionState") -> bool:
+        return state.has_any(self.items, self.player)
+
+
+class CanReach(Rule):
+    __slots__ = ("spot", "player", "resolution_hint", "cost")
+
+    def __init__(self, spot: str, player: int, resolution_hint: str = "Region") -> None:
+        self.spot = spot
+        self.player = player
+        self.resolution_hint = resolution_hint
+        # reachable regions are cached by the state, locations and entrances run their own rules
+        self.cost = 5 if resolution_hint == "Region" else 20  # type: ignore[misc]
+
+    def __call__(self, state: "BaseClasses.CollectionState") -> bool:
+        return state.can_reach(self.spot, self.resolution_hint, self.player)
+
+    def _key(self) -> typing.Tuple[typing.Any, ...]:
+        return self.spot, self.player, self.resolution_hint
+
+    @property
+    def regions_read(self) -> typing.FrozenSet[typing.Tuple[str, int]]:
+        if self.resolution_hint == "Region":
+            return frozenset(((self.spot, self.player),))
+        return frozenset()
+
+    @property
+    def opaque(self) -> bool:
+        return self.resolution_hint != "Region"
+
+    def __repr__(self) -> str:
+        return f"CanReach({self.spot!r}, {self.player}, {self.resolution_hint!r})"
+
+
+class ForbidItems(Rule):
+    """Item rule, that rejects the given (item name, player) pairs."""
+    __slots__ = ("items",)
+    cost = 1
+
+    def __init__(self, items: typing.Iterable[typing.Tuple[str, int]]) -> None:
+        self.items = frozenset(items)
+
+    def __call__(self, item: "BaseClasses.Item") -> bool:
+        return (item.name, item.player) not in self.items
+
+    def _key(self) -> typing.Tuple[typing.Any, ...]:
+        return self.items,
+
+    @property
+    def items_read(self) -> typing.FrozenSet[typing.Tuple[str, int]]:
+        return self.items
+
+    def __repr__(self) -> str:
+        return f"ForbidItems({sorted(self.items)!r})"
+
+
+def _rule_cost(rule: typing.Callable[[typing.Any], bool]) -> int:
+    return rule.cost if isinstance(rule, Rule) else Rule.cost
+
+
+class _Combined(Rule):
+    __slots__ = ("rules", "cost")
+    separator: typing.ClassVar[str]
+
+    def __init__(self, rules: typing.Iterable[typing.Callable[[typing.Any], bool]]) -> None:
+        # stable, so plain functions keep their order
+        self.rules = tuple(sorted(rules, key=_rule_cost))
+        self.cost = sum(map(_rule_cost, self.rules))  # type: ignore[misc]
+
+    def _key(self) -> typing.Tuple[typing.Any, ...]:
+        return self.rules
+
+    @property
+    def items_read(self) -> typing.FrozenSet[typing.Tuple[str, int]]:
+        return frozenset().union(*(rule.items_read for rule in self.rules if isinstance(rule, Rule)))
+
+    @property
+    def regions_read(self) -> typing.FrozenSet[typing.Tuple[str, int]]:
+        return frozenset().union(*(rule.regions_read for rule in self.rules if isinstance(rule, Rule)))
+
+    @property
+    def opaque(self) -> bool:
+        return any(not isinstance(rule, Rule) or rule.opaque for rule in self.rules)
+
+    def __repr__(self) -> str:
+        return "(" + self.separator.join(repr(rule) for rule in self.rules) + ")"
+
+
+class And(_Combined):
+    __slots__ = ()
+    separator = " & "
+
+    def __call__(self, arg: typing.Any) -> bool:
+        for rule in self.rules:
+            if not rule(arg):
+                return False
+        return True
+
+
+class Or(_Combined):
+    __slots__ = ()
+    separator = " | "
+
+    def __call__(self, arg: typing.Any) -> bool:
+        for rule in self.rules:
+            if rule(arg):
+                return True
+        return False
+
+
+def _combine(rules: typing.Iterable[typing.Callable[[typing.Any], bool]], combined_type: typing.Type[_Combined],
+             absorbing: _Constant) -> typing.Callable[[typing.Any], bool]:
+    is_and = combined_type is And
+    flat: typing.Dict[typing.Callable[[typing.Any], bool], None] = {}  # ordered set
+    counts: typing.Dict[typing.Tuple[str, int], int] = {}
+    forbidden: typing.Set[typing.Tuple[str, int]] = set()
+    for rule in rules:
+        if isinstance(rule, _Constant):
+            if rule is absorbing:
+                return absorbing
+        elif type(rule) is combined_type:
+            flat.update(dict.fromkeys(rule.rules))  # type: ignore[attr-defined]
+        else:
+            flat[rule] = None
+
+    merged: typing.List[typing.Callable[[typing.Any], bool]] = []
+    for rule in flat:
+        if type(rule) is Has:
+            key = rule.item, rule.player  # type: ignore[attr-defined]
+            # And needs the highest count, Or is satisfied by the lowest
+            if key not in counts or (rule.count > counts[key]) == is_and:  # type: ignore[attr-defined]
+                counts[key] = rule.count  # type: ignore[attr-defined]
+        elif type(rule) is (HasAll if is_and else HasAny):
+            for item in rule.items:  # type: ignore[attr-defined]
+                counts.setdefault((item, rule.player), 1)  # type: ignore[attr-defined]
+                if not is_and:
+                    counts[item, rule.player] = 1  # type: ignore[attr-defined]
+        elif is_and and type(rule) is ForbidItems:
+            forbidden |= rule.items  # type: ignore[attr-defined]
+        else:
+            merged.append(rule)
+
+    # regroup single items per player into one HasAll/HasAny
+    single_items: typing.Dict[int, typing.List[str]] = {}
+    for (item, player), count in counts.items():
+        if count == 1:
+            single_items.setdefault(player, []).append(item)
+        else:
+            merged.append(Has(item, player, count))
+    for player, items in single_items.items():
+        if len(items) == 1:
+            merged.append(Has(items[0], player))
+        else:
+            merged.append((HasAll if is_and else HasAny)(items, player))
+    if forbidden:
+        merged.append(ForbidItems(forbidden))
+
+    if not merged:
+        return never if absorbing is always else always
+    if len(merged) == 1:
+        return merged[0]
+    return combined_type(merged)
+
+
+def all_of(*rules: typing.Callable[[typing.Any], bool]) -> typing.Callable[[typing.Any], bool]:
+    """Combine rules into a rule that requires all of them, flattening and merging where possible."""
+    return _combine(rules, And, never)
+
+
+def any_of(*rules: typing.Callable[[typing.Any], bool]) -> typing.Callable[[typing.Any], bool]:
+    """Combine rules into a rule that requires any of them, flattening and merging where possible."""
+    return _combine(rules, Or, always)
+
+
 def locality_needed(multiworld: MultiWorld) -> bool:
     for player in multiworld.player_ids:
         if multiworld.worlds[player].options.local_items.value:
@@ -76,10 +369,9 @@ def locality_rules(multiworld: MultiWorld):
                     i.name not in sending_blockers[i.player]
             # special rule, needs to also be fulfilled.
             else:
-                func_cache[location.player, location.item_rule] = location.item_rule = \
-                    lambda i, sending_blockers = forbid_data[location.player], \
-                                            old_rule = location.item_rule: \
-                    i.name not in sending_blockers[i.player] and old_rule(i)
+                func_cache[location.player, location.item_rule] = location.item_rule = all_of(
+                    lambda i, sending_blockers = forbid_data[location.player]: \
+                    i.name not in sending_blockers[i.player], location.item_rule)
 
 
 def exclusion_rules(multiworld: MultiWorld, player: int, exclude_locations: typing.Set[str]) -> None:
@@ -107,23 +399,24 @@ def add_rule(spot: typing.Union["BaseClasses.Location", "BaseClasses.Entrance"],
         spot.access_rule = rule if combine == "and" else old_rule
     else:
         if combine == "and":
-            spot.access_rule = lambda state: rule(state) and old_rule(state)
+            spot.access_rule = all_of(rule, old_rule)
         else:
-            spot.access_rule = lambda state: rule(state) or old_rule(state)
+            spot.access_rule = any_of(rule, old_rule)
 
 
 def forbid_item(location: "BaseClasses.Location", item: str, player: int):
     old_rule = location.item_rule
     # empty rule
     if old_rule is Location.item_rule:
-        location.item_rule = lambda i: i.name != item or i.player != player
+        location.item_rule = ForbidItems(((item, player),))
     else:
-        location.item_rule = lambda i: (i.name != item or i.player != player) and old_rule(i)
+        location.item_rule = all_of(ForbidItems(((item, player),)), old_rule)
 
 
 def forbid_items_for_player(location: "BaseClasses.Location", items: typing.Set[str], player: int):
     old_rule = location.item_rule
-    location.item_rule = lambda i: (i.player != player or i.name not in items) and old_rule(i)
+    forbidden = ForbidItems((item, player) for item in items)
+    location.item_rule = forbidden if old_rule is Location.item_rule else all_of(forbidden, old_rule)
 
 
 def forbid_items(location: "BaseClasses.Location", items: typing.Set[str]):
@@ -139,9 +432,9 @@ def add_item_rule(location: "BaseClasses.Location", rule: ItemRule, combine: str
         location.item_rule = rule if combine == "and" else old_rule
     else:
         if combine == "and":
-            location.item_rule = lambda item: rule(item) and old_rule(item)
+            location.item_rule = all_of(rule, old_rule)
         else:
-            location.item_rule = lambda item: rule(item) or old_rule(item)
+            location.item_rule = any_of(rule, old_rule)
 
 
 def item_name_in_location_names(state: "BaseClasses.CollectionState", item: str, player: int,